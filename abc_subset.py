@@ -0,0 +1,749 @@
+import argparse
+import io
+import json
+import re
+import sys
+import time
+from collections import Counter
+from fractions import Fraction
+from pathlib import Path
+
+import mido
+import numpy as np
+
+
+TICKS_PER_BEAT = 480            # abc2midi's resolution
+DEFAULT_BPM = 120
+BEAT_VELOCITIES = (105, 95, 80)  # abc2midi's default %%MIDI beat: bar start, on the beat, elsewhere
+DRUM_CHANNEL = 10
+
+_LETTER_STEPS = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+_LETTER_FIFTHS = {'F': -1, 'C': 0, 'G': 1, 'D': 2, 'A': 3, 'E': 4, 'B': 5}
+_MODE_FIFTHS = {'': 0, 'maj': 0, 'ion': 0, 'm': -3, 'min': -3, 'aeo': -3,
+                'mix': -1, 'dor': -2, 'phr': -4, 'lyd': 1, 'loc': -5}
+_SHARP_ORDER = 'FCGDAEB'
+_FLAT_ORDER = 'BEADGCF'
+_ACCIDENTALS = {'^^': 2, '^': 1, '=': 0, '_': -1, '__': -2}
+
+# header fields that do not change what is heard
+_IGNORED_FIELDS = set('TCOARNZSBDHGFIrwW')
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|y)
+  | (?P<field>\[(?P<fname>[A-Za-z]):(?P<fvalue>[^\]]*)\])
+  | (?P<repeat>:\||\|:|::|\[\d|\|\d)
+  | (?P<bar>\|\]|\|\||\[\||\|)
+  | (?P<chord>\[(?P<chord_notes>[^\]]*)\](?P<chord_len>\d*/*\d*)(?P<chord_tie>-?))
+  | (?P<note>(?P<acc>\^\^|\^|__|_|=)?(?P<letter>[A-Ga-g])(?P<octave>[',]*)(?P<len>\d*/*\d*)(?P<tie>-?))
+  | (?P<rest>[zx](?P<rest_len>\d*/*\d*))
+  | (?P<bars_rest>Z(?P<bars>\d*))
+  | (?P<continuation>\\$)
+""", re.VERBOSE)
+
+_TOKEN_KINDS = ('space', 'field', 'repeat', 'bar', 'chord', 'note', 'rest', 'bars_rest', 'continuation')
+_CHORD_NOTE = re.compile(r"(\^\^|\^|__|_|=)?([A-Ga-g])([',]*)(\d*/*\d*)(-?)")
+
+
+class UnsupportedAbc(ValueError):
+    """The ABC uses something outside the subset (or is malformed); abc2midi should handle it."""
+
+
+def _length(text: str) -> Fraction:
+    """ABC note length multiplier: '' 1, '3' 3, '/' 1/2, '//' 1/4, '3/2', '/4'."""
+    match = re.fullmatch(r'(\d*)(/*)(\d*)', text)
+    if match is None:
+        raise UnsupportedAbc(f'bad note length {text!r}')
+    numerator, slashes, denominator = match.groups()
+    value = Fraction(int(numerator) if numerator else 1)
+    if not slashes:
+        return value
+    if denominator:
+        if len(slashes) > 1:
+            raise UnsupportedAbc(f'bad note length {text!r}')
+        return value / int(denominator)
+    return value / (2 ** len(slashes))
+
+
+def _fraction(text: str) -> Fraction:
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', text)
+    if match is None or int(match.group(2)) == 0:
+        raise UnsupportedAbc(f'bad fraction {text!r}')
+    return Fraction(int(match.group(1)), int(match.group(2)))
+
+
+def _meter(text: str) -> tuple[int, int] | None:
+    """M: as (numerator, denominator), unreduced so 4/4 and 2/2 keep their beats; None for free meter."""
+    text = text.strip()
+    if text in ('C', 'C|'):
+        return (4, 4) if text == 'C' else (2, 2)
+    if text.lower() == 'none' or not text:
+        return None
+    match = re.fullmatch(r'(\d+)\s*/\s*(\d+)', text)
+    if match is None or int(match.group(2)) == 0:
+        raise UnsupportedAbc(f'unsupported meter {text!r}')
+    return int(match.group(1)), int(match.group(2))
+
+
+def _key_signature(text: str) -> dict[str, int]:
+    """Letter -> alteration for a K: field (tonic plus mode; 'none' and 'perc' have no accidentals)."""
+    words = text.split()
+    if not words or words[0].lower() in ('none', 'perc'):
+        return {}
+    match = re.fullmatch(r'([A-G])([#b]?)([A-Za-z]*)', words[0])
+    if match is None:
+        raise UnsupportedAbc(f'unsupported key {text!r}')
+    letter, accidental, mode = match.groups()
+    mode = mode.lower()
+    if mode not in _MODE_FIFTHS:
+        mode = mode[:3]
+    if mode not in _MODE_FIFTHS:
+        raise UnsupportedAbc(f'unsupported mode in key {text!r}')
+    if any(not re.fullmatch(r'\w+=\S*', word) for word in words[1:]):
+        raise UnsupportedAbc(f'explicit accidentals in key {text!r}')
+
+    fifths = _LETTER_FIFTHS[letter] + {'#': 7, 'b': -7, '': 0}[accidental] + _MODE_FIFTHS[mode]
+    if abs(fifths) > 7:
+        raise UnsupportedAbc(f'key {text!r} has more than 7 accidentals')
+    if fifths >= 0:
+        return {name: 1 for name in _SHARP_ORDER[:fifths]}
+    return {name: -1 for name in _FLAT_ORDER[:-fifths]}
+
+
+def _tempo(text: str) -> float:
+    """Q: as quarter notes per minute ('120', '1/4=120', '"Allegro" 3/8=80')."""
+    text = re.sub(r'"[^"]*"', '', text).strip()
+    if '=' not in text:
+        if not text.isdigit():
+            raise UnsupportedAbc(f'unsupported tempo {text!r}')
+        return float(text)
+    beat, bpm = text.split('=', 1)
+    if not bpm.strip().isdigit():
+        raise UnsupportedAbc(f'unsupported tempo {text!r}')
+    beat_length = sum((_fraction(part) for part in beat.split()), Fraction(0))
+    return float(int(bpm) * beat_length * 4)
+
+
+class AbcVoice:
+    """One V: voice: its MIDI setup, the notes parsed so far and the parser's position in it."""
+
+    __slots__ = ('id', 'name', 'program', 'channel', 'unit', 'notes',
+                 'now', 'bar_start', 'bar_accidentals', 'ties')
+
+    def __init__(self, voice_id: str, unit: Fraction):
+        self.id = voice_id
+        self.name = voice_id
+        self.program: int | None = None
+        self.channel: int | None = None
+        self.unit = unit
+        self.notes: list[list[int]] = []      # [start_tick, duration_ticks, pitch, velocity]
+        self.now = 0
+        self.bar_start = 0
+        self.bar_accidentals: dict[str, int] = {}
+        self.ties: dict[int, list[int]] = {}  # pitch -> note still tied into the next event
+
+
+class AbcTune:
+    """
+    A parsed single-tune ABC snippet: tempo, meter and one note list per
+    voice, ready to write as a MIDI file without going through abc2midi.
+    """
+
+    __slots__ = ('title', 'meter', 'bpm', 'voices')
+
+    def __init__(self):
+        self.title = ''
+        self.meter: tuple[int, int] | None = (4, 4)
+        self.bpm = float(DEFAULT_BPM)
+        self.voices: dict[str, AbcVoice] = {}
+
+    def bar_length(self) -> Fraction | None:
+        """Length of a bar in whole notes."""
+        return Fraction(*self.meter) if self.meter is not None else None
+
+    def note_count(self) -> int:
+        return sum(len(voice.notes) for voice in self.voices.values())
+
+    def to_midi(self) -> mido.MidiFile:
+        """Type 1 file: a conductor track (tempo, meter) and one track per voice, channels as abc2midi assigns them."""
+        midi = mido.MidiFile(type=1, ticks_per_beat=TICKS_PER_BEAT)
+        conductor = mido.MidiTrack()
+        if self.title:
+            conductor.append(mido.MetaMessage('track_name', name=self.title, time=0))
+        conductor.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(self.bpm), time=0))
+        if self.meter is not None:
+            conductor.append(mido.MetaMessage('time_signature', numerator=self.meter[0],
+                                              denominator=self.meter[1], time=0))
+        midi.tracks.append(conductor)
+
+        used = {voice.channel for voice in self.voices.values() if voice.channel is not None}
+        free = (channel for channel in range(1, 17) if channel != DRUM_CHANNEL and channel not in used)
+        for voice in self.voices.values():
+            channel = (voice.channel if voice.channel is not None else next(free, 1)) - 1
+            track = mido.MidiTrack()
+            track.append(mido.MetaMessage('track_name', name=voice.name, time=0))
+            if voice.program is not None:
+                track.append(mido.Message('program_change', channel=channel, program=voice.program, time=0))
+
+            events = []
+            for start, duration, pitch, velocity in voice.notes:
+                if not 0 <= pitch <= 127 or duration <= 0:
+                    continue
+                events.append((start, 1, pitch, velocity))
+                events.append((start + duration, 0, pitch, 0))
+            now = 0
+            for tick, is_on, pitch, velocity in sorted(events):
+                kind = 'note_on' if is_on else 'note_off'
+                track.append(mido.Message(kind, channel=channel, note=pitch, velocity=velocity, time=tick - now))
+                now = tick
+            midi.tracks.append(track)
+        return midi
+
+    def to_midi_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.to_midi().save(file=buffer)
+        return buffer.getvalue()
+
+
+class _Parser:
+    def __init__(self):
+        self.tune = AbcTune()
+        self.unit: Fraction | None = None
+        self.key: dict[str, int] = {}
+        self.voice: AbcVoice | None = None
+        self.header_program: int | None = None
+        self.header_channel: int | None = None
+        self.in_body = False
+        self.seen_x = False
+
+    # ---- header / fields -------------------------------------------------
+    def default_unit(self) -> Fraction:
+        if self.unit is not None:
+            return self.unit
+        bar = self.tune.bar_length()
+        return Fraction(1, 16) if bar is not None and bar < Fraction(3, 4) else Fraction(1, 8)
+
+    def select_voice(self, text: str) -> None:
+        words = text.split()
+        if not words:
+            raise UnsupportedAbc('V: without a voice id')
+        voice = self.tune.voices.get(words[0])
+        if voice is None:
+            voice = self.tune.voices[words[0]] = AbcVoice(words[0], self.default_unit())
+            voice.program = self.header_program
+            voice.channel = self.header_channel
+        for name, value in re.findall(r'(\w+)=("[^"]*"|\S+)', text):
+            name = name.lower()
+            if name in ('octave', 'transpose', 'middle', 'm'):
+                raise UnsupportedAbc(f'voice attribute {name}=')
+            if name in ('name', 'nm'):
+                voice.name = value.strip('"')
+        self.voice = voice
+
+    def current_voice(self) -> AbcVoice:
+        if self.voice is None:
+            self.select_voice('1')
+        return self.voice
+
+    def field(self, name: str, value: str) -> None:
+        value = value.strip()
+        if name == 'X':
+            if self.seen_x:
+                raise UnsupportedAbc('more than one tune')
+            self.seen_x = True
+        elif name == 'T':
+            if not self.tune.title:
+                self.tune.title = value
+        elif name == 'M':
+            self.tune.meter = _meter(value)
+        elif name == 'L':
+            unit = _fraction(value)
+            if self.in_body:
+                self.current_voice().unit = unit
+            else:
+                self.unit = unit
+        elif name == 'Q':
+            if self.in_body and self.tune.note_count():
+                raise UnsupportedAbc('tempo change inside the tune')
+            self.tune.bpm = _tempo(value)
+        elif name == 'K':
+            self.key = _key_signature(value)
+            self.in_body = True
+        elif name == 'V':
+            self.select_voice(value)
+        elif name not in _IGNORED_FIELDS:
+            raise UnsupportedAbc(f'unsupported field {name}:')
+
+    def directive(self, text: str) -> None:
+        words = text[2:].split()
+        if not words or words[0] != 'MIDI':
+            return                                  # %%score and other layout directives
+        if len(words) < 3 or not all(word.isdigit() for word in words[2:]):
+            raise UnsupportedAbc(f'unsupported directive {text!r}')
+        command, numbers = words[1], [int(word) for word in words[2:]]
+        target = self.voice                         # None: header defaults for voices to come
+        if command == 'program':
+            program = numbers[-1]
+            if len(numbers) > 2 or not 0 <= program <= 127:
+                raise UnsupportedAbc(f'unsupported directive {text!r}')
+            if target is None:
+                self.header_program = program
+            else:
+                target.program = program
+        elif command == 'channel':
+            if len(numbers) != 1:
+                raise UnsupportedAbc(f'unsupported directive {text!r}')
+            if not 1 <= numbers[0] <= 16:
+                return                              # abc2midi rejects it and keeps the default channel
+            if target is None:
+                self.header_channel = numbers[0]
+            else:
+                target.channel = numbers[0]
+        elif command == 'tempo':
+            if self.tune.note_count():
+                raise UnsupportedAbc('tempo change inside the tune')
+            self.tune.bpm = float(numbers[0])
+        else:
+            raise UnsupportedAbc(f'unsupported directive {text!r}')
+
+    # ---- music -------------------------------------------------------------
+    def ticks(self, voice: AbcVoice, length: Fraction) -> int:
+        return round(voice.unit * length * 4 * TICKS_PER_BEAT)
+
+    def pitch(self, voice: AbcVoice, accidental: str | None, letter: str, octave: str) -> int:
+        name = letter.upper()
+        if accidental is not None:
+            voice.bar_accidentals[name] = _ACCIDENTALS[accidental]
+        alteration = voice.bar_accidentals.get(name, self.key.get(name, 0))
+        pitch = (72 if letter.islower() else 60) + _LETTER_STEPS[name] + alteration
+        return pitch + 12 * octave.count("'") - 12 * octave.count(',')
+
+    def velocity(self, voice: AbcVoice) -> int:
+        position = voice.now - voice.bar_start
+        if position == 0:
+            return BEAT_VELOCITIES[0]
+        numerator, denominator = self.tune.meter or (4, 4)
+        beat = Fraction(1, denominator)
+        if numerator % 3 == 0 and numerator > 3:
+            beat *= 3                               # compound meters count dotted beats
+        beat_ticks = beat * 4 * TICKS_PER_BEAT
+        return BEAT_VELOCITIES[1] if position % beat_ticks == 0 else BEAT_VELOCITIES[2]
+
+    def sound(self, voice: AbcVoice, notes: list[tuple[int, int, bool]], advance: int) -> None:
+        """Start ``notes`` ([pitch, ticks, tied]) at the voice's position, continuing earlier ties."""
+        velocity = self.velocity(voice)
+        ties = {}
+        for pitch, duration, tied in notes:
+            held = voice.ties.get(pitch)
+            if held is not None and held[0] + held[1] == voice.now:
+                held[1] += duration
+                note = held
+            else:
+                note = [voice.now, duration, pitch, velocity]
+                voice.notes.append(note)
+            if tied:
+                ties[pitch] = note
+        voice.ties = ties
+        voice.now += advance
+
+    def music(self, line: str) -> None:
+        position = 0
+        while position < len(line):
+            if line[position] == '%':
+                return
+            match = _TOKEN.match(line, position)
+            if match is None:
+                raise UnsupportedAbc(f'unsupported ABC near {line[position:position + 12]!r}')
+            position = match.end()
+            kind = next(name for name in _TOKEN_KINDS if match.group(name) is not None)
+
+            if kind in ('space', 'continuation'):
+                continue
+            if kind == 'repeat':
+                raise UnsupportedAbc('repeats and endings')
+            if kind == 'field':
+                self.field(match.group('fname'), match.group('fvalue'))
+                continue
+
+            voice = self.current_voice()
+            if kind == 'bar':
+                voice.bar_start = voice.now
+                voice.bar_accidentals = {}
+            elif kind == 'rest':
+                voice.ties = {}
+                voice.now += self.ticks(voice, _length(match.group('rest_len')))
+            elif kind == 'bars_rest':
+                if self.tune.meter is None:
+                    raise UnsupportedAbc('Z rest without a meter')
+                bars = int(match.group('bars') or 1)
+                voice.ties = {}
+                voice.now += round(self.tune.bar_length() * bars * 4 * TICKS_PER_BEAT)
+            elif kind == 'note':
+                duration = self.ticks(voice, _length(match.group('len')))
+                pitch = self.pitch(voice, match.group('acc'), match.group('letter'), match.group('octave'))
+                self.sound(voice, [(pitch, duration, bool(match.group('tie')))], duration)
+            else:
+                body = match.group('chord_notes')
+                if ':' in body:
+                    raise UnsupportedAbc(f'unsupported inline field [{body}]')
+                outer = _length(match.group('chord_len'))
+                chord_tie = bool(match.group('chord_tie'))
+                notes = []
+                rest = _CHORD_NOTE.sub('', body).strip()
+                if rest or not body.strip():
+                    raise UnsupportedAbc(f'unsupported chord [{body}]')
+                for acc, letter, octave, length, tie in _CHORD_NOTE.findall(body):
+                    duration = self.ticks(voice, _length(length) * outer)
+                    notes.append((self.pitch(voice, acc or None, letter, octave), duration, chord_tie or bool(tie)))
+                self.sound(voice, notes, notes[0][1])
+
+    def feed(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped or stripped in ('<abc>', '</abc>'):
+            return
+        if stripped.startswith('%%'):
+            self.directive(stripped)
+            return
+        if stripped.startswith('%'):
+            return
+        field = re.match(r'([A-Za-z]):(.*)$', stripped)
+        if field is not None and (not self.in_body or field.group(1) not in 'ABCDEFGabcdefg'):
+            self.field(field.group(1), field.group(2).split('%', 1)[0])
+            return
+        if not self.in_body:
+            raise UnsupportedAbc('music before the K: field')
+        self.music(stripped)
+
+
+def parse_abc(text: str) -> AbcTune:
+    """
+    Parse the single-tune ABC the piano roll emits (X:1, L:1/16, V: voices
+    with %%MIDI program/channel, notes, chords, rests, ties and bar-scoped
+    accidentals). Anything outside that subset raises UnsupportedAbc.
+    Bare Q: and %%MIDI tempo values are quarter notes per minute.
+    """
+    parser = _Parser()
+    for line in text.splitlines():
+        parser.feed(line)
+    if not parser.in_body:
+        raise UnsupportedAbc('no K: field')
+    if not parser.tune.voices:
+        parser.current_voice()
+    return parser.tune
+
+
+def abc_to_midi_bytes(text: str) -> bytes:
+    """SMF bytes for an ABC snippet in the supported subset; raises UnsupportedAbc otherwise."""
+    return parse_abc(text).to_midi_bytes()
+
+
+# ---- transposition ---------------------------------------------------------
+_ACCIDENTAL_TEXT = {2: '^^', 1: '^', 0: '=', -1: '_', -2: '__'}
+_LETTERS = 'CDEFGAB'
+
+
+def _fifths_name(fifths: int) -> str:
+    """Note name at ``fifths`` on the line of fifths (0 C, 1 G, -1 F, 7 C#, -2 Bb)."""
+    index, accidental = divmod(fifths + 1, 7)
+    return 'FCGDAEB'[accidental] + ('#' * index if index > 0 else 'b' * -index)
+
+
+def _spelling_signature(fifths: int) -> dict[str, int]:
+    """Letter -> alteration of the key signature with ``fifths`` sharps (negative: flats)."""
+    if fifths >= 0:
+        return {name: 1 for name in _SHARP_ORDER[:fifths]}
+    return {name: -1 for name in _FLAT_ORDER[:-fifths]}
+
+
+def _spelling_table(fifths: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (letter index, alteration) for each pitch class in the key with
+    ``fifths`` sharps (negative: flats). Scale notes are spelled as the
+    key spells them; the others as a raised note in sharp keys and a
+    lowered one in flat keys, unless that would need a double accidental.
+    """
+    signature = _spelling_signature(fifths)
+    diatonic = {}
+    for index, letter in enumerate(_LETTERS):
+        alteration = signature.get(letter, 0)
+        diatonic[(_LETTER_STEPS[letter] + alteration) % 12] = (index, alteration)
+    letters = np.zeros(12, dtype=np.int64)
+    alterations = np.zeros(12, dtype=np.int64)
+    for pitch_class in range(12):
+        if pitch_class in diatonic:
+            letters[pitch_class], alterations[pitch_class] = diatonic[pitch_class]
+            continue
+        below, above = diatonic[(pitch_class - 1) % 12], diatonic[(pitch_class + 1) % 12]
+        raised, lowered = (below[0], below[1] + 1), (above[0], above[1] - 1)
+        first, second = (raised, lowered) if fifths >= 0 else (lowered, raised)
+        letters[pitch_class], alterations[pitch_class] = first if abs(first[1]) < 2 else second
+    return letters, alterations
+
+
+class _AbcKey:
+    """A K: field to transpose: tonic and mode (as written), the rest of the field, and its signature."""
+
+    __slots__ = ('text', 'fifths', 'tonic_fifths', 'mode', 'leading', 'rest', 'percussion', 'signature')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.signature = _key_signature(text)       # raises UnsupportedAbc for keys parse_abc rejects
+        words = text.split()
+        self.percussion = bool(words) and words[0].lower() == 'perc'
+        self.fifths = self.tonic_fifths = None
+        self.mode = self.leading = self.rest = ''
+        if not words or words[0].lower() in ('none', 'perc'):
+            return
+        start = text.index(words[0])
+        self.leading, self.rest = text[:start], text[start + len(words[0]):]
+        letter, accidental, mode = re.fullmatch(r'([A-G])([#b]?)([A-Za-z]*)', words[0]).groups()
+        mode_key = mode.lower() if mode.lower() in _MODE_FIFTHS else mode.lower()[:3]
+        self.tonic_fifths = _LETTER_FIFTHS[letter] + {'#': 7, 'b': -7, '': 0}[accidental]
+        self.fifths = self.tonic_fifths + _MODE_FIFTHS[mode_key]
+        self.mode = mode
+
+    def transposed_fifths(self, semitones: int) -> int:
+        """Signature of the key ``semitones`` up: at most 6 accidentals, 6 flats or 6 sharps as the key leans."""
+        if self.fifths is None:
+            return 0
+        fifths = (self.fifths + 7 * semitones + 6) % 12 - 6
+        if fifths == -6 and self.fifths > 0:
+            fifths = 6
+        return fifths
+
+    def transposed_text(self, semitones: int) -> str:
+        if self.fifths is None:
+            return self.text
+        tonic = self.transposed_fifths(semitones) - (self.fifths - self.tonic_fifths)
+        return self.leading + _fifths_name(tonic) + self.mode + self.rest
+
+
+class AbcTransposer:
+    """
+    An ABC snippet tokenised once for transposition: the text around every
+    pitch, each pitch as a MIDI number, the K: field in force and the bar
+    (per voice) it sits in. Transposing by any number of intervals is NumPy
+    arithmetic on the pitch array and a spelling table per key, then one
+    pass per interval that writes the accidentals each bar needs.
+    Percussion (K:perc) is left where it is. Takes the same subset as
+    parse_abc, and raises UnsupportedAbc for anything else.
+    """
+
+    __slots__ = ('pieces', 'slots', 'keys', 'pitches', 'note_keys', 'note_bars')
+
+    def __init__(self, text: str):
+        self.pieces: list[str] = []          # literal text; slots go between consecutive pieces
+        self.slots: list[tuple[str, int]] = []   # ('note', note index) or ('key', key index)
+        self.keys: list[_AbcKey] = []
+        pitches, note_keys, note_bars = [], [], []
+        self.pitches = self.note_keys = self.note_bars = None
+
+        buffer = []
+        key_index = -1
+        voice = '1'
+        bars: dict[str, int] = {}            # voice -> id of its current bar
+        bar_accidentals: dict[int, dict[str, int]] = {}
+        next_bar = 0
+
+        def close_piece() -> None:
+            self.pieces.append(''.join(buffer))
+            buffer.clear()
+
+        def key_slot(value: str) -> None:
+            nonlocal key_index
+            self.keys.append(_AbcKey(value))
+            key_index = len(self.keys) - 1
+            close_piece()
+            self.slots.append(('key', key_index))
+
+        def current_bar() -> int:
+            nonlocal next_bar
+            if voice not in bars:
+                bars[voice] = next_bar
+                bar_accidentals[next_bar] = {}
+                next_bar += 1
+            return bars[voice]
+
+        def note_slot(accidental: str | None, letter: str, octave: str) -> None:
+            bar = current_bar()
+            name = letter.upper()
+            if accidental:
+                bar_accidentals[bar][name] = _ACCIDENTALS[accidental]
+            alteration = bar_accidentals[bar].get(name, self.keys[key_index].signature.get(name, 0))
+            pitches.append((72 if letter.islower() else 60) + _LETTER_STEPS[name] + alteration
+                           + 12 * octave.count("'") - 12 * octave.count(','))
+            note_keys.append(key_index)
+            note_bars.append(bar)
+            close_piece()
+            self.slots.append(('note', len(pitches) - 1))
+
+        def select_voice(value: str) -> None:
+            nonlocal voice
+            words = value.split()
+            if not words:
+                raise UnsupportedAbc('V: without a voice id')
+            voice = words[0]
+
+        in_body = False
+        for line in text.splitlines(keepends=True):
+            stripped = line.strip()
+            field = re.match(r'\s*([A-Za-z]):(.*?)\s*$', line)
+            if not stripped or stripped in ('<abc>', '</abc>') or stripped.startswith('%'):
+                buffer.append(line)
+                continue
+            if field is not None and (not in_body or field.group(1) not in 'ABCDEFGabcdefg'):
+                name, value = field.groups()
+                if name == 'K':
+                    value, comment_mark, comment = value.partition('%')
+                    buffer.append(line[:field.start(2)])
+                    key_slot(value)
+                    buffer.append(comment_mark + comment + line[field.end(2):])
+                    in_body = True
+                    continue
+                if name == 'V':
+                    select_voice(value)
+                buffer.append(line)
+                continue
+            if not in_body:
+                raise UnsupportedAbc('music before the K: field')
+
+            position = 0
+            while position < len(line):
+                if line[position] == '%' or line[position] in '\r\n':
+                    buffer.append(line[position:])
+                    break
+                match = _TOKEN.match(line, position)
+                if match is None:
+                    raise UnsupportedAbc(f'unsupported ABC near {line[position:position + 12]!r}')
+                kind = next(name for name in _TOKEN_KINDS if match.group(name) is not None)
+                if kind == 'field' and match.group('fname') == 'K':
+                    buffer.append(line[position:match.start('fvalue')])
+                    key_slot(match.group('fvalue'))
+                    buffer.append(line[match.end('fvalue'):match.end()])
+                elif kind == 'note':
+                    buffer.append(line[position:match.start()])
+                    note_slot(match.group('acc'), match.group('letter'), match.group('octave'))
+                    buffer.append(line[match.end('octave'):match.end()])
+                elif kind == 'chord':
+                    body = match.group('chord_notes')
+                    if ':' in body or not body.strip() or _CHORD_NOTE.sub('', body).strip():
+                        raise UnsupportedAbc(f'unsupported chord [{body}]')
+                    body_start = match.start('chord_notes')
+                    buffer.append(line[position:body_start])
+                    for note in _CHORD_NOTE.finditer(body):
+                        note_slot(note.group(1), note.group(2), note.group(3))
+                        buffer.append(line[body_start + note.end(3):body_start + note.end()])
+                    buffer.append(line[match.end('chord_notes'):match.end()])
+                else:
+                    if kind == 'field' and match.group('fname') == 'V':
+                        select_voice(match.group('fvalue'))
+                    elif kind == 'bar':
+                        bars.pop(voice, None)
+                    elif kind == 'repeat':
+                        raise UnsupportedAbc('repeats and endings')
+                    buffer.append(match.group())
+                position = match.end()
+        close_piece()
+        if not in_body:
+            raise UnsupportedAbc('no K: field')
+
+        self.pitches = np.array(pitches, dtype=np.int64)
+        self.note_keys = np.array(note_keys, dtype=np.int64)
+        self.note_bars = note_bars
+
+    def transpose(self, shifts) -> list[str]:
+        """The snippet moved by each of ``shifts`` semitones, in order."""
+        shifts = np.asarray(list(shifts), dtype=np.int64)
+        fixed = np.array([key.percussion for key in self.keys], dtype=bool)[self.note_keys]
+        # (shifts, notes) pitches, then each note's letter, alteration and octave in its new key
+        moved = self.pitches[None, :] + np.where(fixed, 0, shifts[:, None])
+        key_fifths = np.array([[key.transposed_fifths(int(shift)) for key in self.keys] for shift in shifts],
+                              dtype=np.int64).reshape(len(shifts), len(self.keys))
+        tables = {int(fifths): _spelling_table(int(fifths)) for fifths in np.unique(key_fifths)}
+        letters = np.zeros_like(moved)
+        alterations = np.zeros_like(moved)
+        for fifths, (letter_table, alteration_table) in tables.items():
+            in_key = key_fifths[:, self.note_keys] == fifths
+            letters = np.where(in_key, letter_table[moved % 12], letters)
+            alterations = np.where(in_key, alteration_table[moved % 12], alterations)
+        steps = np.array([_LETTER_STEPS[letter] for letter in _LETTERS], dtype=np.int64)[letters]
+        octaves = (moved - alterations - steps - 60) // 12
+
+        results = []
+        for row, shift in enumerate(shifts):
+            key_texts = [key.transposed_text(int(shift)) for key in self.keys]
+            signatures = [_spelling_signature(int(fifths)) for fifths in key_fifths[row]]
+            note_letters = letters[row].tolist()
+            note_alterations = alterations[row].tolist()
+            note_octaves = octaves[row].tolist()
+            bar_accidentals: dict[int, dict[str, int]] = {}
+            out = [self.pieces[0]]
+            for (kind, index), piece in zip(self.slots, self.pieces[1:]):
+                if kind == 'key':
+                    out.append(key_texts[index])
+                else:
+                    letter = _LETTERS[note_letters[index]]
+                    alteration = note_alterations[index]
+                    in_bar = bar_accidentals.setdefault(self.note_bars[index], {})
+                    sounding = in_bar.get(letter, signatures[self.note_keys[index]].get(letter, 0))
+                    if alteration != sounding:
+                        out.append(_ACCIDENTAL_TEXT[alteration])
+                        in_bar[letter] = alteration
+                    octave = note_octaves[index]
+                    out.append(letter.lower() + "'" * (octave - 1) if octave >= 1 else letter + ',' * -octave)
+                out.append(piece)
+            results.append(''.join(out))
+        return results
+
+
+def transpose_abc(text: str, shifts) -> list[str | None]:
+    """
+    ``text`` transposed by each of ``shifts`` semitones, tokenised once;
+    all None when the ABC is outside what AbcTransposer handles.
+    """
+    shifts = list(shifts)
+    try:
+        return AbcTransposer(text).transpose(shifts)
+    except UnsupportedAbc:
+        return [None] * len(shifts)
+
+
+def validate_dataset(folder: Path, fields: tuple[str, ...] = ('input', 'output')) -> bool:
+    """
+    Parse the ABC of every example JSON under ``folder`` and report how much
+    of it the subset parser handles and why the rest would need abc2midi.
+    """
+    started = time.perf_counter()
+    parsed = unsupported = 0
+    reasons = Counter()
+    for json_path in sorted(folder.rglob('*.json')):
+        try:
+            example = json.loads(json_path.read_text())
+        except (OSError, ValueError):
+            continue
+        if not isinstance(example, dict):
+            continue
+        for field in fields:
+            text = example.get(field)
+            if not isinstance(text, str) or '<abc>' not in text:
+                continue
+            try:
+                parse_abc(text)
+                parsed += 1
+            except UnsupportedAbc as exc:
+                unsupported += 1
+                reasons[str(exc)] += 1
+                print(f"{json_path.relative_to(folder)} [{field}]: {exc}")
+
+    print(f"{parsed} parsed, {unsupported} need abc2midi, {time.perf_counter() - started:.2f}s")
+    for reason, count in reasons.most_common(10):
+        print(f"{count:>6}  {reason}")
+    return unsupported == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check dataset ABC against the native ABC-subset parser.")
+    parser.add_argument("folder", nargs="?", default="training_data",
+                        help="Folder of example JSON files (default: training_data).")
+    args = parser.parse_args()
+
+    sys.exit(0 if validate_dataset(Path(args.folder)) else 1)
@@ -1,24 +1,61 @@
 import os
 import json
 import re
-from collections import Counter
+from collections import Counter, OrderedDict
 from flask import (Flask, request, render_template, redirect, url_for,
-                    flash, send_from_directory, abort, jsonify, send_file)
+                    flash, send_from_directory, abort, jsonify, send_file, Response)
 import uuid
 from werkzeug.utils import secure_filename
 import mido # Make sure you have installed mido: pip install mido
 import logging # For better logging
+import gzip
+import io
+import zlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import List, Dict, Any
 import os, json, re, uuid, tempfile, subprocess
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 import miditoolkit
 from heuristic_audit import build_heuristic_audit_snapshot, build_heuristic_audit_source_detail
 from heuristic_export import build_heuristic_export_snapshot, build_heuristic_export_source_detail
+from parse_cache import PARSER_VERSION, ParseCache
+from note_table import NoteTable, TrackNotes
+from smf_decoder import decode_smf_file
+from note_index import DEFAULT_MAX_NOTES, NoteIndex
+from tempo_map import TempoMap
+from loaded_song import LoadedSong
+from render_engine import RenderEngine, RenderError
+from synth_engine import stream_wav_header, write_wav
+from dashboard_index import StatCache
+from example_store import SORTS, ExampleStore, example_path, split_example_path
+from render_catalog import RenderCatalogue, RenderManifest
+from stem_mix import StemSet
+from loudness import normalise_loudness
+from render_cache import RenderCache
+from render_jobs import JobQueue, RenderJob
+from loudness import DEFAULT_PEAK_DBFS, DEFAULT_TARGET_LUFS
+from abc_subset import UnsupportedAbc, abc_to_midi_bytes, transpose_abc
 
 RENDER_ROOT   = Path('renders').resolve()
 SOUNDFONT_SF2 = Path('assets/FluidR3_GM.sf2')   # adjust to taste
 RENDER_ROOT.mkdir(exist_ok=True)
+PARSE_CACHE_ROOT = Path('parse_cache').resolve()   # sits next to uploads/
+PARSE_CACHE = ParseCache(PARSE_CACHE_ROOT)
+NOTE_INDEX_CACHE_SIZE = 8
+_NOTE_INDEXES: OrderedDict[str, NoteIndex] = OrderedDict()
+_NOTE_INDEXES_LOCK = threading.Lock()              # requests share the LRU; built outside the lock
+_LOADED_SONGS: OrderedDict[str, LoadedSong] = OrderedDict()
+_LOADED_SONGS_LOCK = threading.Lock()              # likewise; songs load outside the lock
+RENDER_ENGINE = RenderEngine(SOUNDFONT_SF2)        # worker pool, started on first render
+# which song (and pattern) each WAV in renders/ belongs to, logged as it is rendered; cache evictions too
+RENDER_MANIFEST = RenderManifest(RENDER_ROOT / '.manifest.jsonl')
+RENDER_CATALOGUE = RenderCatalogue(RENDER_ROOT, RENDER_MANIFEST)
+RENDER_CACHE = RenderCache(RENDER_ROOT / '.cache', SOUNDFONT_SF2, RENDER_ENGINE.sample_rate, manifest=RENDER_MANIFEST)
+ABC_LOUDNESS = {'target_lufs': DEFAULT_TARGET_LUFS, 'peak_dbfs': DEFAULT_PEAK_DBFS}   # BS.1770, applied in the worker
+ABC_CONVERT_WORKERS = min(8, os.cpu_count() or 1)   # ABC -> MIDI conversions in flight for a batch
 
 
 # --- Configuration ---
@@ -28,6 +65,7 @@ from pathlib import Path
 UPLOAD_FOLDER = Path('uploads')
 ALLOWED_EXTENSIONS = {'mid', 'midi'}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB limit
+INGEST_MAX_BYTES = 256 * 1024 * 1024   # /dataset/bulk body, gzipped or not
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -45,7 +83,11 @@ app.logger.setLevel(logging.INFO)
 from pathlib import Path
 
 DATA_ROOT = Path('training_data').resolve()      # â‘  make it absolute
+# every saved training example, indexed; saves are written through to the tracked JSON tree,
+# and the first sync_tree (on the first request that reads examples) indexes whatever is already there
+EXAMPLE_STORE = ExampleStore(DATA_ROOT / 'examples.sqlite3', tree=DATA_ROOT)
 ROADMAP_PATH = Path('roadmap.json').resolve()
+DASHBOARD_INDEX = StatCache()    # dashboard sources, recomputed when their mtime/size changes
 HEURISTIC_AUDIT_PATH = Path('heuristic_generation_source_audit.json').resolve()
 HEURISTIC_EXPORT_ROOT = Path('heuristic_exports').resolve()
 HEURISTIC_EXPORT_INDEX_PATH = (HEURISTIC_EXPORT_ROOT / 'index.json').resolve()
@@ -94,7 +136,7 @@ def allowed_file(filename):
 import os
 import mido
 from mido.midifiles.units import tempo2bpm
-from flask import flash, current_app
+from flask import flash, current_app, has_request_context
 
 # def get_instrument_name(program_number): ...
 
@@ -102,96 +144,88 @@ from flask import flash, current_app
 def parse_midi(filepath):
     """
     Return:
-        tracks_data, ticks_per_beat, ts_num, ts_den, bpm
-    or a series of Nones on failure.
+        notes (NoteTable), ticks_per_beat, ts_num, ts_den, bpm, tempo_map (TempoMap)
+    or a series of Nones on failure. ts_num/ts_den and bpm are the first
+    time signature and tempo; tempo_map holds every change.
     """
     try:
-        mid = mido.MidiFile(filepath)
+        song = decode_smf_file(filepath)
     except (OSError, IOError, EOFError, ValueError) as e:
         current_app.logger.error(f"Unable to read MIDI '{filepath}': {e}")
-        flash(f"Could not read MIDI file '{os.path.basename(filepath)}'. "
-              "It might be corrupted or not a valid MIDI file.")
-        return None, None, None, None, None
+        if has_request_context():       # queued render jobs parse outside any request
+            flash(f"Could not read MIDI file '{os.path.basename(filepath)}'. "
+                  "It might be corrupted or not a valid MIDI file.")
+        return None, None, None, None, None, None
 
-    ticks_per_beat = mid.ticks_per_beat or 480
+    ticks_per_beat = song.ticks_per_beat or 480
 
     # â”€â”€ Timeâ€‘signature (first one found) â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
-    ts_num, ts_den = 4, 4
-    for tr in mid.tracks:
-        for msg in tr:
-            if msg.is_meta and msg.type == "time_signature":
-                ts_num, ts_den = msg.numerator, msg.denominator
-                break
-        else:
-            continue
-        break
+    ts_num, ts_den = song.first_time_signature() or (4, 4)
     current_app.logger.info(f"Time signature: {ts_num}/{ts_den}")
 
     # â”€â”€ Tempo (Âµs per quarter â†’ BPM) â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
     bpm = 120
-    for tr in mid.tracks:
-        for msg in tr:
-            if msg.is_meta and msg.type == "set_tempo":
-                bpm = int(tempo2bpm(msg.tempo))
-                break
-        else:
-            continue
-        break
+    first_tempo = song.first_tempo()
+    if first_tempo:
+        bpm = int(tempo2bpm(first_tempo))
     current_app.logger.info(f"Tempo: {bpm}â€¯BPM")
 
     # â”€â”€ Track & note extraction â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
-    tracks_data = []
-    for i, track in enumerate(mid.tracks):
-        is_drum      = False
-        program_no   = None
+    tracks = []
+    for i, track in enumerate(song.tracks):
+        if not len(track):
+            continue
+
         instrument   = "Unknown"
         track_name   = f"TrackÂ {i}"
-
-        # pass 1 â€“ meta info
-        for msg in track:
-            if not msg.is_meta and msg.channel == 9:
-                is_drum = True
-            if msg.type == "program_change" and program_no is None:
-                program_no = msg.program
-                instrument = get_instrument_name(program_no)
-            elif msg.type == "track_name":
-                track_name = msg.name
-
-        if is_drum and program_no is None:
+        if track.name is not None:
+            track_name = track.name
+        if track.program is not None:
+            instrument = get_instrument_name(track.program)
+        elif track.is_drum:
             instrument = "Drums"
 
-        # pass 2 â€“ notes
-        cur_tick = 0
-        notes_on = {}
-        notes    = []
-
-        for msg in track:
-            cur_tick += msg.time
-            if msg.type == "note_on" and msg.velocity > 0:
-                notes_on[msg.note] = {"start_tick": cur_tick,
-                                      "velocity":   msg.velocity}
-            elif msg.type in ("note_off", "note_on") and msg.velocity == 0:
-                start = notes_on.pop(msg.note, None)
-                if start:
-                    dur = cur_tick - start["start_tick"]
-                    if dur >= 0:
-                        notes.append({
-                            "pitch":          msg.note,
-                            "start_tick":     start["start_tick"],
-                            "duration_ticks": dur,
-                            "velocity":       start["velocity"],
-                        })
-
-        if notes:
-            tracks_data.append({
-                "track_index":   i,
-                "name":          track_name,
-                "instrument":    instrument,
-                "notes":         notes,
-                "is_drum_track": is_drum,
-            })
+        tracks.append(TrackNotes(i, track_name, instrument, track.is_drum,
+                                 track.start_tick, track.duration_ticks,
+                                 track.pitch, track.velocity,
+                                 program=track.program).sorted_by_start())
+
+    tempo_map = TempoMap(ticks_per_beat, song.tempos, song.time_signatures)
+    return NoteTable(tracks), ticks_per_beat, ts_num, ts_den, bpm, tempo_map
+
+def _load_song_view(filepath):
+    """
+    Parsed song as the piano roll consumes it, served from PARSE_CACHE when
+    the file's content has been parsed before.
 
-    return tracks_data, ticks_per_beat, ts_num, ts_den, bpm
+    Return:
+        (header, notes) or None when the file cannot be parsed.
+        ``header`` holds ticks_per_beat, ts_num, ts_den, bpm, the tempo map
+        (TempoMap.to_dict) and per-track summaries without notes; ``notes`` is the NoteTable with tracks in
+        UI order (drums first).
+    """
+    cached = PARSE_CACHE.get(filepath)
+    if cached is not None:
+        header, body = cached
+        return header, NoteTable.from_bytes(header['tracks'], body)
+
+    notes, ticks_per_beat, ts_num, ts_den, bpm, tempo_map = parse_midi(filepath)
+    if notes is None:
+        return None
+
+    # drums first, matching the track list order in the UI
+    notes = notes.drums_first()
+
+    header = {
+        'ticks_per_beat': ticks_per_beat,
+        'ts_num': ts_num,
+        'ts_den': ts_den,
+        'bpm': bpm,
+        'tempo_map': tempo_map.to_dict(),
+        'tracks': notes.track_meta(),
+    }
+    PARSE_CACHE.put(filepath, header, notes.to_bytes())
+    return header, notes
 
 # --- Routes ---
 
@@ -212,25 +246,20 @@ def view_file(filename):
     app.logger.info(f"Processing view request for: {filepath}")
     song_title = Path(safe_filename).stem
 
-    # --- MODIFIED CALL ---
-    tracks_data, ticks_per_beat, ts_num, ts_den,bpm = parse_midi(filepath)
-
-    # --- MODIFIED CHECK ---
-    if tracks_data is None: # This implies an error occurred during parsing
+    song_view = _load_song_view(filepath)
+    if song_view is None: # This implies an error occurred during parsing
         # parse_midi already flashed an error, redirect home
         return redirect(url_for('index'))
+    header, notes = song_view
+    tracks_data = header['tracks']
+    ticks_per_beat = header['ticks_per_beat']
+    ts_num, ts_den, bpm = header['ts_num'], header['ts_den'], header['bpm']
 
     if not tracks_data:
         flash(f"The MIDI file '{safe_filename}' contains no playable note tracks.")
         # Still render the page, but maybe show a message?
         # Let's render it to show the message clearly.
 
-    
-    # â”€â”€â”€ NEW: sort drums first â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
-    tracks_data.sort(key=lambda t: not t['is_drum_track'])
-    # â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
-
-    tracks_data_json = json.dumps(tracks_data)
     settings_path = os.path.join(SET_DIR, filename + '.json')
     initial_settings = {}
     if os.path.exists(settings_path):
@@ -245,13 +274,129 @@ def view_file(filename):
                            filename=safe_filename,
                            tracks_data=tracks_data,
                            song_title=song_title,
-                           tracks_data_json=tracks_data_json,
                            ticks_per_beat=ticks_per_beat,
                            time_signature_numerator=ts_num, # New
                            time_signature_denominator=ts_den,
                            initial_settings=json.dumps(initial_settings)) # New
 
 
+def _resolve_upload(filename: str) -> str:
+    """Path of an uploaded MIDI file, or 404 for unsafe or missing names."""
+    safe_filename = secure_filename(filename)
+    if safe_filename != filename:
+        abort(404)
+
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
+    if not os.path.isfile(filepath):
+        abort(404)
+    return filepath
+
+
+def _note_index_for(filepath: str) -> NoteIndex | None:
+    """NoteIndex of an upload, kept for the last few songs keyed by content hash."""
+    digest = PARSE_CACHE.digest_for(filepath)
+    with _NOTE_INDEXES_LOCK:
+        index = _NOTE_INDEXES.get(digest)
+        if index is not None:
+            _NOTE_INDEXES.move_to_end(digest)
+            return index
+
+    song_view = _load_song_view(filepath)
+    if song_view is None:
+        return None
+    index = NoteIndex(song_view[1])
+    with _NOTE_INDEXES_LOCK:
+        _NOTE_INDEXES[digest] = index
+        while len(_NOTE_INDEXES) > NOTE_INDEX_CACHE_SIZE:
+            _NOTE_INDEXES.popitem(last=False)
+    return index
+
+
+def _loaded_song_for(filepath: Path) -> LoadedSong:
+    """LoadedSong of an upload (tempo map from the cached parse), kept for the last few songs keyed by content hash."""
+    digest = PARSE_CACHE.digest_for(filepath)
+    with _LOADED_SONGS_LOCK:
+        song = _LOADED_SONGS.get(digest)
+        if song is not None:
+            _LOADED_SONGS.move_to_end(digest)
+            return song
+
+    song_view = _load_song_view(filepath)
+    tempo_map = TempoMap.from_dict(song_view[0]['tempo_map']) if song_view else None
+    song = LoadedSong.load(filepath, tempo_map)
+    with _LOADED_SONGS_LOCK:
+        _LOADED_SONGS[digest] = song
+        while len(_LOADED_SONGS) > NOTE_INDEX_CACHE_SIZE:
+            _LOADED_SONGS.popitem(last=False)
+    return song
+
+
+@app.get('/api/notes/<path:filename>')
+def song_notes(filename):
+    """
+    Binary note payload for the piano roll (layout in NoteTable.to_payload).
+    Gzipped when the client accepts it unless ``?compress=0``; revalidated by
+    an ETag derived from the file's content hash.
+    """
+    filepath = _resolve_upload(filename)
+    etag = f'{PARSE_CACHE.digest_for(filepath)}-v{PARSER_VERSION}'
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    song_view = _load_song_view(filepath)
+    if song_view is None:
+        abort(422, f"Could not parse MIDI file '{filename}'")
+    header, notes = song_view
+
+    payload = notes.to_payload({'ticks_per_beat': header['ticks_per_beat'], 'tempo_map': header['tempo_map']})
+    response = Response(payload, mimetype='application/octet-stream')
+    response.vary.add('Accept-Encoding')
+    if request.args.get('compress') != '0' and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(payload, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.get('/api/notes/<path:filename>/window')
+def song_notes_window(filename):
+    """
+    Notes of one (tick range, pitch range, track set) window, e.g.
+    ``?start=0&end=7680&low=36&high=84&tracks=0,2&lod=auto``.
+
+    ``tracks`` are UI track positions (default: all). ``lod`` is ``notes``,
+    ``blocks`` or ``auto`` (blocks once more than ``max_notes`` match);
+    ``block_ticks`` overrides the summary bucket width.
+    """
+    filepath = _resolve_upload(filename)
+    args = request.args
+    try:
+        start = int(args.get('start', 0))
+        end = int(args.get('end', 0))
+        low = int(args['low']) if args.get('low') else None
+        high = int(args['high']) if args.get('high') else None
+        positions = [int(t) for t in args['tracks'].split(',') if t.strip()] if args.get('tracks') else None
+        max_notes = int(args.get('max_notes', DEFAULT_MAX_NOTES))
+        block_ticks = int(args['block_ticks']) if args.get('block_ticks') else None
+    except ValueError:
+        abort(400, 'start, end, low, high, max_notes, block_ticks and tracks must be integers')
+    lod = args.get('lod', 'auto')
+    if lod not in ('auto', 'notes', 'blocks'):
+        abort(400, "lod must be 'auto', 'notes' or 'blocks'")
+    if block_ticks is not None and block_ticks <= 0:
+        abort(400, 'block_ticks must be positive')
+
+    index = _note_index_for(filepath)
+    if index is None:
+        abort(422, f"Could not parse MIDI file '{filename}'")
+    if end <= 0:
+        end = index.table.max_tick()
+    return jsonify(index.window(start, end, positions, low, high, lod, max_notes, block_ticks))
+
+
 def slugify(s: str) -> str:
     return re.sub('[^\w\- ]+', '', s).strip().replace(' ', '_')[:64]
 
@@ -265,7 +410,8 @@ def _load_json_file(path: Path, default):
 
 def _list_uploaded_files() -> list[str]:
     try:
-        return sorted([f for f in os.listdir(app.config['UPLOAD_FOLDER']) if allowed_file(f)])
+        return list(DASHBOARD_INDEX.get(Path(app.config['UPLOAD_FOLDER']), 'midi-listing',
+                                        lambda folder: sorted(f for f in os.listdir(folder) if allowed_file(f))))
     except FileNotFoundError:
         app.logger.warning(f"Upload folder '{app.config['UPLOAD_FOLDER']}' not found.")
     except Exception as exc:
@@ -275,29 +421,24 @@ def _list_uploaded_files() -> list[str]:
 
 
 def _load_roadmap() -> dict:
-    roadmap = _load_json_file(ROADMAP_PATH, {})
+    try:
+        roadmap = DASHBOARD_INDEX.get(ROADMAP_PATH, 'json', lambda path: _load_json_file(path, {}))
+    except FileNotFoundError:
+        return {}
     return roadmap if isinstance(roadmap, dict) else {}
 
 
 def _collect_song_folders() -> dict[str, dict[str, object]]:
     song_folders: dict[str, dict[str, object]] = {}
-    if not DATA_ROOT.exists():
-        return song_folders
-
-    for song_dir in DATA_ROOT.iterdir():
-        if not song_dir.is_dir():
-            continue
-        counts = Counter()
-        example_count = 0
-        for json_path in song_dir.rglob('*.json'):
-            example_count += 1
-            counts[json_path.parent.name] += 1
-        key = slugify(song_dir.name).lower()
-        song_folders[key] = {
-            'name': song_dir.name,
-            'example_count': example_count,
-            'category_counts': dict(sorted(counts.items())),
-        }
+    EXAMPLE_STORE.sync_tree(DATA_ROOT)          # example files dropped into training_data by hand
+    for song, category, count in EXAMPLE_STORE.category_counts():
+        folder = song_folders.setdefault(slugify(song).lower(), {
+            'name': song,
+            'example_count': 0,
+            'category_counts': {},
+        })
+        folder['example_count'] += count
+        folder['category_counts'][category] = count
     return song_folders
 
 
@@ -308,7 +449,10 @@ def _load_settings_map() -> dict[str, dict[str, object]]:
         return settings_map
 
     for settings_file in set_dir.glob('*.json'):
-        payload = _load_json_file(settings_file, {})
+        try:
+            payload = DASHBOARD_INDEX.get(settings_file, 'json', lambda path: _load_json_file(path, {}))
+        except FileNotFoundError:
+            continue
         if not isinstance(payload, dict):
             payload = {}
         stem = settings_file.stem
@@ -321,26 +465,28 @@ def _load_settings_map() -> dict[str, dict[str, object]]:
 
 
 def _count_renders(uploaded_files: list[str]) -> tuple[dict[str, int], list[dict[str, object]]]:
-    render_counts = {slugify(Path(name).stem).lower(): 0 for name in uploaded_files}
-    recent_renders: list[dict[str, object]] = []
-    if not RENDER_ROOT.exists():
-        return render_counts, recent_renders
-
-    for wav_path in sorted(RENDER_ROOT.glob('*.wav'), key=lambda p: p.stat().st_mtime, reverse=True):
-        lowered = wav_path.stem.lower()
-        for upload_name in uploaded_files:
-            song_key = slugify(Path(upload_name).stem).lower()
-            raw_stem = Path(upload_name).stem.lower()
-            if lowered.startswith(raw_stem) or song_key in lowered:
-                render_counts[song_key] = render_counts.get(song_key, 0) + 1
-                break
-        if len(recent_renders) < 8:
-            recent_renders.append({
-                'name': wav_path.name,
-                'modified_at': int(wav_path.stat().st_mtime),
-                'size_kb': max(1, round(wav_path.stat().st_size / 1024)),
-            })
-    return render_counts, recent_renders
+    """Renders per uploaded song and the newest renders, from the render catalogue."""
+    song_keys = [slugify(Path(name).stem).lower() for name in uploaded_files]
+    RENDER_CATALOGUE.set_songs(song_keys)
+    RENDER_CATALOGUE.refresh()
+    counts = RENDER_CATALOGUE.counts()
+    return {song_key: counts.get(song_key, 0) for song_key in song_keys}, RENDER_CATALOGUE.recent(8)
+
+
+def _record_render(out_wav: Path, src: Path | None, **details) -> None:
+    """
+    Tell the render catalogue which song a finished render belongs to (None:
+    not from a song); ``details`` go into its render manifest record.
+    """
+    RENDER_CATALOGUE.record(Path(out_wav), slugify(src.stem).lower() if src is not None else None, **details)
+
+
+def _job_details(job: dict) -> dict[str, object]:
+    """Render manifest fields of a /render_wav job: its pattern, tick range and instruments."""
+    rng = job.get('range') or {}
+    return {'pattern': job.get('pattern') or Path(job.get('file') or '').stem,
+            'start': int(rng.get('start', 0) or 0), 'end': int(rng.get('end', 0) or 0),
+            'instruments': job.get('instruments', [])}
 
 
 def _flatten_tasks(roadmap: dict) -> list[dict]:
@@ -488,16 +634,13 @@ def build_dashboard_data() -> dict:
 @app.post('/dataset/motif_variation')
 def save_batch():
     data = request.get_json(force=True)
+    if 'example' in data:
+        # save_motif_variation shares this URL, so Flask only ever calls this view
+        return save_motif_variation()
     song   = re.sub(r'[^\w\- ]+', '', data.get('song_name','untitled')).strip() or 'untitled'
-    folder = DATA_ROOT / song / 'motif_variation'
-    folder.mkdir(parents=True, exist_ok=True)
-
-    for ex in data.get('examples', []):
-        # ensure a filename even if UI forgot the id
-        fid = ex.get('id') or uuid.uuid4().hex
-        (folder / f'{fid}.json').write_text(json.dumps(ex, indent=2))
-
-    return {'saved': len(data.get('examples', []))}
+    # examples without an id get one from the store
+    saved = EXAMPLE_STORE.put_many(song, 'motif_variation', data.get('examples', []))
+    return {'saved': len(saved), 'ids': saved}
 
 
 @app.post('/dataset/motif_variation')
@@ -508,32 +651,26 @@ def save_motif_variation():
     if not song or not ex:
         abort(400, 'song_name and example required')
 
-    # 1. folder layout  <root>/<song>/motif_variation/
-    folder = DATA_ROOT / song / 'motif_variation'
-    folder.mkdir(parents=True, exist_ok=True)
-
-    # 2. write the original
-    fname = folder / f'{ex["id"]}.json'
-    fname.write_text(json.dumps(ex, indent=2))
+    # 1. the original, saved with its copies under <song>/motif_variation/
+    examples = [ex]
 
     # 3. generate 11 transposed copies (-6 â€¦ +6 semitones, skip 0)
+    # (each side is tokenised once and transposed to every shift together)
     m = re.search(r'K:([A-G][b#]?)(maj|min)?', ex['input'])
     if m:
-        key = m.group(1)
-        for semis in range(-6, 7):
-            if semis == 0: continue
-            t_in  = transpose_abc(ex['input'] , semis, key)
-            t_out = transpose_abc(ex['output'], semis, key)
+        shifts = [semis for semis in range(-6, 7) if semis != 0]
+        for t_in, t_out in zip(transpose_abc(ex['input'], shifts), transpose_abc(ex['output'], shifts)):
             if not t_in or not t_out: continue      # skip failures
 
             tid = uuid.uuid4().hex
-            (folder / f'{tid}.json').write_text(json.dumps({
+            examples.append({
                 "id":       tid,
                 "function": ex['function'],
                 "input":    t_in,
                 "output":   t_out
-            }, indent=2))
+            })
 
+    EXAMPLE_STORE.put_many(song, 'motif_variation', examples)
     return jsonify({'status':'ok'})
 
 # ... (keep download_file and main block) ...
@@ -554,12 +691,46 @@ def library():
 @app.get('/api/dashboard-data')
 def dashboard_data():
     return jsonify(build_dashboard_data())
+
+
+@app.get('/api/renders')
+def render_manifest():
+    """
+    Render manifest records of the WAVs in renders/, newest first:
+      GET /api/renders?song=mmx_storm_eagle&pattern=Boss_intro
+    Both filters are optional; a /render_wav job's pattern is its "pattern"
+    field, or its file name without the extension.
+    """
+    RENDER_CATALOGUE.refresh()
+    return jsonify(RENDER_CATALOGUE.renders(song=request.args.get('song'), pattern=request.args.get('pattern')))
+
+
+@app.get('/metrics')
+def metrics():
+    """Render cache counters in the Prometheus text format."""
+    stats = RENDER_CACHE.stats()
+    lines = []
+    for name, kind, help_text in (
+        ('hits', 'counter', 'Renders served from the render cache.'),
+        ('misses', 'counter', 'Render cache lookups that had to render.'),
+        ('stores', 'counter', 'Renders added to the render cache.'),
+        ('evictions', 'counter', 'Render cache entries evicted (LRU).'),
+        ('entries', 'gauge', 'Render cache entries on disk.'),
+        ('bytes', 'gauge', 'Render cache size on disk.'),
+        ('max_bytes', 'gauge', 'Render cache size cap.'),
+    ):
+        metric = f'render_cache_{name}' + ('_total' if kind == 'counter' else '')
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}', f'{metric} {stats[name]}']
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 @app.get('/heuristics/audit')
 def heuristic_audit_page():
     return render_template('heuristic_audit.html')
 @app.get('/api/heuristic-audit')
 def heuristic_audit_data():
-    snapshot = build_heuristic_audit_snapshot(Path(SET_DIR), DATA_ROOT, HEURISTIC_AUDIT_PATH)
+    EXAMPLE_STORE.sync_tree(DATA_ROOT)
+    dataset = ((example_path(song, category, example_id), json.loads(payload))
+               for song, category, example_id, payload, _ in EXAMPLE_STORE.items())
+    snapshot = build_heuristic_audit_snapshot(Path(SET_DIR), DATA_ROOT, HEURISTIC_AUDIT_PATH, dataset=dataset)
     return jsonify(snapshot)
 @app.get('/api/heuristic-audit/source')
 def heuristic_audit_source():
@@ -568,15 +739,26 @@ def heuristic_audit_source():
     if kind not in ('settings', 'dataset') or not rel_path:
         abort(400)
     try:
-        detail = build_heuristic_audit_source_detail(kind, rel_path, Path(SET_DIR), DATA_ROOT)
+        detail = build_heuristic_audit_source_detail(kind, rel_path, Path(SET_DIR), DATA_ROOT,
+                                                     load_dataset=_load_example)
     except (FileNotFoundError, ValueError):
         abort(404)
     return jsonify(detail)
 
 
+def _load_settings_notes(settings_file: Path) -> NoteTable | None:
+    """NoteTable of the upload a settings file belongs to (``<upload name>.json``)."""
+    midi_path = Path(app.config['UPLOAD_FOLDER']) / settings_file.stem
+    if not midi_path.is_file():
+        return None
+    song_view = _load_song_view(midi_path)
+    return song_view[1] if song_view else None
+
+
 @app.get('/api/heuristic-export')
 def heuristic_export_data():
-    snapshot = build_heuristic_export_snapshot(Path(SET_DIR), HEURISTIC_EXPORT_ROOT, HEURISTIC_EXPORT_INDEX_PATH)
+    snapshot = build_heuristic_export_snapshot(Path(SET_DIR), HEURISTIC_EXPORT_ROOT, HEURISTIC_EXPORT_INDEX_PATH,
+                                               note_loader=_load_settings_notes)
     return jsonify(snapshot)
 
 
@@ -655,12 +837,8 @@ def export_training():
     data = request.get_json(force=True)
     song = slugify(data.get('song_name', 'untitled'))
     examples = data.get('examples', [])
-    folder = DATA_ROOT / song / 'instrument_addition'
-    folder.mkdir(parents=True, exist_ok=True)
-    for ex in examples:
-        fid = ex.get('id') or uuid.uuid4().hex
-        (folder / f'{fid}.json').write_text(json.dumps(ex, indent=2))
-    return jsonify({'saved': len(examples)})
+    saved = EXAMPLE_STORE.put_many(song, 'instrument_addition', examples)
+    return jsonify({'saved': len(saved), 'ids': saved})
 
 
 # ----------------------------------------------------------------------
@@ -669,7 +847,8 @@ def export_training():
 @app.get('/data/index.json')
 def data_index():
     """
-    Scans training_data/<song>/*/*.json  (recursively) and returns:
+    Lists every example in the example store (the training_data/<song>/<category>/<id>.json
+    layout, one row each) and returns:
         [
           {
             "id": "nw02f2b8",                 # file stem
@@ -681,32 +860,46 @@ def data_index():
           },
           ...
         ]
+    Query parameters (all optional) filter, sort and page it:
+        song, category, function   exact matches
+        q                          substring of the song, function or id, any case
+        sort                       title (default), song, category, function, id or saved;
+                                   "-title" etc. for descending
+        offset, limit              the page; without a limit, everything from offset on
+    X-Total-Count holds the number of matches. The ETag is the store's
+    revision, so revalidating an unchanged index is a 304 without a query.
     """
-    items = []
-    for json_path in DATA_ROOT.rglob('*.json'):
-        try:
-            payload = json.loads(json_path.read_text())
-        except Exception:
-            continue                            # skip broken files
-
-        song      = json_path.parts[-3]         # <song>
-        category  = json_path.parts[-2]         # motif_variation / â€¦
-        fid       = json_path.stem
-        function  = payload.get('function', '')
-        title     = f"{song} â€¢ {function}" if function else f"{song}/{fid}"
-
-        items.append({
-            "id": fid,
-            "song": song,
-            "category": category,
-            "path": '/'.join(json_path.parts[-3:]),   # relative to DATA_ROOT
-            "function": function,
-            "title": title
-        })
+    EXAMPLE_STORE.sync_tree(DATA_ROOT)          # example files dropped into training_data by hand
+    etag = f'examples-{EXAMPLE_STORE.revision()}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    sort = request.args.get('sort', 'title')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in SORTS:
+        abort(400, f"sort must be one of {', '.join(SORTS)}")
+    try:
+        offset = max(0, int(request.args.get('offset', 0) or 0))
+        limit  = request.args.get('limit')
+        limit  = max(0, int(limit)) if limit else None
+    except ValueError:
+        abort(400, 'offset and limit must be integers')
+    filters = {'song': request.args.get('song'), 'category': request.args.get('category'),
+               'function': request.args.get('function'), 'query': request.args.get('q')}
 
-    # sort sensibly (alpha by song, then whatever)
-    items.sort(key=lambda x: (x['song'].lower(), x['title'].lower()))
-    return jsonify(items)
+    items = EXAMPLE_STORE.find(**filters, sort=sort, descending=descending, limit=limit, offset=offset)
+    for item in items:
+        song, function = item['song'], item['function']
+        item['title'] = f"{song} â€¢ {function}" if function else f"{song}/{item['id']}"
+
+    response = jsonify(items)
+    response.headers['X-Total-Count'] = str(EXAMPLE_STORE.count(**filters))
+    response.set_etag(etag)
+    response.cache_control.no_cache = True     # always revalidate; unchanged pages come back as 304s
+    return response
 
 
 # ----------------------------------------------------------------------
@@ -714,8 +907,18 @@ def data_index():
 # ----------------------------------------------------------------------
 @app.get('/data/example/<path:subpath>')
 def data_example(subpath):
+    """
+    One example's JSON, with an ETag and Last-Modified so the browser
+    revalidates instead of refetching. A path whose song or category is
+    off still finds the example by its id (the file name).
+    """
+    EXAMPLE_STORE.sync_tree(DATA_ROOT)
+    parts = split_example_path(subpath)
+    saved = EXAMPLE_STORE.get_saved(*parts) if parts else None
+    if saved is not None:
+        return _example_response(*saved)
+
     wanted = (DATA_ROOT / subpath).resolve()
-    print(f"Requested data example: {wanted}")
 
     # â‘¡ reject only if the path escapes the dataset folder
     try:
@@ -724,40 +927,128 @@ def data_example(subpath):
         abort(404)
 
     if not wanted.exists():
-        # forgiving fallback (unchanged) â€¦
-        candidates = [p for p in DATA_ROOT.rglob(wanted.name)
-                      if p.is_file() and p.suffix == '.json']
-        if candidates:
-            wanted = candidates[0]
-        else:
+        # forgiving fallback: the same id under another folder â€¦
+        # (an index lookup: the store knows every example file under training_data)
+        located = EXAMPLE_STORE.locate(wanted.stem) if wanted.suffix == '.json' else None
+        if located is None:
             abort(404)
+        return _example_response(*EXAMPLE_STORE.get_saved(*located, wanted.stem))
 
     return send_file(wanted, mimetype='application/json')
 
+
+def _example_response(text: str, saved_at: float) -> Response:
+    """A stored example as a conditional-GET response (304 when the browser's copy is current)."""
+    response = Response(text, mimetype='application/json')
+    response.set_etag(f'{saved_at:.6f}')
+    response.last_modified = saved_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.post('/dataset/generation')
 def save_generation():
     data = request.get_json(force=True)
     song = re.sub(r'[^\w\- ]+', '', data.get('song_name', 'untitled')).strip() or 'untitled'
-    folder = DATA_ROOT / song / 'generation'
-    folder.mkdir(parents=True, exist_ok=True)
-    for ex in data.get('examples', []):
-        fid = ex.get('id') or uuid.uuid4().hex
-        (folder / f'{fid}.json').write_text(json.dumps(ex, indent=2))
-    return {'saved': len(data.get('examples', []))}
+    saved = EXAMPLE_STORE.put_many(song, 'generation', data.get('examples', []))
+    return {'saved': len(saved), 'ids': saved}
 
 @app.post('/dataset/epicify')
 def save_epicify():
     data = request.get_json(force=True)
     song = slugify(data.get('song_name', 'untitled'))
     examples = data.get('examples', [])
-    folder = DATA_ROOT / song / 'epicify'
-    folder.mkdir(parents=True, exist_ok=True)
+    saved = EXAMPLE_STORE.put_many(song, 'epicify', examples)
+    return jsonify({'saved': len(saved), 'ids': saved})
 
-    for ex in examples:
-        fid = ex.get('id') or uuid.uuid4().hex
-        (folder / f'{fid}.json').write_text(json.dumps(ex, indent=2))
 
-    return jsonify({'saved': len(examples)})
+@app.post('/dataset/bulk')
+def ingest_examples():
+    """
+    Save a large batch of training examples in one transaction:
+      POST /dataset/bulk   {"song_name": "...", "category": "epicify", "examples": [...]}
+    or an NDJSON body (Content-Type: application/x-ndjson), one example per
+    line, with song_name and category in the query string. Either may be
+    sent with Content-Encoding: gzip. Nothing is saved unless every example
+    is a JSON object and no two share an id (letters, digits, _ and -); the
+    answer has each example's id, in order (examples without an "id" get one).
+    """
+    request.max_content_length = INGEST_MAX_BYTES    # batches may be far bigger than an upload
+    body = request.get_data(cache=False)
+    if request.content_encoding == 'gzip':
+        try:
+            body = _gunzip(body, INGEST_MAX_BYTES)
+        except (EOFError, ValueError, zlib.error) as exc:
+            abort(400, f'Bad gzip body: {exc}')
+    elif request.content_encoding not in (None, 'identity'):
+        abort(415, f'Unsupported Content-Encoding {request.content_encoding}')
+
+    data = request.args.to_dict()
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        examples = []
+        for number, line in enumerate(body.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                examples.append(json.loads(line))
+            except ValueError as exc:
+                abort(400, f'Bad JSON on line {number}: {exc}')
+    else:
+        try:
+            payload = json.loads(body)
+        except ValueError as exc:
+            abort(400, f'Bad JSON: {exc}')
+        if not isinstance(payload, dict):
+            abort(400, 'Expected a JSON object with "examples"')
+        data.update(payload)
+        examples = payload.get('examples') or []
+
+    category = str(data.get('category') or '')
+    if not re.fullmatch(r'[\w\-]+', category):
+        abort(400, 'category is required (letters, digits, _ and -)')
+    if not isinstance(examples, list) or not examples:
+        abort(400, 'No examples passed')
+    bad = next((index for index, example in enumerate(examples) if not isinstance(example, dict)), None)
+    if bad is not None:
+        abort(400, f'Example {bad} is not a JSON object')
+    seen = {}
+    for index, example in enumerate(examples):
+        if not example.get('id'):
+            continue
+        example_id = str(example['id'])
+        if not re.fullmatch(r'[\w\-]+', example_id):
+            abort(400, f'Example {index} has a bad id {example_id!r} (letters, digits, _ and -)')
+        if example_id in seen:
+            abort(400, f'Example {index} repeats the id {example_id!r} of example {seen[example_id]}')
+        seen[example_id] = index
+
+    song = slugify(data.get('song_name') or 'untitled')
+    saved = EXAMPLE_STORE.put_many(song, category, examples)
+    return jsonify({'saved': len(saved), 'song': song, 'category': category, 'ids': saved})
+
+
+def _gunzip(data: bytes, limit: int) -> bytes:
+    """A gzip body, refused (ValueError) once it inflates past ``limit`` bytes."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    inflated = decompressor.decompress(data, limit + 1)
+    if len(inflated) > limit:
+        raise ValueError(f'more than {limit} bytes uncompressed')
+    if not decompressor.eof:
+        raise EOFError('truncated gzip body')
+    return inflated
+
+
+def _load_example(subpath: str) -> dict | None:
+    """A training example by its <song>/<category>/<id>.json path: from the store, else its file."""
+    parts = split_example_path(subpath)
+    example = EXAMPLE_STORE.get(*parts) if parts else None
+    if example is not None:
+        return example
+    json_path = (DATA_ROOT / subpath).resolve()
+    try:
+        json_path.relative_to(DATA_ROOT)
+        return json.loads(json_path.read_text())
+    except (ValueError, OSError):
+        return None
 
 from typing import List, Set
 import tempfile, miditoolkit, mido
@@ -774,7 +1065,6 @@ from flask import request, jsonify, abort
 import tempfile, os, json, subprocess
 from pathlib import Path
 from music21 import converter
-import fluidsynth
 
 SOUNDFONT_SF2 = Path('assets/FluidR3_GM.sf2')
 RENDER_ROOT   = Path('renders').resolve()
@@ -788,7 +1078,6 @@ import tempfile
 import os
 
 from music21 import converter, meter
-import fluidsynth  # make sure you have `pip install pyFluidSynth`
 
 from flask import request, abort, jsonify
 from pathlib import Path
@@ -796,7 +1085,6 @@ import tempfile
 import os
 
 from music21 import converter, meter
-import fluidsynth  # make sure you have `pip install pyFluidSynth`
 from pathlib import Path
 import tempfile
 import subprocess
@@ -836,16 +1124,8 @@ def strip_duplicate_time_signatures(score):
 
 
 def midi_to_wav(midi_path: str, wav_path: str):
-    """Render MIDI to WAV using FluidSynth CLI."""
-    cmd = [
-        'fluidsynth', '-ni', str(SOUNDFONT_SF2),
-        midi_path,
-        '-F', wav_path,
-        '-r', '44100'
-    ]
-    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-    if result.stderr:
-        current_app.logger.warning(f"FluidSynth stderr: {result.stderr}")
+    """Render MIDI to WAV on the render pool's in-process synth."""
+    RENDER_ENGINE.render_file(Path(midi_path), Path(wav_path))
 
 @app.post("/render_abc")
 def render_abc():
@@ -868,6 +1148,55 @@ def render_abc():
 
     print(data)
 
+    try:
+        return jsonify(_render_abc_to_wav(abc, ofname))
+    except ValueError as e:
+        abort(400, f"Invalid ABC notation: {e}")
+    except RenderError as e:
+        abort(500, f"WAV processing failed: {e}")
+
+
+def _render_abc_to_wav(abc: str, ofname: str) -> dict[str, object]:
+    """
+    ABC text -> MIDI -> synth -> BS.1770 normalisation -> RENDER_ROOT/ofname.
+    Raises ValueError when abc2midi rejects the ABC and RenderError when
+    rendering or normalisation fails.
+    """
+    # Prepare output WAV path
+    out_wav = (RENDER_ROOT / ofname).resolve()
+    out_wav.parent.mkdir(parents=True, exist_ok=True)
+
+    # Same ABC, SoundFont and normalisation -> same audio
+    cache_key = RENDER_CACHE.key(abc.encode('utf-8'), 'abc', _normalisation(ABC_LOUDNESS))
+    if RENDER_CACHE.fetch(cache_key, out_wav):
+        _record_render(out_wav, None, kind='abc', cached=True)
+        return {"rendered": True, "output": str(out_wav), "cached": True}
+
+    midi_bytes = _abc_to_midi_bytes(abc)
+
+    # Render the MIDI from memory; the worker normalises the buffer before its one write
+    try:
+        RENDER_ENGINE.render_file(midi_bytes, out_wav, loudness=ABC_LOUDNESS)
+    except RenderError as e:
+        current_app.logger.error(f"Rendering failed: {e}")
+        raise
+    RENDER_CACHE.store(cache_key, out_wav)
+    _record_render(out_wav, None, kind='abc', cached=False)
+
+    return {"rendered": True, "output": str(out_wav), "cached": False}
+
+
+def _abc_to_midi_bytes(abc: str) -> bytes:
+    """
+    ABC text -> SMF bytes. The piano roll's ABC dialect is converted in
+    process (abc_subset.py); anything else goes through abc2midi. Raises
+    ValueError when abc2midi rejects the ABC.
+    """
+    try:
+        return abc_to_midi_bytes(abc)
+    except UnsupportedAbc as e:
+        current_app.logger.debug(f"ABC outside the native subset ({e}), using abc2midi")
+
     # Write ABC to temp file
     with tempfile.NamedTemporaryFile(delete=False, suffix='.abc') as tmp_abc:
         tmp_abc.write(abc.encode('utf-8'))
@@ -876,7 +1205,7 @@ def render_abc():
     # Generate temp MIDI path
     tmp_mid_path = tempfile.mktemp(suffix='.mid')
 
-    # Convert ABC to MIDI
+    # Convert ABC to MIDI (abc2midi only works on files, so these temp files stay)
     try:
         result = subprocess.run(
             ['abc2midi', tmp_abc_path, '-o', tmp_mid_path],
@@ -884,132 +1213,210 @@ def render_abc():
         )
         if result.stderr:
             current_app.logger.info(f"abc2midi stderr: {result.stderr}")
+        return Path(tmp_mid_path).read_bytes()
     except subprocess.CalledProcessError as e:
-        os.unlink(tmp_abc_path)
         current_app.logger.error(f"abc2midi failed: {e.stderr}")
-        abort(400, f"Invalid ABC notation: {e.stderr}")
+        raise ValueError(e.stderr) from e
     finally:
         os.unlink(tmp_abc_path)
+        Path(tmp_mid_path).unlink(missing_ok=True)
 
-    # Prepare output WAV path
-    out_wav = (RENDER_ROOT / ofname).resolve()
-    out_wav.parent.mkdir(parents=True, exist_ok=True)
 
-    # Render MIDI to WAV and normalize
-    try:
-        midi_to_wav(tmp_mid_path, str(out_wav))
-        # Normalize using FFmpeg loudnorm
-        tmp_norm = out_wav.with_suffix('.normalized.wav')
-        ffmpeg_cmd = [
-            'ffmpeg', '-y', '-i', str(out_wav),
-            '-af', 'loudnorm', '-ar', '44100', str(tmp_norm)
-        ]
-        result = subprocess.run(ffmpeg_cmd, check=True, capture_output=True, text=True)
-        if result.stderr:
-            current_app.logger.info(f"ffmpeg stderr: {result.stderr}")
-        # Replace original with normalized
-        os.replace(tmp_norm, str(out_wav))
-    except subprocess.CalledProcessError as e:
-        os.unlink(tmp_mid_path)
-        current_app.logger.error(f"FFmpeg normalization failed: {e.stderr}")
-        abort(500, f"WAV processing failed: {e.stderr}")
-    finally:
-        os.unlink(tmp_mid_path)
+def _render_abc_items(items: list[dict], queued: RenderJob | None = None) -> dict[str, object]:
+    """
+    Render a list of {abc, outfile} as one batch and return its manifest.
+    Cache hits are placed first, the remaining ABC is converted to MIDI
+    concurrently (abc2midi runs only for ABC outside the native subset),
+    and all the MIDI goes to the render pool in one go, so every worker's
+    warm synth stays busy. Each item records its own status, error and
+    timings (convert_seconds, render_seconds).
+    """
+    started = time.perf_counter()
+    cancelled = (lambda: queued.cancel_requested) if queued is not None else None
+    advance = queued.advance if queued is not None else (lambda count=1: None)
+
+    results = []
+    pending = []
+    for index, item in enumerate(items):
+        entry = {'index': index, 'outfile': item.get('outfile'), 'output': None,
+                 'cached': False, 'convert_seconds': 0.0, 'render_seconds': 0.0}
+        results.append(entry)
+        if cancelled is not None and cancelled():
+            entry.update(status='cancelled', error='cancelled before rendering')
+            continue
+        abc = str(item.get('abc') or '').strip()
+        out_wav = (RENDER_ROOT / Path(item.get('outfile') or 'output.wav').name).resolve()
+        cache_key = RENDER_CACHE.key(abc.encode('utf-8'), 'abc', _normalisation(ABC_LOUDNESS))
+        if RENDER_CACHE.fetch(cache_key, out_wav):
+            entry.update(status='ok', output=str(out_wav), cached=True)
+            advance()
+            continue
+        pending.append((entry, abc, out_wav, cache_key))
 
-    return jsonify({"rendered": True, "output": str(out_wav)})
+    def convert(abc: str) -> tuple[bytes | None, str | None, float]:
+        convert_started = time.perf_counter()
+        if cancelled is not None and cancelled():
+            return None, None, 0.0
+        try:
+            return _abc_to_midi_bytes(abc), None, time.perf_counter() - convert_started
+        except ValueError as exc:
+            return None, f"Invalid ABC notation: {exc}", time.perf_counter() - convert_started
+
+    with ThreadPoolExecutor(max_workers=ABC_CONVERT_WORKERS) as pool:
+        # conversions run off the request thread, so hand each one the app context
+        converted = list(pool.map(lambda abc: _in_app_context(convert, abc), [abc for _, abc, _, _ in pending]))
+
+    tasks = []
+    for (entry, abc, out_wav, cache_key), (midi_bytes, error, seconds) in zip(pending, converted):
+        entry['convert_seconds'] = round(seconds, 3)
+        if error is not None:
+            entry.update(status='error', error=error)
+            advance()
+        elif midi_bytes is None:
+            entry.update(status='cancelled', error='cancelled before rendering')
+        else:
+            tasks.append({'index': entry['index'], 'file': entry['outfile'], 'cache_key': cache_key,
+                          'midi_bytes': midi_bytes, 'wav_path': str(out_wav), 'loudness': ABC_LOUDNESS})
+
+    for task, result in zip(tasks, RENDER_ENGINE.render(tasks, on_result=lambda result: advance(),
+                                                         cancelled=cancelled)):
+        entry = results[task['index']]
+        entry.update(status=result['status'], output=result['output'], render_seconds=result['seconds'])
+        if result['status'] == 'ok':
+            RENDER_CACHE.store(task['cache_key'], Path(result['output']))
+        else:
+            entry['error'] = result['error']
 
-# ------------------------------------------------------------------
-# helpers.py  (or inline in app.py if you prefer)
-# ------------------------------------------------------------------
-def _song_max_tick(mt: miditoolkit.MidiFile) -> int:
-    """Last tick in the file."""
-    return max((n.end for inst in mt.instruments for n in inst.notes), default=0)
-
-def _resolve_keep_set(
-    mt: miditoolkit.MidiFile,
-    mo: mido.MidiFile,
-    keep_tracks: List[int]) -> Set[int]:
+    for entry in results:
+        entry['seconds'] = round(entry['convert_seconds'] + entry['render_seconds'], 3)
+        if entry['status'] == 'ok':
+            _record_render(Path(entry['output']), None, kind='abc', cached=entry['cached'])
+    return {'rendered': sum(1 for entry in results if entry['status'] == 'ok'),
+            'failed': sum(1 for entry in results if entry['status'] == 'error'),
+            'cancelled': sum(1 for entry in results if entry['status'] == 'cancelled'),
+            'cached': sum(1 for entry in results if entry['cached']),
+            'seconds': round(time.perf_counter() - started, 3),
+            'items': results}
+
+
+def _in_app_context(fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+def _abc_from_example(text: str) -> str:
+    """ABC body of a dataset field, without the <abc> ... </abc> wrapper."""
+    return re.sub(r'^\s*<abc>|</abc>\s*$', '', text or '').strip()
+
+
+@app.post('/render_abc/batch')
+def render_abc_batch():
     """
-    Accept *either* UI indices (after sort) **or** original Mido indices.
-    Falls back to 'use instrument index directly' when the first lookup fails.
+    Render many ABC snippets in parallel and return a manifest.
+      { "items": [ {"abc": "...", "outfile": "a.wav"}, ... ] }
+    and/or dataset examples to audition, e.g. epicify pairs:
+      { "examples": ["MMX_Boomer_Kuwanger/epicify/x.json", ...],
+        "fields": ["input", "output"] }            # -> MMX_Boomer_Kuwanger_epicify_x_input.wav, ..._output.wav
+    Add "manifest": "batch.json" to also save the manifest under renders/.
     """
-    # map originalâ€‘>miditoolkit
-    idx_map: dict[int,int] = {}
-    seq = 0
-    for orig_idx, trk in enumerate(mo.tracks):
-        if any(msg.type.startswith('note_') for msg in trk):
-            idx_map[orig_idx] = seq
-            seq += 1
-
-    keep_instr: set[int] = set()
-    for k in (keep_tracks or []):
-        if k in idx_map:                        # original index â†’ OK
-            keep_instr.add(idx_map[k])
-        elif 0 <= k < len(mt.instruments):      # maybe already instrument idx
-            keep_instr.add(k)
-    if not keep_tracks:                      # empty â†’ keep everything
-        return set(range(len(mt.instruments)))
-    return {k for k in keep_tracks
-              if 0 <= k < len(mt.instruments)}
-    return keep_instr
+    data = request.get_json(force=True) or {}
+    items = list(data.get('items') or [])
+    fields = data.get('fields') or ['input', 'output']
+    for subpath in data.get('examples') or []:
+        example = _load_example(subpath)
+        if not isinstance(example, dict):
+            abort(400, f"Bad example {subpath}: not found")
+        for field in fields:
+            items.append({'abc': _abc_from_example(example.get(field, '')),
+                          'outfile': f"{'_'.join(PurePosixPath(subpath).with_suffix('').parts)}_{field}.wav"})
+
+    if not items:
+        abort(400, "No ABC passed")
+    if not all(isinstance(item, dict) and str(item.get('abc') or '').strip() for item in items):
+        abort(400, "Every item needs ABC")
+
+    manifest = _render_abc_items(items)
+    if data.get('manifest'):
+        manifest_path = RENDER_ROOT / Path(data['manifest']).name
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+        manifest['manifest'] = str(manifest_path)
+    return jsonify(manifest)
 
+# ------------------------------------------------------------------
+# helpers.py  (or inline in app.py if you prefer)
 # ------------------------------------------------------------------
 def _slice_midi(src_midi: Path,
                 ticks_per_beat: int,
                 start_tick: int,
                 end_tick: int,
-                keep_tracks: List[int]) -> Path:
-    mt = miditoolkit.MidiFile(src_midi)
-    mo = mido.MidiFile(src_midi)
+                keep_tracks: List[int],
+                tempo_map: TempoMap | None = None,
+                song: LoadedSong | None = None) -> Path:
+    """
+    Temp-file variant of ``_slice_midi_bytes`` for tools that need a path;
+    the render pipeline hands the bytes over in memory instead.
+    """
+    data = _slice_midi_bytes(src_midi, ticks_per_beat, start_tick, end_tick, keep_tracks, tempo_map, song)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.mid')
+    tmp.write(data)
+    tmp.close()                                 # Windows â€‘ important!
+    return Path(tmp.name)
+
+
+def _slice_midi_bytes(src_midi: Path,
+                      ticks_per_beat: int,
+                      start_tick: int,
+                      end_tick: int,
+                      keep_tracks: List[int],
+                      tempo_map: TempoMap | None = None,
+                      song: LoadedSong | None = None) -> bytes:
+    """
+    Standard MIDI File bytes holding the notes of ``keep_tracks`` inside
+    [start_tick, end_tick), shifted to start at tick 0. ``tempo_map`` is the
+    source song's map (read from the file when omitted); the slice gets it
+    rebased so the tempo and meter in force at ``start_tick`` apply from its
+    first tick. ``song`` is the already loaded ``src_midi`` when slicing it
+    repeatedly.
+    """
+    song = song or LoadedSong.load(src_midi, tempo_map)
 
     # --- NEW: expand â€œendâ€ when 0/null --------------------------------
     if end_tick == 0:
-        end_tick = _song_max_tick(mt)
-
-    keep_instr = _resolve_keep_set(mt, mo, keep_tracks)
+        end_tick = song.max_tick()
 
     out = miditoolkit.MidiFile(ticks_per_beat=ticks_per_beat)
-    out.tempo_changes          = mt.tempo_changes
-    out.time_signature_changes = mt.time_signature_changes
-
-    def clone(n: miditoolkit.Note) -> miditoolkit.Note:
-        return miditoolkit.Note(pitch=n.pitch, velocity=n.velocity,
-                                start=max(0, n.start - start_tick),
-                                end=max(0, n.end   - start_tick))
-
-    for i, inst in enumerate(mt.instruments):
-        if i not in keep_instr:
+    slice_map = (tempo_map or song.tempo_map).rebased(start_tick)
+    out.tempo_changes          = [miditoolkit.TempoChange(60_000_000 / tempo, tick)
+                                  for tick, tempo in slice_map.tempos]
+    out.time_signature_changes = [miditoolkit.TimeSignature(num, den, tick)
+                                  for tick, num, den in slice_map.time_signatures]
+
+    for track in song.slice(start_tick, end_tick, keep_tracks).tracks:
+        if not len(track):
             continue
-        ni = miditoolkit.Instrument(program=inst.program,
-                                    is_drum=inst.is_drum,
-                                    name=inst.name)
-        for n in inst.notes:
-            if n.start >= end_tick or n.end <= start_tick:
-                continue
-            ni.notes.append(clone(n))
-        if ni.notes:
-            out.instruments.append(ni)
+        ni = miditoolkit.Instrument(program=track.program,
+                                    is_drum=track.is_drum_track,
+                                    name=track.name)
+        ni.notes = [
+            miditoolkit.Note(pitch=p, velocity=v, start=s, end=e)
+            for p, v, s, e in zip(track.pitch.tolist(), track.velocity.tolist(),
+                                  track.start_tick.tolist(), track.end_tick.tolist())
+        ]
+        out.instruments.append(ni)
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.mid')
-    out.dump(tmp.name)
-    tmp.close()                                 # Windows â€‘ important!
-    return Path(tmp.name)
+    buffer = io.BytesIO()
+    out.dump(file=buffer)
+    return buffer.getvalue()
 
 
 
 def midi_to_wav(midi_path: Path, wav_path: Path):
-    """Render the entire MIDI via fluidsynth."""
-    cmd = [
-        'fluidsynth', '-ni', str(SOUNDFONT_SF2),
-        str(midi_path),
-        '-F', str(wav_path),
-        '-r', '44100'
-    ]
-    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    """Render the entire MIDI on the render pool (SoundFont stays loaded per worker)."""
+    RENDER_ENGINE.render_file(Path(midi_path), Path(wav_path))
 
 # ----------------------------------------------------------------------
 #  helpers (same as before)  â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
-#  _song_max_tick, _resolve_keep_set, _slice_midi, _midi_to_wav
+#  LoadedSong (loaded_song.py), _slice_midi, _midi_to_wav
 #  --------------------------------------------------------------------
 
 @app.post('/render_wav')
@@ -1023,8 +1430,35 @@ def render_wav():
         "ticksPerBeat": 480,
         "jobs": [ {file,range,instruments}, â€¦ ]
       }
+    Either form may add "normalize": true (and optionally "targetLufs") to
+    level-match the renders with BS.1770 loudness normalisation. A job list
+    may add "stems": true to cut every job from per-instrument stems.
     """
-    data      = request.get_json(force=True)
+    data = request.get_json(force=True)
+    src, ticks_per_beat, jobs, loudness = _render_wav_request(data)
+
+    # ------------------------------------------------------------------
+    # Simpleâ€‘case fallback: render one file for the whole song
+    # ------------------------------------------------------------------
+    if not jobs:
+        try:
+            return jsonify(_render_whole_song(src, loudness))
+        except RenderError as e:
+            app.logger.error(f"Error rendering {src}: {e}")
+            abort(500, 'Rendering failed')
+
+    # ------------------------------------------------------------------
+    # Full job list (pattern + instrument splits)
+    # ------------------------------------------------------------------
+    try:
+        return jsonify(_render_wav_jobs(src, ticks_per_beat, jobs, loudness=loudness, stems=bool(data.get('stems'))))
+    except RenderError as e:
+        app.logger.error(f"Error rendering {src}: {e}")
+        abort(400, str(e))
+
+
+def _render_wav_request(data: dict) -> tuple[Path, int, list | None, dict | None]:
+    """Validate a /render_wav body (also queued via /render_jobs); aborts with 400/404."""
     song_id   = secure_filename(data.get('song_id', ''))
     if not song_id:
         abort(400, 'song_id is required')
@@ -1036,60 +1470,341 @@ def render_wav():
     ticks_per_beat = int(data.get('ticksPerBeat', 480) or 480)
     jobs = data.get('jobs')           # might be None
 
-    # ------------------------------------------------------------------
-    # Simpleâ€‘case fallback: render one file for the whole song
-    # ------------------------------------------------------------------
-    if not jobs:
-        out_wav = RENDER_ROOT / f"{Path(song_id).stem}.wav"
+    loudness = None
+    if data.get('normalize'):
         try:
-            midi_to_wav(src, out_wav)
-        except subprocess.CalledProcessError as e:
-            app.logger.error(f"Error rendering {src}: {e}")
-            abort(500, 'Rendering failed')
-        return jsonify({'rendered': 1, 'output': str(out_wav)})
+            target_lufs = float(data.get('targetLufs', DEFAULT_TARGET_LUFS))
+        except (TypeError, ValueError):
+            abort(400, 'targetLufs must be a number')
+        loudness = {'target_lufs': target_lufs, 'peak_dbfs': DEFAULT_PEAK_DBFS}
+    return src, ticks_per_beat, jobs, loudness
+
+
+def _normalisation(loudness: dict | None) -> dict | None:
+    """Render cache description of a loudness setting (None: rendered as is)."""
+    return None if loudness is None else {'filter': 'bs1770', **loudness}
+
+
+def _render_whole_song(src: Path, loudness: dict | None = None) -> dict[str, object]:
+    """Render the whole source song; raises RenderError."""
+    out_wav = RENDER_ROOT / f"{src.stem}.wav"
+    cache_key = RENDER_CACHE.key(src.read_bytes(), 'midi', _normalisation(loudness))
+    cached = RENDER_CACHE.fetch(cache_key, out_wav)
+    if not cached:
+        RENDER_ENGINE.render_file(src, out_wav, loudness=loudness)
+        RENDER_CACHE.store(cache_key, out_wav)
+    _record_render(out_wav, src, kind='song', start=0, end=0, cached=cached)
+    return {'rendered': 1, 'output': str(out_wav), 'cached': cached}
+
+
+def _job_output_path(job: dict) -> Path:
+    """Where a /render_wav job's WAV goes under RENDER_ROOT."""
+    # fname = secure_filename(job.get('file', f'{uuid.uuid4()}.wav'))
+    name = job.get('file').replace("'", " Variation")  # replace ' with ' ariation
+    out_wav = (RENDER_ROOT / name).resolve()
+    out_wav.parent.mkdir(parents=True, exist_ok=True)
+    #remove _ from filename and replace with ' '
+    return out_wav.with_name(out_wav.name.replace('_', ' '))
 
-    # ------------------------------------------------------------------
-    # Full job list (pattern + instrument splits)
-    # ------------------------------------------------------------------
-    rendered = 0
-    for job in jobs:
+
+def _render_wav_jobs(src: Path, ticks_per_beat: int, jobs: list,
+                     queued: RenderJob | None = None, loudness: dict | None = None,
+                     stems: bool = False) -> dict[str, object]:
+    """
+    Slice and render every /render_wav job. ``queued`` is the queue entry
+    when running in the background: its progress advances per finished job
+    and a cancel request skips whatever has not been rendered yet.
+    ``loudness`` (normalise_loudness arguments) level-matches every render.
+    ``stems`` switches to _render_wav_stem_jobs. Raises RenderError when
+    the source MIDI cannot be read.
+    """
+    # timing comes from the cached parse, once for every job
+    song_view = _load_song_view(src)
+    if song_view is None:
+        raise RenderError(f"could not read MIDI file {src.name}")
+    tempo_map = TempoMap.from_dict(song_view[0]['tempo_map'])
+
+    if stems:
+        return _render_wav_stem_jobs(src, ticks_per_beat, jobs, queued, loudness)
+
+    advance   = queued.advance if queued is not None else (lambda count=1: None)
+    cancelled = (lambda: queued.cancel_requested) if queued is not None else None
+
+    # every job is sliced here from one parse of the source; the renders fan
+    # out to the worker pool and each job reports its own result
+    song = LoadedSong.load(src, tempo_map)
+    tasks   = []
+    results = []
+    for index, job in enumerate(jobs):
+        if cancelled is not None and cancelled():
+            results.append({'index': index, 'file': job.get('file'), 'output': None,
+                            'status': 'cancelled', 'error': 'cancelled before rendering', 'seconds': 0.0})
+            continue
         try:
             # ---- unpack & sanitise ------------------------------------------------
             rng   = job.get('range') or {}
             start = int(rng.get('start', 0) or 0)
             end   = int(rng.get('end',   0) or 0)      # 0/None  â†’ slice helper expands
             keep  = job.get('instruments', [])
-            # fname = secure_filename(job.get('file', f'{uuid.uuid4()}.wav'))
-            name = job.get('file').replace("'", " Variation")  # replace ' with ' ariation
-            out_wav = (RENDER_ROOT / name).resolve()
-            out_wav.parent.mkdir(parents=True, exist_ok=True)
-            #remove _ from filename and replace with ' '
-            out_wav = out_wav.with_name(out_wav.name.replace('_', ' '))
-
-            # ---- slice + render ----------------------------------------------------
-            tmp_mid = _slice_midi(src, ticks_per_beat, start, end, keep)
-            try:
-                _midi_to_wav(tmp_mid, out_wav)
-                rendered += 1
-                app.logger.info(f'âœ… rendered {out_wav}')
-            finally:
-                tmp_mid.unlink(missing_ok=True)
+            out_wav = _job_output_path(job)
+
+            # ---- slice (in memory, straight to the synth) ----------------------------
+            midi_bytes = _slice_midi_bytes(src, ticks_per_beat, start, end, keep, tempo_map, song)
+
+            # ---- identical slices come straight from the render cache ----------------
+            cache_key = RENDER_CACHE.key(midi_bytes, 'midi', _normalisation(loudness))
+            if RENDER_CACHE.fetch(cache_key, out_wav):
+                results.append({'index': index, 'file': job.get('file'), 'output': str(out_wav),
+                                'status': 'ok', 'seconds': 0.0, 'cached': True})
+                advance()
+                continue
+            tasks.append({'index': index, 'file': job.get('file'), 'cache_key': cache_key,
+                          'midi_bytes': midi_bytes, 'wav_path': str(out_wav), 'loudness': loudness})
         except Exception as exc:
             app.logger.error(f"Render failed for {job.get('file')} â€“ {exc}", exc_info=True)
+            results.append({'index': index, 'file': job.get('file'), 'output': None,
+                            'status': 'error', 'error': str(exc), 'seconds': 0.0})
+            advance()
+
+    rendered_results = RENDER_ENGINE.render(tasks, on_result=lambda result: advance(), cancelled=cancelled)
+
+    for task, result in zip(tasks, rendered_results):
+        result['cached'] = False
+        if result['status'] == 'ok':
+            out_wav = result['output']
+            RENDER_CACHE.store(task['cache_key'], Path(out_wav))
+            app.logger.info(f'âœ… rendered {out_wav}')
+        elif result['status'] == 'error':
+            app.logger.error(f"Render failed for {result['file']}: {result['error']}")
+        results.append(result)
+    results.sort(key=lambda result: result['index'])
+    for result in results:
+        if result['status'] == 'ok':
+            _record_render(Path(result['output']), src, kind='slice', cached=result['cached'],
+                           **_job_details(jobs[result['index']]))
+
+    rendered = sum(1 for result in results if result['status'] == 'ok')
+    return {'rendered': rendered,
+            'failed': sum(1 for result in results if result['status'] == 'error'),
+            'cancelled': sum(1 for result in results if result['status'] == 'cancelled'),
+            'jobs': results}
+
+
+def _render_wav_stem_jobs(src: Path, ticks_per_beat: int, jobs: list, queued: RenderJob | None = None,
+                          loudness: dict | None = None) -> dict[str, object]:
+    """
+    Stem mode of /render_wav: every instrument the jobs keep is rendered
+    once over the whole song (stems are render-cached like any other render,
+    so later exports reuse them), then each job is cut from those stems and
+    mixed in NumPy. N jobs over K instruments cost K renders plus N mixes.
+    ``ticks_per_beat`` is written into the stems as into sliced renders, and
+    the cuts are timed at the same resolution, so both modes play alike.
+    Results have the same shape as the sliced mode's.
+    """
+    advance   = queued.advance if queued is not None else (lambda count=1: None)
+    cancelled = (lambda: queued.cancel_requested) if queued is not None else (lambda: False)
+
+    song = _loaded_song_for(src)
+    stems = StemSet(TempoMap(ticks_per_beat, song.tempo_map.tempos, song.tempo_map.time_signatures),
+                    RENDER_ENGINE.sample_rate)
+    positions = sorted({position for job in jobs for position in song.keep_positions(job.get('instruments', []))})
+    stem_errors = {}
+    results = []
+
+    # the stems stay in stem_dir until every job is cut from them
+    with tempfile.TemporaryDirectory() as stem_dir:
+        tasks = []
+        for position in positions:
+            if not len(song.table.tracks[position]):
+                continue
+            midi_bytes = _slice_midi_bytes(src, ticks_per_beat, 0, 0, [position], song.tempo_map, song)
+            cache_key  = RENDER_CACHE.key(midi_bytes, 'stem')
+            stem_wav   = Path(stem_dir) / f'{position}.wav'
+            if RENDER_CACHE.fetch(cache_key, stem_wav):
+                stems.add(position, stem_wav)
+                continue
+            tasks.append({'index': position, 'file': f'stem {position}', 'cache_key': cache_key,
+                          'midi_bytes': midi_bytes, 'wav_path': str(stem_wav)})
+
+        for task, result in zip(tasks, RENDER_ENGINE.render(tasks, cancelled=cancelled)):
+            if result['status'] == 'ok':
+                RENDER_CACHE.store(task['cache_key'], Path(result['output']))
+                stems.add(task['index'], Path(result['output']))
+            else:
+                app.logger.error(f"Stem render failed for track {task['index']}: {result['error']}")
+                stem_errors[task['index']] = result['error']
+
+        for index, job in enumerate(jobs):
+            entry = {'index': index, 'file': job.get('file'), 'output': None, 'cached': False}
+            if cancelled():
+                results.append({**entry, 'status': 'cancelled', 'error': 'cancelled before rendering', 'seconds': 0.0})
+                continue
+            started = time.perf_counter()
+            try:
+                rng   = job.get('range') or {}
+                start = int(rng.get('start', 0) or 0)
+                end   = int(rng.get('end',   0) or 0)      # 0/None: to the end of the song
+                keep  = song.keep_positions(job.get('instruments', []))
+                failed = [stem_errors[position] for position in keep if position in stem_errors]
+                if failed:
+                    raise RenderError(failed[0])
+
+                samples = stems.mix(keep, start, end)
+                if loudness is not None:
+                    samples = normalise_loudness(samples, stems.sample_rate, **loudness)
+                # outputs may share an inode with a render cache entry: replace, never write into
+                out_wav = _job_output_path(job)
+                tmp_wav = out_wav.with_name(f'.{out_wav.stem}.{os.getpid()}.tmp.wav')
+                write_wav(tmp_wav, samples, stems.sample_rate)
+                os.replace(tmp_wav, out_wav)
+                _record_render(out_wav, src, kind='stem-mix', cached=False, **_job_details(job))
+                entry.update(status='ok', output=str(out_wav))
+            except Exception as exc:
+                app.logger.error(f"Stem mix failed for {job.get('file')}: {exc}", exc_info=True)
+                entry.update(status='error', error=str(exc))
+            entry['seconds'] = round(time.perf_counter() - started, 3)
+            results.append(entry)
+            advance()
+
+    return {'rendered': sum(1 for result in results if result['status'] == 'ok'),
+            'failed': sum(1 for result in results if result['status'] == 'error'),
+            'cancelled': sum(1 for result in results if result['status'] == 'cancelled'),
+            'stems': len(stems.stems),
+            'jobs': results}
+
+
+@app.get('/render_stream')
+def render_stream():
+    """
+    Stream a preview of one selection while it is being synthesised:
+      GET /render_stream?song_id=file.mid&start=1920&end=3840&instruments=0,2
+    ``start``/``end`` and ``instruments`` mean what a /render_wav job's
+    range and instruments mean (end 0 or missing: to the end of the song;
+    no instruments: all of them). The answer is a chunked audio/wav whose
+    header goes out at once, followed by each block as the synth makes it,
+    so an <audio> element can start playing right away.
+    """
+    song_id = secure_filename(request.args.get('song_id', ''))
+    if not song_id:
+        abort(400, 'song_id is required')
+    src = (Path(app.config['UPLOAD_FOLDER']) / song_id).resolve()
+    if not src.is_file():
+        abort(404, f"MIDI file {song_id} not found")
+
+    try:
+        start = int(request.args.get('start', 0) or 0)
+        end   = int(request.args.get('end', 0) or 0)
+        keep  = [int(k) for k in request.args.get('instruments', '').split(',') if k.strip()]
+        ticks_per_beat = int(request.args.get('ticksPerBeat', 0) or 0)
+    except ValueError:
+        abort(400, 'start, end, instruments and ticksPerBeat must be integers')
+
+    try:
+        song = _loaded_song_for(src)
+    except (OSError, EOFError, ValueError) as e:
+        app.logger.error(f"Unable to read MIDI '{src}': {e}")
+        abort(400, f"could not read MIDI file {song_id}")
+    midi_bytes = _slice_midi_bytes(src, ticks_per_beat or song.ticks_per_beat, start, end, keep,
+                                   song.tempo_map, song)
+    blocks = RENDER_ENGINE.stream(midi_bytes)
+
+    def generate():
+        yield stream_wav_header(RENDER_ENGINE.sample_rate)
+        try:
+            for block in blocks:
+                yield block.astype('<i2', copy=False).tobytes()
+        except RenderError as e:
+            app.logger.error(f"Streaming {song_id} failed: {e}")
+        finally:
+            blocks.close()
+
+    return Response(generate(), mimetype='audio/wav',
+                    headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
+
+
+# ----------------------------------------------------------------------
+#  Background render queue: submit, poll status, cancel, fetch result
+# ----------------------------------------------------------------------
+RENDER_JOBS = JobQueue(context=app.app_context)
+
+
+def _render_job_status(queued: RenderJob) -> dict[str, object]:
+    return {
+        **queued.to_dict(),
+        'status_url': url_for('render_job_status', job_id=queued.id),
+        'result_url': url_for('render_job_result', job_id=queued.id),
+        'cancel_url': url_for('cancel_render_job', job_id=queued.id),
+    }
+
+
+def _queued_or_404(job_id: str) -> RenderJob:
+    queued = RENDER_JOBS.get(job_id)
+    if queued is None:
+        abort(404, f"Render job {job_id} not found")
+    return queued
+
+
+@app.post('/render_jobs')
+def submit_render_job():
+    """
+    Queue a render and answer 202 straight away.
+      { "type": "render_wav", ...same body as /render_wav... }
+    or
+      { "type": "render_abc", "abc": "...", "outfile": "x.wav" }
+      { "type": "render_abc", "items": [ {abc, outfile}, ... ] }
+    Poll status_url for progress, then read result_url.
+    """
+    data = request.get_json(force=True) or {}
+    kind = data.get('type', 'render_wav')
+
+    if kind == 'render_wav':
+        src, ticks_per_beat, jobs, loudness = _render_wav_request(data)
+        if jobs:
+            stems = bool(data.get('stems'))
+            queued = RENDER_JOBS.submit(
+                kind, lambda job: _render_wav_jobs(src, ticks_per_beat, jobs, job, loudness, stems), len(jobs))
+        else:
+            queued = RENDER_JOBS.submit(kind, lambda job: _render_whole_song(src, loudness), 1)
+    elif kind == 'render_abc':
+        items = data.get('items') or [{'abc': data.get('abc', ''), 'outfile': data.get('outfile')}]
+        if not all(isinstance(item, dict) and str(item.get('abc') or '').strip() for item in items):
+            abort(400, "No ABC passed")
+        queued = RENDER_JOBS.submit(kind, lambda job: _render_abc_items(items, job), len(items))
+    else:
+        abort(400, f"Unknown render type {kind!r}")
+
+    status = _render_job_status(queued)
+    return jsonify(status), 202, {'Location': status['status_url']}
+
+
+@app.get('/render_jobs')
+def list_render_jobs():
+    return jsonify({'jobs': [_render_job_status(queued) for queued in RENDER_JOBS.jobs()]})
+
+
+@app.get('/render_jobs/<job_id>')
+def render_job_status(job_id):
+    return jsonify(_render_job_status(_queued_or_404(job_id)))
+
+
+@app.post('/render_jobs/<job_id>/cancel')
+def cancel_render_job(job_id):
+    _queued_or_404(job_id)
+    return jsonify(_render_job_status(RENDER_JOBS.cancel(job_id)))
+
 
-    return jsonify({'rendered': rendered})
+@app.get('/render_jobs/<job_id>/result')
+def render_job_result(job_id):
+    queued = _queued_or_404(job_id)
+    if queued.state in ('queued', 'running'):
+        return jsonify({**_render_job_status(queued), 'result': None}), 409
+    status = 500 if queued.state == 'failed' else 200
+    return jsonify({**_render_job_status(queued), 'result': queued.result}), status
 
 
 def _midi_to_wav(midi_path: Path, wav_path: Path) -> None:
-    """Render with FluidSynth (change this if you use a different synth)."""
-    cmd = [
-        'fluidsynth',
-        '-ni', str(SOUNDFONT_SF2),
-        str(midi_path),
-        '-F', str(wav_path),
-        '-r', '44100'
-    ]
-    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    """Render with the in-process synth (change this if you use a different synth)."""
+    RENDER_ENGINE.render_file(midi_path, wav_path)
 # # â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
 
 
@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from smf_decoder import decode_smf_file, decode_with_mido
+
+
+def _best_time(fn, path: Path, repeat: int) -> tuple[float, object]:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(path)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _note_rows(song) -> list[list[tuple[int, int, int, int, int]]]:
+    return [
+        sorted(zip(track.start_tick.tolist(), track.duration_ticks.tolist(), track.pitch.tolist(),
+                   track.velocity.tolist(), track.channel.tolist()))
+        for track in song.tracks
+    ]
+
+
+def _same_song(left, right) -> bool:
+    if left.ticks_per_beat != right.ticks_per_beat or len(left.tracks) != len(right.tracks):
+        return False
+    for a, b in zip(left.tracks, right.tracks):
+        if (a.name, a.program, a.is_drum, a.tempos, a.time_signatures) != \
+           (b.name, b.program, b.is_drum, b.tempos, b.time_signatures):
+            return False
+    return _note_rows(left) == _note_rows(right)
+
+
+def run_benchmark(folder: Path, repeat: int) -> bool:
+    """
+    Decode every .mid/.midi file in ``folder`` with the mido reference path and
+    with the single-pass decoder, print per-file timings and check both agree.
+    """
+    files = sorted(p for p in folder.iterdir() if p.suffix.lower() in ('.mid', '.midi'))
+    if not files:
+        print(f"No MIDI files found in '{folder}'.")
+        return False
+
+    print(f"{'file':<40} {'KB':>7} {'notes':>7} {'mido ms':>9} {'smf ms':>8} {'speedup':>8}  match")
+    total_mido = total_fast = 0.0
+    all_match = True
+    for path in files:
+        try:
+            mido_time, reference = _best_time(decode_with_mido, path, repeat)
+        except Exception as exc:
+            print(f"{path.name:<40} mido failed: {exc}")
+            continue
+        fast_time, decoded = _best_time(decode_smf_file, path, repeat)
+        match = _same_song(reference, decoded)
+        all_match &= match
+        total_mido += mido_time
+        total_fast += fast_time
+        note_count = sum(len(track) for track in decoded.tracks)
+        print(f"{path.name[:40]:<40} {os.path.getsize(path) / 1024:>7.1f} {note_count:>7} "
+              f"{mido_time * 1000:>9.2f} {fast_time * 1000:>8.2f} {mido_time / max(fast_time, 1e-9):>7.1f}x  "
+              f"{'yes' if match else 'NO'}")
+
+    print(f"{'total':<40} {'':>7} {'':>7} {total_mido * 1000:>9.2f} {total_fast * 1000:>8.2f} "
+          f"{total_mido / max(total_fast, 1e-9):>7.1f}x")
+    return all_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the single-pass SMF decoder against the mido message loop."
+    )
+    parser.add_argument("folder", nargs="?", default="uploads",
+                        help="Folder of .mid files to decode (default: uploads).")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Decode each file this many times and keep the best time.")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_benchmark(Path(args.folder), max(1, args.repeat)) else 1)
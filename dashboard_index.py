@@ -0,0 +1,55 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, TypeVar
+
+
+T = TypeVar('T')
+
+
+class StatCache:
+    """
+    Values derived from files or directories, recomputed only when the
+    path's (mtime, size) signature changes. A directory's mtime moves
+    whenever an entry is added, removed or renamed in it, which is all a
+    listing depends on, so a stat stands in for re-reading or re-listing.
+    ``depends_on`` adds anything else the value was computed from. There is
+    one entry per (path, key): the caller names the computation, since
+    callables (every lambda is "<lambda>") cannot be told apart reliably.
+    """
+
+    __slots__ = ('hits', 'misses', '_entries', '_lock')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, tuple[tuple, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, key: str, compute: Callable[[Path], T], depends_on: tuple = ()) -> T:
+        """``compute(path)``, cached under (path, ``key``); raises FileNotFoundError when ``path`` is gone."""
+        path = os.path.abspath(path)
+        key = f'{path}\0{key}'
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            raise
+        signature = (st.st_mtime_ns, st.st_size, depends_on)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute(Path(path))
+        with self._lock:
+            self._entries[key] = (signature, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
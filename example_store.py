@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS examples (
+    song      TEXT NOT NULL,
+    category  TEXT NOT NULL,
+    id        TEXT NOT NULL,
+    function  TEXT NOT NULL DEFAULT '',
+    payload   TEXT NOT NULL,
+    saved_at  REAL NOT NULL,
+    PRIMARY KEY (song, category, id)
+);
+CREATE INDEX IF NOT EXISTS examples_by_category ON examples (category, song);
+CREATE INDEX IF NOT EXISTS examples_by_function ON examples (function);
+CREATE INDEX IF NOT EXISTS examples_by_id ON examples (id);
+CREATE INDEX IF NOT EXISTS examples_by_title ON examples (lower(song), function = '', lower(function), lower(id));
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+"""
+
+# /data/index.json sort keys -> ORDER BY; "title" is "<song> • <function>", or "<song>/<id>" without
+# one, and is the default, so it has an index of its own (examples_by_title)
+SORTS = {
+    'title':    "lower(song), function = '', lower(function), lower(id)",
+    'song':     'lower(song), category, id',
+    'category': 'category, lower(song), id',
+    'function': 'lower(function), lower(song), id',
+    'id':       'lower(id), song, category',
+    'saved':    'saved_at, song, category, id',
+}
+MTIME_SLACK = 0.001     # sync_tree: a file this close to its save time is the saved copy (mtime rounding)
+
+
+def example_path(song: str, category: str, example_id: str) -> str:
+    """The example's path in the training_data/<song>/<category>/<id>.json layout."""
+    return f'{song}/{category}/{example_id}.json'
+
+
+def split_example_path(path: str) -> tuple[str, str, str] | None:
+    """(song, category, id) of a "<song>/<category>/<id>.json" path; None for anything else."""
+    parts = PurePosixPath(path).parts
+    if len(parts) != 3 or not parts[2].endswith('.json') or '..' in parts:
+        return None
+    return parts[0], parts[1], parts[2][:-len('.json')]
+
+
+class ExampleStore:
+    """
+    Training examples in one SQLite database (WAL, so readers never wait
+    on a save) instead of one indented JSON file each. A row is a
+    (song, category, id) with the example's JSON and its "function"
+    pulled out, indexed by song, category, function and id. A batch save
+    is one transaction: all of it lands or none of it does, and it bumps
+    the store's revision, which is what index responses are tagged with.
+    With a ``tree``, every save is also written through to its
+    <tree>/<song>/<category>/<id>.json file, so the tracked JSON tree stays
+    the dataset and the (untracked) database an index over it.
+    """
+
+    def __init__(self, path: Path, tree: Path | None = None):
+        self.path = Path(path)
+        self.tree = Path(tree) if tree is not None else None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._dir_mtimes: dict[str, int] = {}     # sync_tree: directory -> mtime_ns when last listed
+        self._sync_lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection (sqlite3 connections stay on the thread that opened them)."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def put_many(self, song: str, category: str, examples: Iterable[dict], write_tree: bool = True) -> list[str]:
+        """
+        Save ``examples`` under song/category in one transaction and return
+        their ids; examples without an "id" get a fresh one. Saving an id
+        again replaces the example, as overwriting its file did. The files
+        are written through to the tree unless ``write_tree`` is off (for
+        examples read from it). Raises ValueError for a song, category or id
+        that is not a plain file name.
+        """
+        now = time.time()
+        ids = []
+        rows = []
+        for example in examples:
+            example_id = str(example.get('id') or uuid.uuid4().hex)
+            ids.append(example_id)
+            rows.append((song, category, example_id, str(example.get('function') or ''),
+                         json.dumps(example), now))
+        if not rows:
+            return ids
+        write_tree = write_tree and self.tree is not None
+        if write_tree:
+            bad = next((name for name in (song, category, *ids) if not _plain_name(name)), None)
+            if bad is not None:
+                raise ValueError(f'{bad!r} cannot be a file name in the example tree')
+        with self._connect() as db:
+            db.executemany('INSERT OR REPLACE INTO examples (song, category, id, function, payload, saved_at) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            db.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        if write_tree:
+            for _, _, example_id, _, payload, _ in rows:
+                _write_example(self.tree, song, category, example_id, payload, now)
+        return ids
+
+    def delete_many(self, song: str, category: str, example_ids: Iterable[str] | None = None) -> int:
+        """
+        Drop these examples (every example under song/category when
+        ``example_ids`` is None) in one transaction; returns how many went.
+        """
+        with self._connect() as db:
+            if example_ids is None:
+                removed = db.execute('DELETE FROM examples WHERE song = ? AND category = ?', (song, category)).rowcount
+            else:
+                removed = db.executemany('DELETE FROM examples WHERE song = ? AND category = ? AND id = ?',
+                                         [(song, category, example_id) for example_id in example_ids]).rowcount
+            if removed:
+                db.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        return removed
+
+    def revision(self) -> int:
+        """Number of saves so far; changes whenever any example does."""
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def get_text(self, song: str, category: str, example_id: str) -> str | None:
+        """The example's JSON text, or None."""
+        row = self._connect().execute('SELECT payload FROM examples WHERE song = ? AND category = ? AND id = ?',
+                                      (song, category, example_id)).fetchone()
+        return row[0] if row else None
+
+    def get_saved(self, song: str, category: str, example_id: str) -> tuple[str, float] | None:
+        """(JSON text, time saved) of the example, or None."""
+        return self._connect().execute('SELECT payload, saved_at FROM examples '
+                                       'WHERE song = ? AND category = ? AND id = ?',
+                                       (song, category, example_id)).fetchone()
+
+    def locate(self, example_id: str) -> tuple[str, str] | None:
+        """(song, category) of an example with this id, if any; the first by song and category."""
+        return self._connect().execute('SELECT song, category FROM examples WHERE id = ? '
+                                       'ORDER BY song, category LIMIT 1', (example_id,)).fetchone()
+
+    def get(self, song: str, category: str, example_id: str) -> dict | None:
+        text = self.get_text(song, category, example_id)
+        return None if text is None else json.loads(text)
+
+    def find(self, song: str | None = None, category: str | None = None, function: str | None = None,
+             query: str | None = None, sort: str = 'title', descending: bool = False,
+             limit: int | None = None, offset: int = 0) -> list[dict[str, str]]:
+        """
+        Index rows (id, song, category, function, path) matching the filters,
+        ordered by one of SORTS. ``query`` is a case-insensitive substring of
+        the song, function or id.
+        """
+        where, params = self._where(song, category, function, query)
+        order = SORTS[sort]
+        if descending:
+            order = ', '.join(f'{term} DESC' for term in order.split(', '))
+        sql = f'SELECT id, song, category, function FROM examples{where} ORDER BY {order}'
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else int(limit), int(offset)]
+        return [{'id': example_id, 'song': song, 'category': category, 'function': function,
+                 'path': example_path(song, category, example_id)}
+                for example_id, song, category, function in self._connect().execute(sql, params)]
+
+    def count(self, song: str | None = None, category: str | None = None, function: str | None = None,
+              query: str | None = None) -> int:
+        where, params = self._where(song, category, function, query)
+        return self._connect().execute(f'SELECT count(*) FROM examples{where}', params).fetchone()[0]
+
+    def category_counts(self) -> list[tuple[str, str, int]]:
+        """(song, category, examples) for every song and category with examples."""
+        return self._connect().execute('SELECT song, category, count(*) FROM examples '
+                                       'GROUP BY song, category ORDER BY song, category').fetchall()
+
+    def items(self) -> Iterator[tuple[str, str, str, str, float]]:
+        """Every (song, category, id, JSON text, time saved), in path order."""
+        yield from self._connect().execute('SELECT song, category, id, payload, saved_at FROM examples '
+                                           'ORDER BY song, category, id')
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def sync_tree(self, root: Path) -> int:
+        """
+        Make the store follow the <song>/<category>/<id>.json tree edited by
+        hand: import new files and ones rewritten since they were saved, and
+        drop examples whose file (or whole folder) was deleted. Only
+        directories whose mtime moved since the last call (an entry was
+        added, removed or replaced) are listed again, so an unchanged tree
+        costs one stat per directory. Returns the number of examples imported.
+        """
+        root = Path(root)
+        if not root.is_dir():
+            return 0
+        imported = 0
+        with self._sync_lock:
+            folders_moved = self._moved(root)
+            present = set()
+            for song_dir in _subdirs(root):
+                folders_moved |= self._moved(song_dir)
+                for category_dir in _subdirs(song_dir):
+                    present.add((song_dir.name, category_dir.name))
+                    try:
+                        mtime = os.stat(category_dir).st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+                    if self._dir_mtimes.get(str(category_dir)) == mtime:
+                        continue
+                    imported += self._sync_directory(song_dir.name, category_dir)
+                    self._dir_mtimes[str(category_dir)] = mtime
+            if folders_moved:
+                # a song or category folder may have gone: so do its examples
+                for song, category, _ in self.category_counts():
+                    if (song, category) not in present:
+                        self.delete_many(song, category)
+                        self._dir_mtimes.pop(str(root / song / category), None)
+        return imported
+
+    def _moved(self, folder: Path) -> bool:
+        """Whether ``folder``'s entries changed since it was last looked at (and remember its mtime)."""
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except FileNotFoundError:
+            return True
+        moved = self._dir_mtimes.get(str(folder)) != mtime
+        self._dir_mtimes[str(folder)] = mtime
+        return moved
+
+    def _sync_directory(self, song: str, folder: Path) -> int:
+        saved = dict(self._connect().execute('SELECT id, saved_at FROM examples WHERE song = ? AND category = ?',
+                                             (song, folder.name)))
+        examples = []
+        on_disk = set()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json') or not entry.is_file():
+                    continue
+                example_id = entry.name[:-len('.json')]
+                on_disk.add(example_id)
+                if example_id in saved and entry.stat().st_mtime <= saved[example_id] + MTIME_SLACK:
+                    continue
+                try:
+                    example = json.loads(Path(entry.path).read_text())
+                except (OSError, ValueError):
+                    continue
+                if isinstance(example, dict):
+                    examples.append({**example, 'id': example_id})
+        self.delete_many(song, folder.name, saved.keys() - on_disk)
+        return len(self.put_many(song, folder.name, examples, write_tree=False))
+
+    @staticmethod
+    def _where(song: str | None, category: str | None, function: str | None,
+               query: str | None = None) -> tuple[str, list]:
+        clauses, params = [], []
+        for column, value in (('song', song), ('category', category), ('function', function)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if query:
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append("(song LIKE ? ESCAPE '\\' OR function LIKE ? ESCAPE '\\' OR id LIKE ? ESCAPE '\\')")
+            params += [pattern] * 3
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def _plain_name(name: str) -> bool:
+    return bool(name) and name not in ('.', '..') and '/' not in name and '\\' not in name
+
+
+def _write_example(root: Path, song: str, category: str, example_id: str, text: str, saved_at: float) -> None:
+    """
+    <root>/<song>/<category>/<id>.json, indented as the tree always was and
+    with the save time as its mtime, so sync_tree knows it for the saved copy.
+    """
+    json_path = Path(root) / song / category / f'{example_id}.json'
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = json_path.with_name(f'.{json_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_text(json.dumps(json.loads(text), indent=2))
+    os.utime(tmp_path, (saved_at, saved_at))
+    os.replace(tmp_path, json_path)
+
+
+def _subdirs(path: Path) -> list[Path]:
+    try:
+        with os.scandir(path) as entries:
+            return [Path(entry.path) for entry in entries if entry.is_dir()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def import_tree(root: Path, store: ExampleStore, batch_size: int = 500) -> tuple[int, int]:
+    """
+    Load every training_data/<song>/<category>/<id>.json under ``root``
+    into ``store``, ``batch_size`` examples per transaction. Returns
+    (imported, skipped); files that are not a JSON object are skipped.
+    """
+    imported = skipped = 0
+    batches: dict[tuple[str, str], list[dict]] = {}
+
+    def flush(song: str, category: str) -> None:
+        nonlocal imported
+        imported += len(store.put_many(song, category, batches.pop((song, category)), write_tree=False))
+
+    for json_path in sorted(Path(root).rglob('*.json')):
+        parts = json_path.relative_to(root).parts
+        try:
+            example = json.loads(json_path.read_text())
+        except (OSError, ValueError):
+            example = None
+        if len(parts) != 3 or not isinstance(example, dict):
+            skipped += 1
+            continue
+        song, category = parts[0], parts[1]
+        # the file name is the example's id, whatever the payload says
+        batches.setdefault((song, category), []).append({**example, 'id': json_path.stem})
+        if len(batches[song, category]) >= batch_size:
+            flush(song, category)
+    for song, category in list(batches):
+        flush(song, category)
+    return imported, skipped
+
+
+def export_tree(store: ExampleStore, root: Path) -> int:
+    """
+    Write every stored example back out as <root>/<song>/<category>/<id>.json;
+    returns the count. Files get the example's save time as their mtime, so
+    sync_tree does not take them for hand edits and import them again.
+    """
+    written = 0
+    for song, category, example_id, text, saved_at in store.items():
+        _write_example(root, song, category, example_id, text, saved_at)
+        written += 1
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move training examples between the JSON tree and the example store.")
+    parser.add_argument("command", choices=("migrate", "export"),
+                        help="migrate: load the JSON tree into the store; export: write the store out as a JSON tree.")
+    parser.add_argument("--root", default="training_data",
+                        help="Training data folder (default: training_data).")
+    parser.add_argument("--db", default=None,
+                        help="Example store database (default: <root>/examples.sqlite3).")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    store = ExampleStore(Path(args.db) if args.db else root / 'examples.sqlite3')
+    started = time.perf_counter()
+    if args.command == "migrate":
+        imported, skipped = import_tree(root, store)
+        print(f"{imported} examples imported, {skipped} files skipped, {len(store)} in {store.path}, "
+              f"{time.perf_counter() - started:.2f}s")
+        sys.exit(1 if skipped else 0)
+    written = export_tree(store, root)
+    print(f"{written} examples written under {root}, {time.perf_counter() - started:.2f}s")
@@ -2,7 +2,8 @@ import json
 import re
 from collections import Counter
 from datetime import datetime, timezone
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterable, Iterator
 
 
 def _load_json_file(path: Path, default):
@@ -19,6 +20,13 @@ def _relative_path(path: Path, root: Path) -> str:
         return path.name
 
 
+def _dataset_files(data_root: Path) -> Iterator[tuple[str, object]]:
+    """(path relative to data_root, payload or None) of every dataset JSON file."""
+    if data_root.exists():
+        for json_path in sorted(data_root.rglob('*.json')):
+            yield _relative_path(json_path, data_root), _load_json_file(json_path, None)
+
+
 def _normalized_label(label: object) -> str:
     if not isinstance(label, str):
         return ''
@@ -124,7 +132,12 @@ def summarize_dataset_payload(payload: object) -> dict[str, object]:
     }
 
 
-def build_heuristic_audit_snapshot(settings_dir: Path, data_root: Path, snapshot_path: Path | None = None) -> dict[str, object]:
+def build_heuristic_audit_snapshot(settings_dir: Path, data_root: Path, snapshot_path: Path | None = None,
+                                   dataset: Iterable[tuple[str, object]] | None = None) -> dict[str, object]:
+    """
+    ``dataset`` is the training examples as (<song>/<category>/<id>.json,
+    payload) pairs; by default they are read from the files under data_root.
+    """
     generated_at = datetime.now(timezone.utc).isoformat()
     settings_dir = settings_dir.resolve()
     data_root = data_root.resolve()
@@ -195,35 +208,35 @@ def build_heuristic_audit_snapshot(settings_dir: Path, data_root: Path, snapshot
                 'relationshipTypeCounts': summary['relationshipTypeCounts'],
             })
 
-    if data_root.exists():
-        for json_path in sorted(data_root.rglob('*.json')):
-            payload = _load_json_file(json_path, None)
-            if not isinstance(payload, dict):
-                issues.append({
-                    'kind': 'dataset',
-                    'path': _relative_path(json_path, data_root),
-                    'message': 'Dataset payload is not a JSON object.',
-                })
-                continue
-
-            summary = summarize_dataset_payload(payload)
-            dataset_summary['fileCount'] += 1
-            dataset_summary['topLevelKeyCounts'].update(summary['topLevelKeys'])
-            dataset_summary['categoryCounts'][json_path.parent.name] += 1
-            if summary['function']:
-                dataset_summary['functionCounts'][str(summary['function'])] += 1
-            if len(json_path.parts) >= 3:
-                dataset_summary['songs'][json_path.parts[-3]] += 1
-
-            items.append({
+    for rel_path, payload in (dataset if dataset is not None else _dataset_files(data_root)):
+        if not isinstance(payload, dict):
+            issues.append({
                 'kind': 'dataset',
-                'label': f"{json_path.parts[-3]}/{json_path.parent.name}/{json_path.stem}",
-                'path': _relative_path(json_path, data_root),
-                'song': json_path.parts[-3],
-                'category': json_path.parent.name,
-                'function': summary['function'],
-                'topLevelKeys': summary['topLevelKeys'],
+                'path': rel_path,
+                'message': 'Dataset payload is not a JSON object.',
             })
+            continue
+
+        example_path = PurePosixPath(rel_path)
+        song = example_path.parts[-3] if len(example_path.parts) >= 3 else ''
+        summary = summarize_dataset_payload(payload)
+        dataset_summary['fileCount'] += 1
+        dataset_summary['topLevelKeyCounts'].update(summary['topLevelKeys'])
+        dataset_summary['categoryCounts'][example_path.parent.name] += 1
+        if summary['function']:
+            dataset_summary['functionCounts'][str(summary['function'])] += 1
+        if song:
+            dataset_summary['songs'][song] += 1
+
+        items.append({
+            'kind': 'dataset',
+            'label': f"{song}/{example_path.parent.name}/{example_path.stem}",
+            'path': rel_path,
+            'song': song,
+            'category': example_path.parent.name,
+            'function': summary['function'],
+            'topLevelKeys': summary['topLevelKeys'],
+        })
 
     label_variant_groups = []
     for normalized, raw_values in sorted(label_groups.items()):
@@ -282,12 +295,16 @@ def _resolve_audit_source(kind: str, rel_path: str, settings_dir: Path, data_roo
     return wanted
 
 
-def build_heuristic_audit_source_detail(kind: str, rel_path: str, settings_dir: Path, data_root: Path) -> dict[str, object]:
+def build_heuristic_audit_source_detail(kind: str, rel_path: str, settings_dir: Path, data_root: Path,
+                                        load_dataset: Callable[[str], object] | None = None) -> dict[str, object]:
+    """``load_dataset(rel_path)`` fetches a dataset payload (None: missing) instead of reading its file."""
     source_path = _resolve_audit_source(kind, rel_path, settings_dir, data_root)
-    if not source_path.exists() or not source_path.is_file():
+    if kind == 'dataset' and load_dataset is not None:
+        payload = load_dataset(rel_path)
+    elif not source_path.exists() or not source_path.is_file():
         raise FileNotFoundError(rel_path)
-
-    payload = _load_json_file(source_path, None)
+    else:
+        payload = _load_json_file(source_path, None)
     if payload is None:
         raise FileNotFoundError(rel_path)
 
@@ -3,6 +3,9 @@ import re
 from collections import Counter, defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable
+
+from note_table import NoteTable
 
 
 EXPORT_VERSION = 3
@@ -594,7 +597,33 @@ def _build_section_asset_manifests(
     return manifests
 
 
-def build_heuristic_song_export(settings_path: Path) -> dict[str, object]:
+def _pattern_note_count(pattern: dict[str, object], notes: NoteTable | None) -> int | None:
+    if notes is None:
+        return None
+    pattern_range = pattern.get('range')
+    if not isinstance(pattern_range, dict):
+        return None
+    try:
+        start = int(pattern_range.get('start', 0) or 0)
+        end = int(pattern_range.get('end', 0) or 0)
+        low = pattern_range.get('low')
+        high = pattern_range.get('high')
+        low = int(low) if low is not None else None
+        high = int(high) if high is not None else None
+    except (TypeError, ValueError):
+        return None
+    if end == 0:    # open-ended, as when rendering: to the end of the song
+        end = notes.max_tick()
+
+    instruments = pattern.get('instruments')
+    positions = None
+    if isinstance(instruments, list) and instruments:
+        positions = [index for index in instruments if isinstance(index, int)]
+    mode = 'start' if pattern.get('mode') == 'start' else 'range'
+    return notes.count_in_window(start, end, positions, mode, low, high)
+
+
+def build_heuristic_song_export(settings_path: Path, notes: NoteTable | None = None) -> dict[str, object]:
     payload = _load_json_file(settings_path, {})
     if not isinstance(payload, dict):
         raise ValueError(f'Invalid settings payload: {settings_path}')
@@ -891,6 +920,7 @@ def build_heuristic_song_export(settings_path: Path) -> dict[str, object]:
             'instruments': pattern.get('instruments', []),
             'instrumentCount': len(pattern.get('instruments', [])) if isinstance(pattern.get('instruments'), list) else 0,
             'mode': pattern.get('mode'),
+            'noteCount': _pattern_note_count(pattern, notes),
             'variantOf': pattern.get('variantOf'),
             'variantOfName': pattern.get('variantOfName'),
             'flags': {
@@ -1055,13 +1085,19 @@ def build_heuristic_song_export(settings_path: Path) -> dict[str, object]:
             'containerKindCounts': dict(container_kind_counts.most_common()),
             'sectionFamilyModeCounts': dict(section_family_mode_counts.most_common()),
             'labelVariantGroups': label_variant_groups[:20],
+            'noteCount': len(notes) if notes is not None else None,
             'issueCount': len(issues),
         },
         'issues': issues,
     }
 
 
-def build_heuristic_export_snapshot(settings_dir: Path, export_root: Path, snapshot_path: Path) -> dict[str, object]:
+def build_heuristic_export_snapshot(
+    settings_dir: Path,
+    export_root: Path,
+    snapshot_path: Path,
+    note_loader: Callable[[Path], NoteTable | None] | None = None,
+) -> dict[str, object]:
     generated_at = datetime.now(timezone.utc).isoformat()
     settings_dir = settings_dir.resolve()
     export_root = export_root.resolve()
@@ -1095,7 +1131,8 @@ def build_heuristic_export_snapshot(settings_dir: Path, export_root: Path, snaps
 
     for settings_file in sorted(settings_dir.glob('*.json')):
         try:
-            song_export = build_heuristic_song_export(settings_file)
+            notes = note_loader(settings_file) if note_loader is not None else None
+            song_export = build_heuristic_song_export(settings_file, notes)
         except Exception as exc:
             issues.append({
                 'kind': 'settings_export',
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import miditoolkit
+import numpy as np
+
+from note_index import NoteIndex
+from note_table import NoteTable, TrackNotes
+from tempo_map import TempoMap
+
+
+class LoadedSong:
+    """
+    A source MIDI parsed once for repeated slicing: every instrument's notes
+    sorted by start tick behind an interval index, plus the tempo map.
+    A slice is two binary searches per instrument and a vectorised shift,
+    so N ranges cost one parse plus N cheap slices.
+
+    Track positions are miditoolkit instrument indices, which is what the
+    ``instruments`` of a render job refer to.
+    """
+
+    def __init__(self, mt: miditoolkit.MidiFile, tempo_map: TempoMap | None = None):
+        self.ticks_per_beat = mt.ticks_per_beat
+        self.table = NoteTable([track.sorted_by_start() for track in NoteTable.from_miditoolkit(mt).tracks])
+        self.index = NoteIndex(self.table)
+        self.tempo_map = tempo_map or TempoMap.from_miditoolkit(mt)
+
+    @classmethod
+    def load(cls, path: Path, tempo_map: TempoMap | None = None) -> 'LoadedSong':
+        return cls(miditoolkit.MidiFile(path), tempo_map)
+
+    def max_tick(self) -> int:
+        return self.table.max_tick()
+
+    def keep_positions(self, keep_tracks) -> list[int]:
+        """Instrument indices to keep: all of them for an empty selection, out-of-range indices ignored."""
+        count = len(self.table.tracks)
+        if not keep_tracks:
+            return list(range(count))
+        return sorted({k for k in keep_tracks if 0 <= k < count})
+
+    def slice(self, start_tick: int, end_tick: int, keep_tracks) -> NoteTable:
+        """
+        Notes of the kept instruments overlapping [start_tick, end_tick),
+        shifted so ``start_tick`` lands on tick 0 (notes already sounding are
+        clamped to 0). Instruments without notes in the range are included empty.
+        """
+        tracks = []
+        for position, indices in self.index.query(start_tick, end_tick, self.keep_positions(keep_tracks)):
+            track = self.table.tracks[position].take(indices)
+            starts = np.maximum(track.start_tick - start_tick, 0)
+            ends = np.maximum(track.end_tick - start_tick, 0)
+            tracks.append(TrackNotes(
+                track.track_index, track.name, track.instrument, track.is_drum_track,
+                starts, ends - starts, track.pitch, track.velocity,
+                program=track.program,
+            ))
+        return NoteTable(tracks)
@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+
+
+DEFAULT_TARGET_LUFS = -24.0     # ffmpeg loudnorm's default integrated target
+DEFAULT_PEAK_DBFS = -2.0        # ffmpeg loudnorm's default ceiling (sample peak here)
+
+BLOCK_SECONDS = 0.4             # BS.1770 gating block
+STEP_SECONDS = 0.1              # 75 % block overlap
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+FILTER_TAIL_SECONDS = 0.25      # both K-weighting stages have decayed far below 16-bit by then
+OLA_BLOCK_FRAMES = 1 << 16      # k_weight's overlap-add block
+
+
+def _k_weighting_biquads(sample_rate: int) -> list[tuple[tuple[float, float, float], tuple[float, float, float]]]:
+    """
+    BS.1770 K-weighting for any sample rate: the high-shelf pre-filter and
+    the RLB high-pass, as (b, a) biquads (coefficients as in libebur128).
+    """
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+    )
+
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    high_pass = ((1.0, -2.0, 1.0), (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0))
+    return [shelf, high_pass]
+
+
+def k_weight(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    K-weighted copy of float (frames, channels) samples. The biquads are
+    applied in the frequency domain, so no per-sample Python loop or SciPy
+    is needed; the signal goes through in OLA_BLOCK_FRAMES blocks whose
+    filtered output (block plus tail) is overlap-added, so memory stays
+    flat however long the render is. That is FIR filtering with the
+    biquads' impulse response cut at FILTER_TAIL_SECONDS (the rest wraps
+    around each block's FFT), not the recursion itself: the cut-off part of
+    the response sums to ~2.4e-25 in absolute value at 22.05-48 kHz, which
+    bounds the error per sample relative to the input's peak, far below
+    float64 rounding.
+    """
+    frames = samples.shape[0]
+    n_fft = 1 << (OLA_BLOCK_FRAMES + int(FILTER_TAIL_SECONDS * sample_rate) - 1).bit_length()
+    z = np.exp(-1j * np.linspace(0.0, math.pi, n_fft // 2 + 1))
+    response = np.ones_like(z)
+    for b, a in _k_weighting_biquads(sample_rate):
+        response *= (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    weighted = np.zeros(samples.shape, dtype=np.float64)
+    for start in range(0, frames, OLA_BLOCK_FRAMES):
+        spectrum = np.fft.rfft(samples[start:start + OLA_BLOCK_FRAMES], n=n_fft, axis=0) * response[:, None]
+        tail = weighted[start:start + n_fft]
+        tail += np.fft.irfft(spectrum, n=n_fft, axis=0)[:tail.shape[0]]
+    return weighted
+
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    ITU-R BS.1770-4 gated integrated loudness in LUFS of float samples
+    (frames, channels) in [-1, 1]; -inf for silence. Front channels only,
+    all weighted 1.0, which covers the mono/stereo renders here.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.shape[0] == 0:
+        return float('-inf')
+
+    energy = np.square(k_weight(samples, sample_rate))
+    block = int(round(BLOCK_SECONDS * sample_rate))
+    step = int(round(STEP_SECONDS * sample_rate))
+    if samples.shape[0] <= block:
+        block_power = energy.mean(axis=0)[None, :]
+    else:
+        cumulative = np.concatenate((np.zeros((1, energy.shape[1])), np.cumsum(energy, axis=0)))
+        starts = np.arange(0, samples.shape[0] - block + 1, step)
+        block_power = (cumulative[starts + block] - cumulative[starts]) / block
+    block_power = block_power.sum(axis=1)
+
+    with np.errstate(divide='ignore'):
+        block_loudness = -0.691 + 10 * np.log10(block_power)
+    gated = block_power[block_loudness > ABSOLUTE_GATE_LUFS]
+    if gated.size == 0:
+        return float('-inf')
+    relative_gate = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE_LU
+    gated = block_power[block_loudness > max(relative_gate, ABSOLUTE_GATE_LUFS)]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+def normalise_loudness(samples: np.ndarray, sample_rate: int,
+                       target_lufs: float = DEFAULT_TARGET_LUFS,
+                       peak_dbfs: float = DEFAULT_PEAK_DBFS) -> np.ndarray:
+    """
+    Scale int16 (frames, channels) samples to ``target_lufs`` with one linear
+    gain, lowered if needed so the sample peak stays under ``peak_dbfs``.
+    Silence is returned unchanged.
+    """
+    audio = samples.astype(np.float64) / 32768.0
+    loudness = integrated_loudness(audio, sample_rate)
+    if not math.isfinite(loudness):
+        return samples
+
+    gain = 10 ** ((target_lufs - loudness) / 20)
+    peak = float(np.abs(audio).max())
+    if peak > 0:
+        gain = min(gain, 10 ** (peak_dbfs / 20) / peak)
+    return np.clip(np.rint(audio * gain * 32768.0), -32768, 32767).astype(np.int16)
@@ -0,0 +1,142 @@
+import numpy as np
+
+from note_table import NoteTable, TrackNotes
+
+
+DEFAULT_MAX_NOTES = 4000        # above this a window is summarised when lod='auto'
+DEFAULT_BLOCK_COUNT = 256       # buckets across the window in block mode
+BUCKET_FANOUT = 64              # TrackIndex: notes per end-tick bucket, and buckets per bucket above
+
+
+class TrackIndex:
+    """
+    Interval index over one track: notes sorted by start tick plus the running
+    maximum of their end ticks. Because that maximum never decreases, both
+    bounds of an overlap query are a binary search. One long early note holds
+    it up for the rest of the song, though, so the notes between the bounds
+    are narrowed with a tree of bucket maxima: BUCKET_FANOUT notes per bucket,
+    BUCKET_FANOUT buckets per bucket on the level above, each holding the
+    largest end tick under it. A query descends only into buckets that reach
+    the window, so it checks about the notes it returns plus one bucket's
+    worth per level rather than everything after the long note.
+    """
+
+    __slots__ = ('track', 'order', 'starts', 'ends', 'max_end', 'levels')
+
+    def __init__(self, track: TrackNotes):
+        self.track = track
+        self.order = np.argsort(track.start_tick, kind='stable')
+        # int64, as searchsorted would otherwise convert the whole int32 column for a Python int key
+        self.starts = track.start_tick[self.order].astype(np.int64)
+        self.ends = track.end_tick[self.order].astype(np.int64)
+        self.max_end = np.maximum.accumulate(self.ends) if self.ends.size else self.ends
+        self.levels: list[np.ndarray] = []      # bucket maxima, finest first
+        level = self.ends
+        while level.size > BUCKET_FANOUT:
+            level = np.maximum.reduceat(level, np.arange(0, level.size, BUCKET_FANOUT))
+            self.levels.append(level)
+
+    def query(self, start_tick: int, end_tick: int, low: int | None = None, high: int | None = None) -> np.ndarray:
+        """Indices into the track's note columns of notes overlapping [start_tick, end_tick), in start order."""
+        first = int(np.searchsorted(self.max_end, start_tick, side='right'))
+        stop = int(np.searchsorted(self.starts, end_tick, side='left'))
+        if first >= stop:
+            return np.empty(0, dtype=np.int64)
+
+        width = BUCKET_FANOUT ** len(self.levels)
+        slots = np.arange(first // width, (stop - 1) // width + 1)
+        for maxima in reversed(self.levels):
+            slots = slots[maxima[slots] > start_tick]
+            width //= BUCKET_FANOUT
+            slots = (slots[:, None] * BUCKET_FANOUT + np.arange(BUCKET_FANOUT)).ravel()
+            slots = slots[(slots >= first // width) & (slots <= (stop - 1) // width)]
+
+        candidates = self.order[slots]
+        mask = self.ends[slots] > start_tick
+        if low is not None:
+            mask &= self.track.pitch[candidates] >= low
+        if high is not None:
+            mask &= self.track.pitch[candidates] <= high
+        return candidates[mask]
+
+
+class NoteIndex:
+    """Per-track interval indexes for a NoteTable; track positions follow the table (UI order)."""
+
+    def __init__(self, table: NoteTable):
+        self.table = table
+        self.tracks = [TrackIndex(track) for track in table.tracks]
+
+    def query(self, start_tick: int, end_tick: int, positions=None,
+              low: int | None = None, high: int | None = None) -> list[tuple[int, np.ndarray]]:
+        wanted = range(len(self.tracks)) if positions is None else positions
+        return [
+            (position, self.tracks[position].query(start_tick, end_tick, low, high))
+            for position in wanted
+            if 0 <= position < len(self.tracks)
+        ]
+
+    def window(self, start_tick: int, end_tick: int, positions=None,
+               low: int | None = None, high: int | None = None,
+               lod: str = 'auto', max_notes: int = DEFAULT_MAX_NOTES,
+               block_ticks: int | None = None) -> dict[str, object]:
+        """
+        JSON-ready window of notes. ``lod='notes'`` always returns individual
+        notes, ``lod='blocks'`` always returns summary blocks, and ``lod='auto'``
+        switches to blocks once the window holds more than ``max_notes``.
+        Individual notes carry ``note_index`` (position in the track's note list).
+        """
+        hits = self.query(start_tick, end_tick, positions, low, high)
+        total = sum(int(indices.size) for _, indices in hits)
+        use_blocks = lod == 'blocks' or (lod == 'auto' and total > max_notes)
+
+        if use_blocks and not block_ticks:
+            block_ticks = max(1, -(-(end_tick - start_tick) // DEFAULT_BLOCK_COUNT))
+
+        tracks = []
+        for position, indices in hits:
+            track = self.tracks[position].track
+            if use_blocks:
+                tracks.append({'track': position, 'blocks': _summarise(track, indices, start_tick, block_ticks)})
+            else:
+                tracks.append({
+                    'track': position,
+                    'note_index': indices.tolist(),
+                    'start_tick': track.start_tick[indices].tolist(),
+                    'duration_ticks': track.duration_ticks[indices].tolist(),
+                    'pitch': track.pitch[indices].tolist(),
+                    'velocity': track.velocity[indices].tolist(),
+                })
+
+        return {
+            'start': start_tick,
+            'end': end_tick,
+            'lod': 'blocks' if use_blocks else 'notes',
+            'block_ticks': block_ticks if use_blocks else None,
+            'note_count': total,
+            'tracks': tracks,
+        }
+
+
+def _summarise(track: TrackNotes, indices: np.ndarray, origin: int, block_ticks: int) -> dict[str, list]:
+    """Collapse the notes at ``indices`` (start order) into fixed-width tick buckets."""
+    if indices.size == 0:
+        return {key: [] for key in ('start_tick', 'end_tick', 'low', 'high', 'count', 'velocity')}
+
+    starts = track.start_tick[indices]
+    ends = starts + track.duration_ticks[indices]
+    pitches = track.pitch[indices]
+    velocities = track.velocity[indices].astype(np.int64)
+
+    buckets = np.maximum(starts - origin, 0) // block_ticks
+    boundaries = np.flatnonzero(np.diff(buckets, prepend=-1))
+    counts = np.diff(np.append(boundaries, buckets.size))
+    bucket_ids = buckets[boundaries]
+    return {
+        'start_tick': (origin + bucket_ids * block_ticks).tolist(),
+        'end_tick': np.maximum.reduceat(ends, boundaries).tolist(),
+        'low': np.minimum.reduceat(pitches, boundaries).tolist(),
+        'high': np.maximum.reduceat(pitches, boundaries).tolist(),
+        'count': counts.tolist(),
+        'velocity': np.rint(np.add.reduceat(velocities, boundaries) / counts).astype(int).tolist(),
+    }
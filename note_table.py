@@ -0,0 +1,242 @@
+import json
+import struct
+
+import numpy as np
+
+
+# One row per note for the whole song. ``track`` is the track's position in the
+# owning NoteTable (UI order), not the raw MIDI track index.
+NOTE_DTYPE = np.dtype([
+    ('track', '<i4'),
+    ('start_tick', '<i4'),
+    ('duration_ticks', '<i4'),
+    ('pitch', 'u1'),
+    ('velocity', 'u1'),
+])
+
+PAYLOAD_MAGIC = b'MNT1'
+PAYLOAD_COLUMNS = (('start_tick', '<i4'), ('duration_ticks', '<i4'), ('pitch', 'u1'), ('velocity', 'u1'))
+
+
+class TrackNotes:
+    """
+    Notes of a single track as parallel columns (int32 ticks, uint8 pitch and
+    velocity) plus the track metadata the piano roll shows in its track list.
+    """
+
+    __slots__ = (
+        'track_index', 'name', 'instrument', 'is_drum_track', 'program',
+        'start_tick', 'duration_ticks', 'pitch', 'velocity',
+    )
+
+    def __init__(self, track_index: int, name: str, instrument: str, is_drum_track: bool,
+                 start_tick, duration_ticks, pitch, velocity, program: int | None = None):
+        self.track_index = int(track_index)
+        self.name = name
+        self.instrument = instrument
+        self.is_drum_track = bool(is_drum_track)
+        self.program = program
+        self.start_tick = np.asarray(start_tick, dtype=np.int32)
+        self.duration_ticks = np.asarray(duration_ticks, dtype=np.int32)
+        self.pitch = np.asarray(pitch, dtype=np.uint8)
+        self.velocity = np.asarray(velocity, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return int(self.start_tick.size)
+
+    @property
+    def end_tick(self) -> np.ndarray:
+        return self.start_tick + self.duration_ticks
+
+    def sorted_by_start(self) -> 'TrackNotes':
+        order = np.lexsort((self.pitch, self.start_tick))
+        return self.take(order)
+
+    def take(self, selector) -> 'TrackNotes':
+        """Same track restricted to ``selector`` (boolean mask or index array)."""
+        return TrackNotes(
+            self.track_index, self.name, self.instrument, self.is_drum_track,
+            self.start_tick[selector], self.duration_ticks[selector],
+            self.pitch[selector], self.velocity[selector],
+            program=self.program,
+        )
+
+    def meta(self) -> dict[str, object]:
+        """Track summary without notes (what the template's track list needs)."""
+        return {
+            'track_index': self.track_index,
+            'name': self.name,
+            'instrument': self.instrument,
+            'is_drum_track': self.is_drum_track,
+            'program': self.program,
+            'note_count': len(self),
+        }
+
+    def note_dicts(self) -> list[dict[str, int]]:
+        return [
+            {'pitch': pitch, 'start_tick': start, 'duration_ticks': duration, 'velocity': velocity}
+            for pitch, start, duration, velocity in zip(
+                self.pitch.tolist(), self.start_tick.tolist(),
+                self.duration_ticks.tolist(), self.velocity.tolist(),
+            )
+        ]
+
+    def to_dict(self) -> dict[str, object]:
+        """Legacy ``tracks_data`` entry, built only at the JSON boundary."""
+        return {
+            'track_index': self.track_index,
+            'name': self.name,
+            'instrument': self.instrument,
+            'notes': self.note_dicts(),
+            'is_drum_track': self.is_drum_track,
+        }
+
+
+class NoteTable:
+    """
+    Columnar store of every note in a song, replacing the per-note dicts
+    ``parse_midi`` used to build. Tracks keep their own parallel arrays;
+    ``song_array()`` exposes the whole song as one NOTE_DTYPE structured array.
+    """
+
+    def __init__(self, tracks: list[TrackNotes]):
+        self.tracks = list(tracks)
+        self._song_array: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return sum(len(track) for track in self.tracks)
+
+    def track_meta(self) -> list[dict[str, object]]:
+        return [track.meta() for track in self.tracks]
+
+    def to_tracks_data(self) -> list[dict[str, object]]:
+        return [track.to_dict() for track in self.tracks]
+
+    def max_tick(self) -> int:
+        return max((int(track.end_tick.max()) for track in self.tracks if len(track)), default=0)
+
+    def song_array(self) -> np.ndarray:
+        if self._song_array is None:
+            song = np.empty(len(self), dtype=NOTE_DTYPE)
+            offset = 0
+            for position, track in enumerate(self.tracks):
+                stop = offset + len(track)
+                song['track'][offset:stop] = position
+                song['start_tick'][offset:stop] = track.start_tick
+                song['duration_ticks'][offset:stop] = track.duration_ticks
+                song['pitch'][offset:stop] = track.pitch
+                song['velocity'][offset:stop] = track.velocity
+                offset = stop
+            self._song_array = song
+        return self._song_array
+
+    def drums_first(self) -> 'NoteTable':
+        return NoteTable(sorted(self.tracks, key=lambda track: not track.is_drum_track))
+
+    def window(self, start_tick: int, end_tick: int, positions=None, mode: str = 'range',
+               low: int | None = None, high: int | None = None) -> 'NoteTable':
+        """
+        Notes inside [start_tick, end_tick) on the tracks at ``positions``
+        (all tracks when None). ``mode='range'`` keeps every overlapping note,
+        ``mode='start'`` only notes that begin inside the window; ``low`` and
+        ``high`` bound the pitch inclusively. Ticks are not rebased.
+        """
+        wanted = None if positions is None else set(positions)
+        tracks = []
+        for position, track in enumerate(self.tracks):
+            if wanted is not None and position not in wanted:
+                continue
+            tracks.append(track.take(_window_mask(track, start_tick, end_tick, mode, low, high)))
+        return NoteTable(tracks)
+
+    def count_in_window(self, start_tick: int, end_tick: int, positions=None, mode: str = 'range',
+                        low: int | None = None, high: int | None = None) -> int:
+        wanted = None if positions is None else set(positions)
+        return sum(
+            int(np.count_nonzero(_window_mask(track, start_tick, end_tick, mode, low, high)))
+            for position, track in enumerate(self.tracks)
+            if wanted is None or position in wanted
+        )
+
+    def to_bytes(self) -> bytes:
+        """Raw song array; pair with ``track_meta()`` to restore via ``from_bytes``."""
+        return self.song_array().tobytes()
+
+    def to_payload(self, extra: dict[str, object] | None = None) -> bytes:
+        """
+        Binary note payload served to the piano roll:
+
+            4 bytes   PAYLOAD_MAGIC
+            4 bytes   uint32 LE header length
+            header    UTF-8 JSON, space padded to a multiple of 4 bytes
+            columns   per track: int32 start_tick, int32 duration_ticks,
+                      uint8 pitch, uint8 velocity, each 4-byte aligned
+
+        The header carries ``extra`` plus every track's metadata and the byte
+        offsets of its columns, relative to the end of the header.
+        """
+        chunks: list[bytes] = []
+        offset = 0
+        tracks = []
+        for track in self.tracks:
+            offsets = {}
+            for column, dtype in PAYLOAD_COLUMNS:
+                data = getattr(track, column).astype(dtype, copy=False).tobytes()
+                offsets[column] = offset
+                padding = -len(data) % 4
+                chunks.append(data + b'\0' * padding)
+                offset += len(data) + padding
+            tracks.append({**track.meta(), 'offsets': offsets})
+
+        header = json.dumps({**(extra or {}), 'tracks': tracks}, separators=(',', ':')).encode('utf-8')
+        header += b' ' * (-len(header) % 4)
+        return PAYLOAD_MAGIC + struct.pack('<I', len(header)) + header + b''.join(chunks)
+
+    @classmethod
+    def from_bytes(cls, track_meta: list[dict[str, object]], data: bytes) -> 'NoteTable':
+        song = np.frombuffer(data, dtype=NOTE_DTYPE)
+        tracks = []
+        offset = 0
+        for meta in track_meta:
+            stop = offset + int(meta.get('note_count', 0))
+            rows = song[offset:stop]
+            tracks.append(TrackNotes(
+                meta['track_index'], meta['name'], meta['instrument'], meta['is_drum_track'],
+                np.ascontiguousarray(rows['start_tick']), np.ascontiguousarray(rows['duration_ticks']),
+                np.ascontiguousarray(rows['pitch']), np.ascontiguousarray(rows['velocity']),
+                program=meta.get('program'),
+            ))
+            offset = stop
+        table = cls(tracks)
+        table._song_array = song
+        return table
+
+    @classmethod
+    def from_miditoolkit(cls, mt) -> 'NoteTable':
+        """One TrackNotes per miditoolkit instrument; ``track_index`` is the instrument index."""
+        tracks = []
+        for index, inst in enumerate(mt.instruments):
+            starts = np.fromiter((n.start for n in inst.notes), dtype=np.int32, count=len(inst.notes))
+            ends = np.fromiter((n.end for n in inst.notes), dtype=np.int32, count=len(inst.notes))
+            tracks.append(TrackNotes(
+                index, inst.name, inst.name, inst.is_drum,
+                starts, ends - starts,
+                np.fromiter((n.pitch for n in inst.notes), dtype=np.uint8, count=len(inst.notes)),
+                np.fromiter((n.velocity for n in inst.notes), dtype=np.uint8, count=len(inst.notes)),
+                program=inst.program,
+            ))
+        return cls(tracks)
+
+
+def _window_mask(track: TrackNotes, start_tick: int, end_tick: int, mode: str,
+                 low: int | None, high: int | None) -> np.ndarray:
+    starts = track.start_tick
+    if mode == 'start':
+        mask = (starts >= start_tick) & (starts < end_tick)
+    else:
+        mask = (starts < end_tick) & (track.end_tick > start_tick)
+    if low is not None:
+        mask &= track.pitch >= low
+    if high is not None:
+        mask &= track.pitch <= high
+    return mask
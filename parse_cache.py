@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+# Bump whenever the shape of a cached entry (or the parser feeding it) changes;
+# old entries then simply stop matching and age out through LRU eviction.
+PARSER_VERSION = 4
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+INDEX_NAME = 'index.json'
+
+
+def _load_json_file(path: Path, default):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except Exception:
+        return default
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class ParseCache:
+    """
+    Content-addressed on-disk cache of parsed MIDI files.
+
+    Entries are keyed by the source file's content hash plus PARSER_VERSION, so
+    identical bytes uploaded under another name share an entry and a parser
+    change invalidates everything. A stat index maps (path, size, mtime) to the
+    digest, which makes a warm lookup one stat of the source plus one read of
+    the entry. Entries are evicted least-recently-used once their total size
+    exceeds ``max_bytes``; every hit bumps the entry's mtime.
+
+    An entry is a single file: one line of header JSON followed by an opaque
+    binary body (the raw columns of a NoteTable for parsed songs).
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.root / INDEX_NAME
+        stat_index = _load_json_file(self._index_path, {})
+        # sources deleted or moved since the index was written would otherwise stay in it forever
+        self._stat_index: dict[str, list] = ({key: known for key, known in stat_index.items() if os.path.exists(key)}
+                                             if isinstance(stat_index, dict) else {})
+        self._lock = threading.Lock()
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.root / f'{digest}.v{PARSER_VERSION}.entry'
+
+    def digest_for(self, source: Path) -> str:
+        """Content hash of ``source``, served from the stat index when size and mtime still match."""
+        key = os.path.abspath(source)
+        try:
+            st = os.stat(key)
+        except FileNotFoundError:
+            with self._lock:
+                self._stat_index.pop(key, None)
+            raise
+        with self._lock:
+            known = self._stat_index.get(key)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+
+        digest = file_digest(Path(key))
+        with self._lock:
+            self._stat_index[key] = [st.st_size, st.st_mtime_ns, digest]
+            _write_atomic(self._index_path, json.dumps(self._stat_index).encode('utf-8'))
+        return digest
+
+    def get(self, source: Path) -> tuple[dict[str, object], bytes] | None:
+        entry_path = self._entry_path(self.digest_for(source))
+        try:
+            raw = entry_path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        header_line, _, body = raw.partition(b'\n')
+        try:
+            header = json.loads(header_line)
+        except ValueError:
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return header, body
+
+    def put(self, source: Path, header: dict[str, object], body: bytes) -> None:
+        entry_path = self._entry_path(self.digest_for(source))
+        payload = json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n' + body
+        _write_atomic(entry_path, payload)
+        self._evict(keep=entry_path)
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry_path in self._entries():
+                entry_path.unlink(missing_ok=True)
+
+    def _entries(self) -> list[Path]:
+        return list(self.root.glob('*.entry'))
+
+    def _evict(self, keep: Path) -> None:
+        with self._lock:
+            entries = []
+            for entry_path in self._entries():
+                try:
+                    st = entry_path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry_path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry_path in sorted(entries, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                if entry_path == keep:
+                    continue
+                entry_path.unlink(missing_ok=True)
+                total -= size
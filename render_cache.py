@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from render_catalog import RenderManifest
+
+
+# Bump when the synth or the render pipeline changes the audio for the same input.
+RENDER_CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def soundfont_identity(path: Path) -> str:
+    """Cheap identity of a SoundFont: path, size and mtime (hashing 140 MB per start-up is not worth it)."""
+    st = os.stat(path)
+    return f'{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}'
+
+
+def _place(src: Path, dest: Path) -> None:
+    """Hardlink ``src`` to ``dest`` (copy across filesystems), replacing ``dest`` atomically."""
+    tmp_path = dest.with_name(f'.{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.unlink(missing_ok=True)
+    try:
+        try:
+            os.link(src, tmp_path)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class RenderCache:
+    """
+    Content-addressed store of rendered WAV files.
+
+    A key hashes the render input (sliced MIDI bytes, ABC text, ...) together
+    with the SoundFont identity, the sample rate and the normalisation
+    settings, so any change to what would be heard produces a new key. Hits
+    are hardlinked (or copied) to the requested output instead of running the
+    synth again. Entries are evicted least-recently-used once their total
+    size exceeds ``max_bytes``; every hit bumps the entry's mtime.
+
+    Output files share inodes with cache entries, so renders must replace
+    their output file rather than write into it (the render pool does).
+
+    Sizes and use order live in an in-memory LRU table, filled by one
+    scandir on first use and kept up to date by fetch/store, so eviction
+    and stats never glob or stat the cache directory again. With a
+    ``manifest`` (the render manifest) every eviction is logged there too,
+    as {"evicted": entry, "size": ..., "evicted_at": ...}.
+    """
+
+    def __init__(self, root: Path, soundfont: Path, sample_rate: int, max_bytes: int = DEFAULT_MAX_BYTES,
+                 manifest: RenderManifest | None = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.soundfont = Path(soundfont)
+        self.sample_rate = int(sample_rate)
+        self.max_bytes = max_bytes
+        self.manifest = manifest
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._index: OrderedDict[str, int] | None = None     # entry name -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / f'{key}.wav'
+
+    def key(self, content: bytes, kind: str, normalisation: dict[str, object] | None = None) -> str:
+        try:
+            soundfont = soundfont_identity(self.soundfont)
+        except OSError:
+            soundfont = str(self.soundfont)
+        params = json.dumps({
+            'version': RENDER_CACHE_VERSION,
+            'kind': kind,
+            'soundfont': soundfont,
+            'sample_rate': self.sample_rate,
+            'normalisation': normalisation,
+        }, sort_keys=True).encode('utf-8')
+        digest = hashlib.blake2b(params, digest_size=20)
+        digest.update(b'\0')
+        digest.update(content)
+        return digest.hexdigest()
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        """Place the cached render for ``key`` at ``dest``; False (a miss) when there is none."""
+        entry_path = self._entry_path(key)
+        try:
+            _place(entry_path, Path(dest))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                if self._index is not None and entry_path.name in self._index:
+                    self._bytes -= self._index.pop(entry_path.name)
+            return False
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            index = self._load_index()
+            if entry_path.name in index:
+                index.move_to_end(entry_path.name)
+        return True
+
+    def store(self, key: str, rendered: Path) -> None:
+        entry_path = self._entry_path(key)
+        _place(Path(rendered), entry_path)
+        size = entry_path.stat().st_size
+        with self._lock:
+            self.stores += 1
+            index = self._load_index()
+            self._bytes += size - index.pop(entry_path.name, 0)
+            index[entry_path.name] = size
+        self._evict(keep=entry_path)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': len(index),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry_path in self.root.glob('*.wav'):
+                entry_path.unlink(missing_ok=True)
+            self._index = OrderedDict()
+            self._bytes = 0
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        """The LRU table, read from disk (oldest mtime first) the first time; call with the lock held."""
+        if self._index is None:
+            entries = []
+            with os.scandir(self.root) as listing:
+                for entry in listing:
+                    if entry.name.endswith('.wav') and not entry.name.startswith('.'):
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((st.st_mtime_ns, entry.name, st.st_size))
+            entries.sort()
+            self._index = OrderedDict((name, size) for _, name, size in entries)
+            self._bytes = sum(self._index.values())
+        return self._index
+
+    def _evict(self, keep: Path) -> None:
+        evicted = []
+        with self._lock:
+            index = self._load_index()
+            for name in list(index):
+                if self._bytes <= self.max_bytes:
+                    break
+                if name == keep.name:
+                    continue
+                (self.root / name).unlink(missing_ok=True)
+                size = index.pop(name)
+                self._bytes -= size
+                self.evictions += 1
+                evicted.append((name, size))
+        if self.manifest is not None:
+            now = round(time.time(), 3)
+            for name, size in evicted:
+                self.manifest.append({'evicted': name, 'size': size, 'evicted_at': now})
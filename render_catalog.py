@@ -0,0 +1,226 @@
+import heapq
+import json
+import os
+import re
+import threading
+import time
+import wave
+from collections import Counter
+from pathlib import Path
+
+
+def normalise_stem(stem: str) -> str:
+    """
+    Comparable form of a song or render file stem. render_wav writes
+    "Song_Name_x" as "Song Name x", so spaces and underscores are the same
+    here; the rest follows the dashboard's slugify.
+    """
+    return re.sub(r'[^\w\-]+', '', stem.replace(' ', '_')).lower()
+
+
+def wav_seconds(path: Path) -> float | None:
+    """Duration of a WAV file from its header; None when it cannot be read."""
+    try:
+        with wave.open(str(path), 'rb') as wav:
+            return round(wav.getnframes() / wav.getframerate(), 3)
+    except (OSError, EOFError, wave.Error, ZeroDivisionError):
+        return None
+
+
+def _size_of(path: Path) -> int | None:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+class RenderManifest:
+    """
+    Append-only JSONL log of the renders the app writes, one record per
+    render: name, song, pattern, tick range, instruments, duration, size,
+    render time, ... A file rendered again gets a new line; the last one
+    for a name is current. Lines are written whole in append mode, so
+    readers only ever have to skip a torn last line after a crash.
+    ``rewrite`` replaces the whole log at once (RenderCatalogue compacts it
+    to the renders still on disk when it loads it).
+    """
+
+    __slots__ = ('path', '_lock')
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, record: dict[str, object]) -> None:
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(line)
+
+    def rewrite(self, records: list[dict[str, object]]) -> None:
+        data = ''.join(json.dumps(record, sort_keys=True) + '\n' for record in records)
+        tmp_path = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        with self._lock:
+            tmp_path.write_text(data, encoding='utf-8')
+            os.replace(tmp_path, self.path)
+
+    def records(self) -> list[dict[str, object]]:
+        records = []
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                for line in fh:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+
+class _SongTrie:
+    """Longest normalised song key that is a prefix of a render stem."""
+
+    __slots__ = ('_root',)
+
+    def __init__(self, song_keys):
+        self._root: dict = {}
+        for song_key in song_keys:
+            node = self._root
+            for char in normalise_stem(song_key):
+                node = node.setdefault(char, {})
+            node[None] = song_key
+
+    def match(self, stem: str) -> str | None:
+        node = self._root
+        found = node.get(None)
+        for char in normalise_stem(stem):
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+class RenderCatalogue:
+    """
+    Index of the WAVs in the renders folder: the song each one belongs to,
+    its size and mtime. Renders made by the app are recorded as they are
+    written, with the song they came from. Anything else (renders from
+    before, files copied in) is attributed once by the longest song key
+    that prefixes its normalised stem. The folder is only listed again when
+    its mtime moves, and then only new names are stat-ed.
+
+    With a ``manifest`` every recorded render is also logged there, and the
+    log is read back on start-up, so attributions (and pattern lookups)
+    survive restarts for every file still the size it was rendered at.
+    Loading also compacts the log to the latest record of each of those
+    files, so it does not grow with every render ever made.
+    """
+
+    def __init__(self, root: Path, manifest: RenderManifest | None = None):
+        self.root = Path(root)
+        self.manifest = manifest
+        self._entries: dict[str, list] = {}   # name -> [song_key, size, mtime, recorded]
+        self._records: dict[str, dict] = {}   # name -> latest manifest record
+        if manifest is not None:
+            logged = manifest.records()
+            latest = {record['name']: record for record in logged if 'name' in record}
+            self._records = {name: record for name, record in latest.items()
+                             if _size_of(self.root / name) == record.get('size')}
+            if len(self._records) < len(logged):
+                manifest.rewrite(sorted(self._records.values(), key=lambda record: record.get('rendered_at', 0)))
+        self._songs: tuple[str, ...] = ()
+        self._trie = _SongTrie(())
+        self._listed_mtime: int | None = None
+        self._lock = threading.Lock()
+
+    def record(self, wav_path: Path, song_key: str | None, **details) -> None:
+        """
+        Note a render the app just wrote (or placed from the render cache).
+        ``details`` (pattern, start, end, instruments, kind, ...) go into
+        the manifest record as they are.
+        """
+        wav_path = Path(wav_path)
+        if wav_path.parent != self.root:
+            return
+        try:
+            st = wav_path.stat()
+        except FileNotFoundError:
+            return
+        record = {**details, 'name': wav_path.name, 'song': song_key, 'size': st.st_size,
+                  'duration': wav_seconds(wav_path), 'rendered_at': round(time.time(), 3)}
+        with self._lock:
+            self._entries[wav_path.name] = [song_key, st.st_size, st.st_mtime, True]
+            self._records[wav_path.name] = record
+        if self.manifest is not None:
+            self.manifest.append(record)
+
+    def set_songs(self, song_keys) -> None:
+        """Song keys renders can belong to; guessed attributions are redone when they change."""
+        song_keys = tuple(song_keys)
+        with self._lock:
+            if song_keys == self._songs:
+                return
+            self._songs = song_keys
+            self._trie = _SongTrie(song_keys)
+            for name, entry in self._entries.items():
+                if not entry[3]:
+                    entry[0] = self._trie.match(Path(name).stem)
+
+    def refresh(self) -> None:
+        """Pick up WAVs added or removed behind the app's back."""
+        try:
+            mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.clear()
+                self._listed_mtime = None
+            return
+        with self._lock:
+            if mtime == self._listed_mtime:
+                return
+
+        present = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.endswith('.wav') and not entry.name.startswith('.') and entry.is_file():
+                    present[entry.name] = entry
+        with self._lock:
+            for name in self._entries.keys() - present.keys():
+                del self._entries[name]
+            for name in present.keys() - self._entries.keys():
+                try:
+                    st = present[name].stat()
+                except FileNotFoundError:
+                    continue
+                record = self._records.get(name)
+                if record is not None and record.get('size') == st.st_size:
+                    self._entries[name] = [record.get('song'), st.st_size, st.st_mtime, True]
+                else:
+                    self._entries[name] = [self._trie.match(Path(name).stem), st.st_size, st.st_mtime, False]
+            self._listed_mtime = mtime
+
+    def counts(self) -> Counter:
+        with self._lock:
+            return Counter(entry[0] for entry in self._entries.values() if entry[0] is not None)
+
+    def recent(self, limit: int = 8) -> list[dict[str, object]]:
+        with self._lock:
+            newest = heapq.nlargest(limit, self._entries.items(), key=lambda item: item[1][2])
+        return [{
+            'name': name,
+            'song': entry[0],
+            'modified_at': int(entry[2]),
+            'size_kb': max(1, round(entry[1] / 1024)),
+        } for name, entry in newest]
+
+    def renders(self, song: str | None = None, pattern: str | None = None) -> list[dict[str, object]]:
+        """Manifest records of the renders still in the folder, newest first, optionally filtered."""
+        with self._lock:
+            records = [record for name, record in self._records.items()
+                       if name in self._entries and record.get('size') == self._entries[name][1]]
+        if song is not None:
+            records = [record for record in records if record.get('song') == song]
+        if pattern is not None:
+            records = [record for record in records if record.get('pattern') == pattern]
+        return sorted(records, key=lambda record: record.get('rendered_at', 0), reverse=True)
@@ -0,0 +1,255 @@
+import io
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Iterator
+
+import mido
+import numpy as np
+
+from loudness import normalise_loudness
+from synth_engine import (SAMPLE_RATE, STREAM_BLOCK_FRAMES, SynthEngine, read_wav, synth_available,
+                          wav_bytes)
+
+
+_WORKER_SYNTH: SynthEngine | None = None     # per worker process, see _init_worker
+
+
+class RenderError(RuntimeError):
+    """A render job failed; the message carries the synth's error output."""
+
+
+def fluidsynth_render(soundfont: Path, midi_path: Path, wav_path: Path, sample_rate: int = SAMPLE_RATE) -> None:
+    """Render a MIDI file to WAV with the FluidSynth CLI."""
+    cmd = [
+        'fluidsynth', '-ni', str(soundfont),
+        str(midi_path),
+        '-F', str(wav_path),
+        '-r', str(sample_rate),
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def fluidsynth_stream(soundfont: Path, midi_path: Path, sample_rate: int = SAMPLE_RATE,
+                      block_frames: int = STREAM_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """
+    Render a MIDI file with the FluidSynth CLI writing raw 16-bit stereo to
+    a pipe, yielding (frames, 2) int16 blocks as they arrive. Raises
+    RenderError if FluidSynth fails; closing the generator stops it.
+    """
+    cmd = [
+        'fluidsynth', '-ni', str(soundfont),
+        str(midi_path),
+        '-F', '-', '-T', 'raw', '-O', 's16', '-E', 'little',
+        '-r', str(sample_rate),
+    ]
+    with tempfile.TemporaryFile() as errors:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            while True:
+                data = proc.stdout.read(block_frames * 4)
+                data = data[:len(data) - len(data) % 4]
+                if not data:
+                    break
+                yield np.frombuffer(data, dtype='<i2').reshape(-1, 2)
+            if proc.wait() != 0:
+                errors.seek(0)
+                raise RenderError(errors.read().decode('utf-8', 'replace') or f'fluidsynth exited with {proc.returncode}')
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            proc.stdout.close()
+
+
+def _init_worker(soundfont: str, sample_rate: int) -> None:
+    """Pool initializer: load the SoundFont once for the lifetime of the worker."""
+    global _WORKER_SYNTH
+    if synth_available():
+        try:
+            _WORKER_SYNTH = SynthEngine(Path(soundfont), sample_rate)
+        except RuntimeError:
+            _WORKER_SYNTH = None        # renders fall back to the CLI
+
+
+def _cli_render(task: dict[str, object], wav_path: Path, sample_rate: int) -> None:
+    """FluidSynth CLI fallback; in-memory MIDI has to go through a temp file here."""
+    if task.get('midi_bytes') is None:
+        fluidsynth_render(Path(task['soundfont']), Path(task['midi_path']), wav_path, sample_rate)
+        return
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.mid') as tmp_mid:
+        tmp_mid.write(task['midi_bytes'])
+    try:
+        fluidsynth_render(Path(task['soundfont']), Path(tmp_mid.name), wav_path, sample_rate)
+    finally:
+        os.unlink(tmp_mid.name)
+
+
+def _render_task(task: dict[str, object]) -> dict[str, object]:
+    """
+    Worker entry point: render one MIDI (``midi_bytes`` in memory, or a
+    ``midi_path``), optionally loudness-normalise the buffer (``loudness``:
+    normalise_loudness keyword arguments) before the single write, and
+    report how it went.
+    """
+    started = time.perf_counter()
+    result = {key: task.get(key) for key in ('index', 'file')}
+    result['output'] = task['wav_path']
+    sample_rate = int(task.get('sample_rate') or SAMPLE_RATE)
+    wav_path = Path(task['wav_path'])
+    # render beside the output and swap it in: the old file may be hardlinked into the render cache
+    tmp_wav = wav_path.with_name(f'.{wav_path.stem}.{os.getpid()}.tmp.wav')
+    try:
+        loudness = task.get('loudness')
+        if _WORKER_SYNTH is not None:
+            samples = (_WORKER_SYNTH.render_bytes(task['midi_bytes']) if task.get('midi_bytes') is not None
+                       else _WORKER_SYNTH.render_file(Path(task['midi_path'])))
+        else:
+            _cli_render(task, tmp_wav, sample_rate)
+            samples = read_wav(tmp_wav) if loudness is not None else None
+        if loudness is not None:
+            samples = normalise_loudness(samples, sample_rate, **loudness)
+        if samples is not None:
+            tmp_wav.write_bytes(wav_bytes(samples, sample_rate))
+        os.replace(tmp_wav, wav_path)
+        result['status'] = 'ok'
+    except subprocess.CalledProcessError as exc:
+        stderr = (exc.stderr or b'').decode('utf-8', errors='replace').strip()
+        result.update(status='error', error=stderr or str(exc))
+    except Exception as exc:
+        result.update(status='error', error=str(exc))
+    finally:
+        tmp_wav.unlink(missing_ok=True)
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _task_result(task: dict[str, object], status: str, error: str) -> dict[str, object]:
+    return {'index': task.get('index'), 'file': task.get('file'), 'output': task['wav_path'],
+            'status': status, 'error': error, 'seconds': 0.0}
+
+
+class RenderEngine:
+    """
+    Persistent process pool that renders MIDI files to WAV in parallel, one
+    worker per core by default. Each worker keeps its own in-process synth
+    with the SoundFont already loaded (FluidSynth CLI when pyfluidsynth is
+    unavailable). The pool is created on first use and rebuilt if a worker dies.
+    """
+
+    def __init__(self, soundfont: Path, max_workers: int | None = None, sample_rate: int = SAMPLE_RATE):
+        self.soundfont = Path(soundfont)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.sample_rate = sample_rate
+        self._pool: ProcessPoolExecutor | None = None
+        self._idle_synths: list[SynthEngine] = []    # warm synths for streams, in this process
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 initializer=_init_worker,
+                                                 initargs=(str(self.soundfont), self.sample_rate))
+            return self._pool
+
+    def _reset(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def render(self, tasks: list[dict[str, object]],
+               on_result: Callable[[dict[str, object]], None] | None = None,
+               cancelled: Callable[[], bool] | None = None) -> list[dict[str, object]]:
+        """
+        Render every task ({index, file, midi_bytes or midi_path, wav_path,
+        optional loudness}) and return one result per task, in task order,
+        with status 'ok', 'error' or 'cancelled'. ``on_result`` is called as
+        each render finishes; once ``cancelled()`` turns true the renders not
+        yet started are dropped. MIDI files belong to the caller and are
+        left in place.
+        """
+        if not tasks:
+            return []
+
+        executor = self._executor()
+        futures = {
+            executor.submit(_render_task, {**task, 'soundfont': str(self.soundfont), 'sample_rate': self.sample_rate}): position
+            for position, task in enumerate(tasks)
+        }
+        results: list[dict[str, object]] = [{}] * len(tasks)
+        broken = False
+        for future in as_completed(futures):
+            task = tasks[futures[future]]
+            if future.cancelled():
+                result = _task_result(task, 'cancelled', 'cancelled before rendering')
+            else:
+                try:
+                    result = future.result()
+                except BrokenProcessPool as exc:
+                    broken = True
+                    result = _task_result(task, 'error', f'render worker crashed: {exc}')
+            results[futures[future]] = result
+            if on_result is not None:
+                on_result(result)
+            if cancelled is not None and cancelled():
+                for pending in futures:
+                    pending.cancel()
+        if broken:
+            self._reset()
+        return results
+
+    def render_file(self, midi: Path | bytes, wav_path: Path,
+                    loudness: dict[str, float] | None = None) -> None:
+        """Render one MIDI (a path or SMF bytes) on the pool; raises RenderError on failure."""
+        task = {'midi_bytes': midi} if isinstance(midi, bytes) else {'midi_path': str(midi)}
+        result = self.render([{**task, 'wav_path': str(wav_path), 'loudness': loudness}])[0]
+        if result['status'] != 'ok':
+            raise RenderError(result['error'])
+
+    def _stream_synth(self) -> SynthEngine | None:
+        with self._lock:
+            if self._idle_synths:
+                return self._idle_synths.pop()
+        if not synth_available():
+            return None
+        try:
+            return SynthEngine(self.soundfont, self.sample_rate)
+        except RuntimeError:
+            return None
+
+    def stream(self, midi: bytes, block_frames: int = STREAM_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+        """
+        Synthesise SMF bytes in this process block by block, for previews that
+        start playing before the render is done. A warm in-process synth is
+        used when FluidSynth loads (and kept for the next stream), otherwise
+        the CLI writing raw PCM to a pipe. Raises RenderError on failure.
+        """
+        synth = self._stream_synth()
+        if synth is not None:
+            try:
+                yield from synth.stream(mido.MidiFile(file=io.BytesIO(midi)), block_frames)
+            finally:
+                with self._lock:
+                    self._idle_synths.append(synth)
+            return
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.mid') as tmp_mid:
+            tmp_mid.write(midi)
+        try:
+            yield from fluidsynth_stream(self.soundfont, Path(tmp_mid.name), self.sample_rate, block_frames)
+        finally:
+            os.unlink(tmp_mid.name)
+
+    def shutdown(self) -> None:
+        self._reset()
+        with self._lock:
+            synths, self._idle_synths = self._idle_synths, []
+        for synth in synths:
+            synth.close()
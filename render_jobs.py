@@ -0,0 +1,130 @@
+import contextlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+DEFAULT_WORKERS = 2         # batches in flight; the renders inside them share the render pool
+DEFAULT_KEEP = 256          # finished jobs remembered for status/result polling
+
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+
+class RenderJob:
+    """One queued batch of renders: state, progress counters and, once finished, its result."""
+
+    __slots__ = (
+        'id', 'kind', 'state', 'total', 'done', 'created', 'started', 'finished',
+        'result', 'error', '_cancel', '_future',
+    )
+
+    def __init__(self, kind: str, total: int):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.state = 'queued'
+        self.total = int(total)
+        self.done = 0
+        self.created = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.result: dict[str, object] | None = None
+        self.error: str | None = None
+        self._cancel = threading.Event()
+        self._future: Future | None = None
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def advance(self, count: int = 1) -> None:
+        self.done = min(self.done + count, self.total)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'progress': {
+                'done': self.done,
+                'total': self.total,
+                'fraction': round(self.done / self.total, 4) if self.total else (1.0 if self.state == 'done' else 0.0),
+            },
+            'cancel_requested': self.cancel_requested,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """
+    Background queue for render batches so the HTTP request only has to
+    submit and poll. ``work(job)`` runs on a queue thread (inside
+    ``context()`` when given, e.g. the Flask app context), reports progress
+    through ``job.advance()`` and should stop early once
+    ``job.cancel_requested`` is set. Only the last ``keep`` finished jobs
+    are remembered.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, keep: int = DEFAULT_KEEP,
+                 context: Callable[[], contextlib.AbstractContextManager] | None = None):
+        self.keep = keep
+        self._context = context or contextlib.nullcontext
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='render-job')
+        self._jobs: OrderedDict[str, RenderJob] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, work: Callable[[RenderJob], dict[str, object]], total: int) -> RenderJob:
+        job = RenderJob(kind, total)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        job._future = self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: str) -> RenderJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[RenderJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> RenderJob | None:
+        """Drop a queued job, or ask a running one to stop after its current renders."""
+        job = self.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return job
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.state = 'cancelled'
+            job.finished = time.time()
+        return job
+
+    def _run(self, job: RenderJob, work: Callable[[RenderJob], dict[str, object]]) -> None:
+        if job.cancel_requested:
+            job.state = 'cancelled'
+            job.finished = time.time()
+            return
+
+        job.state = 'running'
+        job.started = time.time()
+        try:
+            with self._context():
+                job.result = work(job)
+            job.state = 'cancelled' if job.cancel_requested else 'done'
+            if job.state == 'done':
+                job.done = job.total
+        except Exception as exc:
+            job.error = str(exc)
+            job.state = 'failed'
+        job.finished = time.time()
+
+    def _trim(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - self.keep, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,285 @@
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+
+# Data bytes that follow each status nibble / system status byte.
+_CHANNEL_DATA_LENGTHS = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+_SYSTEM_DATA_LENGTHS = {0xF1: 1, 0xF2: 2, 0xF3: 1}
+
+META_TRACK_NAME = 0x03
+META_SET_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+
+
+class DecodedTrack:
+    """
+    Everything ``parse_midi`` needs from one MTrk chunk: notes as parallel
+    arrays (file order of their note-offs is not preserved), the first program
+    change, the drum flag and the track's tempo / time-signature events.
+    """
+
+    __slots__ = (
+        'index', 'name', 'program', 'is_drum',
+        'start_tick', 'duration_ticks', 'pitch', 'velocity', 'channel',
+        'tempos', 'time_signatures',
+    )
+
+    def __init__(self, index: int):
+        self.index = index
+        self.name: str | None = None
+        self.program: int | None = None
+        self.is_drum = False
+        self.start_tick = np.empty(0, dtype=np.int32)
+        self.duration_ticks = np.empty(0, dtype=np.int32)
+        self.pitch = np.empty(0, dtype=np.uint8)
+        self.velocity = np.empty(0, dtype=np.uint8)
+        self.channel = np.empty(0, dtype=np.uint8)
+        self.tempos: list[tuple[int, int]] = []
+        self.time_signatures: list[tuple[int, int, int]] = []
+
+    def __len__(self) -> int:
+        return int(self.start_tick.size)
+
+
+class DecodedSong:
+    __slots__ = ('ticks_per_beat', 'tracks')
+
+    def __init__(self, ticks_per_beat: int, tracks: list[DecodedTrack]):
+        self.ticks_per_beat = ticks_per_beat
+        self.tracks = tracks
+
+    @property
+    def tempos(self) -> list[tuple[int, int]]:
+        """Every set_tempo as (tick, microseconds per beat), ordered by tick."""
+        return sorted((event for track in self.tracks for event in track.tempos), key=lambda event: event[0])
+
+    @property
+    def time_signatures(self) -> list[tuple[int, int, int]]:
+        """Every time_signature as (tick, numerator, denominator), ordered by tick."""
+        return sorted((event for track in self.tracks for event in track.time_signatures), key=lambda event: event[0])
+
+    def first_tempo(self) -> int | None:
+        """First set_tempo in track order, the way the original scan found it."""
+        for track in self.tracks:
+            if track.tempos:
+                return track.tempos[0][1]
+        return None
+
+    def first_time_signature(self) -> tuple[int, int] | None:
+        for track in self.tracks:
+            if track.time_signatures:
+                return track.time_signatures[0][1:]
+        return None
+
+
+def _read_vlq(data: bytes, pos: int) -> tuple[int, int]:
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+
+def _pair_notes(ticks: np.ndarray, status: np.ndarray, data1: np.ndarray, data2: np.ndarray):
+    """
+    Match note-ons to note-offs by (channel, pitch) with a stable sort.
+
+    Within one key, an off closes the note only when the event right before it
+    is an on: a re-triggered on replaces the pending one and a stray off is
+    ignored, the same rules the per-message dict pairing used.
+    """
+    kind = status & 0xF0
+    is_on = (kind == 0x90) & (data2 > 0)
+    is_off = (kind == 0x80) | ((kind == 0x90) & (data2 == 0))
+    note_events = np.flatnonzero(is_on | is_off)
+    if note_events.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty
+
+    key = (status[note_events] & 0x0F).astype(np.int32) * 128 + data1[note_events]
+    order = note_events[np.argsort(key, kind='stable')]
+    key = (status[order] & 0x0F).astype(np.int32) * 128 + data1[order]
+    on = is_on[order]
+    closes = (~on[1:]) & on[:-1] & (key[1:] == key[:-1])
+
+    on_events = order[:-1][closes]
+    off_events = order[1:][closes]
+    starts = ticks[on_events]
+    return (
+        starts,
+        ticks[off_events] - starts,
+        data1[on_events],
+        data2[on_events],
+        status[on_events] & 0x0F,
+    )
+
+
+def _decode_track(data: bytes, index: int) -> DecodedTrack:
+    track = DecodedTrack(index)
+    deltas = array('q')
+    status_bytes = bytearray()
+    data1 = bytearray()
+    data2 = bytearray()
+    metas: list[tuple[int, int, bytes]] = []         # (event index, meta type, payload)
+
+    pos = 0
+    end = len(data)
+    last_status = None
+    while pos < end:
+        delta, pos = _read_vlq(data, pos)
+        status = data[pos]
+        if status < 0x80:
+            if last_status is None:
+                raise ValueError(f'running status without last status in track {index}')
+            status = last_status
+        else:
+            pos += 1
+            if status != 0xFF:                       # meta events don't set running status
+                last_status = status
+
+        event_index = len(deltas)
+        deltas.append(delta)
+        if status == 0xFF:
+            meta_type = data[pos]
+            length, pos = _read_vlq(data, pos + 1)
+            metas.append((event_index, meta_type, data[pos:pos + length]))
+            pos += length
+            status_bytes.append(0xFF)
+            data1.append(meta_type)
+            data2.append(0)
+            if meta_type == 0x2F:                    # end_of_track
+                break
+        elif status in (0xF0, 0xF7):
+            length, pos = _read_vlq(data, pos)
+            pos += length
+            status_bytes.append(status)
+            data1.append(0)
+            data2.append(0)
+        elif status >= 0xF0:
+            pos += _SYSTEM_DATA_LENGTHS.get(status, 0)
+            status_bytes.append(status)
+            data1.append(0)
+            data2.append(0)
+        else:
+            length = _CHANNEL_DATA_LENGTHS[status & 0xF0]
+            status_bytes.append(status)
+            data1.append(data[pos])
+            data2.append(data[pos + 1] if length == 2 else 0)
+            pos += length
+
+    if pos > end:
+        raise ValueError(f'track {index} ends mid-event')
+
+    ticks = np.cumsum(np.frombuffer(deltas, dtype=np.int64))
+    status_arr = np.frombuffer(bytes(status_bytes), dtype=np.uint8)
+    data1_arr = np.frombuffer(bytes(data1), dtype=np.uint8)
+    data2_arr = np.frombuffer(bytes(data2), dtype=np.uint8)
+
+    channel_events = status_arr < 0xF0
+    kinds = status_arr & 0xF0
+    track.is_drum = bool(np.any(channel_events & ((status_arr & 0x0F) == 9)))
+    program_events = np.flatnonzero(channel_events & (kinds == 0xC0))
+    if program_events.size:
+        track.program = int(data1_arr[program_events[0]])
+
+    starts, durations, pitches, velocities, channels = _pair_notes(ticks, status_arr, data1_arr, data2_arr)
+    track.start_tick = starts.astype(np.int32)
+    track.duration_ticks = durations.astype(np.int32)
+    track.pitch = pitches.astype(np.uint8)
+    track.velocity = velocities.astype(np.uint8)
+    track.channel = channels.astype(np.uint8)
+
+    for event_index, meta_type, payload in metas:
+        tick = int(ticks[event_index])
+        if meta_type == META_TRACK_NAME:
+            track.name = payload.decode('latin-1')
+        elif meta_type == META_SET_TEMPO and len(payload) == 3:
+            track.tempos.append((tick, int.from_bytes(payload, 'big')))
+        elif meta_type == META_TIME_SIGNATURE and len(payload) >= 2:
+            track.time_signatures.append((tick, payload[0], 2 ** payload[1]))
+    return track
+
+
+def decode_smf(data: bytes) -> DecodedSong:
+    """
+    Decode a Standard MIDI File in a single pass over its chunks.
+
+    Raises ValueError for anything that is not a readable SMF.
+    """
+    if data[:4] != b'MThd' or len(data) < 14:
+        raise ValueError('not a Standard MIDI File (missing MThd header)')
+
+    header_length = int.from_bytes(data[4:8], 'big')
+    division = int.from_bytes(data[12:14], 'big')
+    if division & 0x8000:
+        raise ValueError('SMPTE time division is not supported')
+
+    tracks: list[DecodedTrack] = []
+    pos = 8 + header_length
+    while pos + 8 <= len(data):
+        chunk_type = data[pos:pos + 4]
+        chunk_length = int.from_bytes(data[pos + 4:pos + 8], 'big')
+        body = data[pos + 8:pos + 8 + chunk_length]
+        pos += 8 + chunk_length
+        if chunk_type != b'MTrk':
+            continue
+        try:
+            tracks.append(_decode_track(body, len(tracks)))
+        except (IndexError, KeyError) as exc:
+            raise ValueError(f'corrupt track {len(tracks)}: {exc!r}') from exc
+
+    return DecodedSong(division, tracks)
+
+
+def decode_smf_file(path: Path) -> DecodedSong:
+    with open(path, 'rb') as handle:
+        return decode_smf(handle.read())
+
+
+def decode_with_mido(path: Path) -> DecodedSong:
+    """
+    Reference decoder built on mido's per-message loop (the old parse_midi
+    path). Kept for benchmarking and cross-checking ``decode_smf``.
+    """
+    import mido
+
+    mid = mido.MidiFile(path)
+    tracks = []
+    for index, mido_track in enumerate(mid.tracks):
+        track = DecodedTrack(index)
+        cur_tick = 0
+        notes_on = {}
+        columns = ([], [], [], [], [])
+        for msg in mido_track:
+            cur_tick += msg.time
+            if msg.is_meta:
+                if msg.type == 'track_name':
+                    track.name = msg.name
+                elif msg.type == 'set_tempo':
+                    track.tempos.append((cur_tick, msg.tempo))
+                elif msg.type == 'time_signature':
+                    track.time_signatures.append((cur_tick, msg.numerator, msg.denominator))
+                continue
+            channel = getattr(msg, 'channel', None)
+            if channel == 9:
+                track.is_drum = True
+            if msg.type == 'program_change' and track.program is None:
+                track.program = msg.program
+            elif msg.type == 'note_on' and msg.velocity > 0:
+                notes_on[(channel, msg.note)] = (cur_tick, msg.velocity)
+            elif msg.type in ('note_off', 'note_on'):
+                start = notes_on.pop((channel, msg.note), None)
+                if start is not None:
+                    for column, value in zip(columns, (start[0], cur_tick - start[0], msg.note, start[1], channel)):
+                        column.append(value)
+        track.start_tick = np.asarray(columns[0], dtype=np.int32)
+        track.duration_ticks = np.asarray(columns[1], dtype=np.int32)
+        track.pitch = np.asarray(columns[2], dtype=np.uint8)
+        track.velocity = np.asarray(columns[3], dtype=np.uint8)
+        track.channel = np.asarray(columns[4], dtype=np.uint8)
+        tracks.append(track)
+    return DecodedSong(mid.ticks_per_beat, tracks)
@@ -4,38 +4,77 @@ const sidebar = document.getElementById('item-list');
 const filterBox = document.getElementById('filter');
 const viewer = document.getElementById('viewer');
 
-let DATA = [];          // cache of index list
+const PAGE_SIZE = 200;  // examples per /data/index.json request
+
+let query = '';         // current filter (matched server-side)
+let loaded = 0;         // examples listed so far
+let total = 0;          // examples matching the filter
+let request = null;     // page being fetched, if any
 
 // ------------------------------------------------------------------
-//  Fetch index.json once, then build the sidebar list
+//  Fetch index.json a page at a time; the next page loads as the
+//  sidebar is scrolled near its end
 // ------------------------------------------------------------------
-fetch('/data/index.json')
-    .then(r => r.json())
-    .then(items => {
-        DATA = items;
-        rebuildList('');
-    })
-    .catch(err => {
-        console.error('Could not load dataset index:', err);
-        sidebar.innerHTML = '<li style="color:red">Error loading data</li>';
-    });
+function loadPage() {
+    if (request || (loaded && loaded >= total)) return request;
+    const params = new URLSearchParams({ offset: loaded, limit: PAGE_SIZE });
+    if (query) params.set('q', query);
+    const forQuery = query;
+    request = fetch(`/data/index.json?${params}`)
+        .then(r => {
+            if (!r.ok) throw new Error(`HTTP ${r.status}`);
+            total = Number(r.headers.get('X-Total-Count')) || 0;
+            return r.json();
+        })
+        .then(items => {
+            if (forQuery !== query) return;     // the filter changed meanwhile
+            items.forEach(appendItem);
+            loaded += items.length;
+            if (items.length < PAGE_SIZE) total = loaded;
+        })
+        .catch(err => {
+            console.error('Could not load dataset index:', err);
+            sidebar.innerHTML = '<li style="color:red">Error loading data</li>';
+            total = loaded;
+        })
+        .finally(() => {
+            request = null;
+            fillSidebar();
+        });
+    return request;
+}
 
-function rebuildList(query) {
-    const q = query.trim().toLowerCase();
-    sidebar.innerHTML = '';
+function appendItem(it) {
+    const li = document.createElement('li');
+    li.textContent = it.title;
+    li.dataset.path = it.path;
+    li.addEventListener('click', () => loadExample(it, li));
+    sidebar.appendChild(li);
+}
 
-    DATA
-        .filter(it => !q || it.title.toLowerCase().includes(q))
-        .forEach(it => {
-            const li = document.createElement('li');
-            li.textContent = it.title;
-            li.dataset.path = it.path;
-            li.addEventListener('click', () => loadExample(it, li));
-            sidebar.appendChild(li);
-        });
+// keep loading while the list does not reach below the fold
+function fillSidebar() {
+    const panel = sidebar.parentElement;
+    if (loaded < total && panel.scrollHeight - panel.scrollTop - panel.clientHeight < 400) loadPage();
 }
 
-filterBox.addEventListener('input', e => rebuildList(e.target.value));
+function rebuildList(newQuery) {
+    query = newQuery.trim();
+    sidebar.innerHTML = '';
+    loaded = total = 0;
+    if (!request) loadPage();
+    // a page in flight for the old filter is dropped; fetch the new one after it
+    else request.then(() => loadPage());
+}
+
+let filterTimer = null;
+filterBox.addEventListener('input', e => {
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(() => rebuildList(e.target.value), 200);
+});
+sidebar.parentElement.addEventListener('scroll', fillSidebar);
+
+rebuildList('');
 
 
 // ------------------------------------------------------------------
@@ -14,6 +14,7 @@
  *
  * Assumes global variables from HTML template:
  * - rawTracksData: Array of track objects, including 'is_drum_track' flag and 'notes' array.
+ * - notesPayloadUrl: Optional URL of the binary note payload that fills rawTracksData[i].notes.
  * - ticksPerBeat: Number.
  */
 
@@ -264,6 +265,59 @@ function adjustLightness(hex, deltaPercent) {
 }
 
 
+/**
+ * Decodes the binary payload served by /api/notes/<file> (NoteTable.to_payload
+ * in note_table.py): magic "MNT1", uint32 header length, JSON header, then
+ * per-track Int32 start/duration and Uint8 pitch/velocity columns.
+ */
+function decodeNotePayload(buffer) {
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'MNT1') {
+        throw new Error(`Unexpected note payload header "${magic}"`);
+    }
+    const headerLength = new DataView(buffer).getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const body = 8 + headerLength;
+
+    return header.tracks.map(track => {
+        const count = track.note_count;
+        const starts = new Int32Array(buffer, body + track.offsets.start_tick, count);
+        const durations = new Int32Array(buffer, body + track.offsets.duration_ticks, count);
+        const pitches = new Uint8Array(buffer, body + track.offsets.pitch, count);
+        const velocities = new Uint8Array(buffer, body + track.offsets.velocity, count);
+        const notes = new Array(count);
+        for (let i = 0; i < count; i++) {
+            notes[i] = {
+                pitch: pitches[i],
+                start_tick: starts[i],
+                duration_ticks: durations[i],
+                velocity: velocities[i],
+            };
+        }
+        return { ...track, notes };
+    });
+}
+
+// Started as soon as the script loads so the download overlaps first paint;
+// the piano roll initialises once rawTracksData has its notes.
+const notePayloadReady = (typeof notesPayloadUrl === 'string')
+    ? fetch(notesPayloadUrl)
+        .then(res => {
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            return res.arrayBuffer();
+        })
+        .then(buffer => {
+            decodeNotePayload(buffer).forEach((track, i) => {
+                if (rawTracksData[i]) rawTracksData[i].notes = track.notes;
+            });
+        })
+        .catch(err => {
+            console.error('Could not load note payload:', err);
+            alert(`Could not load this song's notes (${err.message}). Reload the page to try again.`);
+        })
+    : Promise.resolve();
+
+
 document.addEventListener('DOMContentLoaded', function () {
     // --- Global Variables & Configuration ---
     const canvas = document.getElementById('main-piano-roll-canvas');
@@ -6727,9 +6781,11 @@ function drawNotesForTrack(trackIndex, isActiveTrack, startTickVisible, endTickV
     }
 
 
-    // --- Start the application ---
-    initialize();
-    initPatternHistory();
+    // --- Start the application (once the note payload is in) ---
+    notePayloadReady.then(() => {
+        initialize();
+        initPatternHistory();
+    });
 
 
 }); // End DOMContentLoaded
\ No newline at end of file
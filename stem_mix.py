@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import numpy as np
+
+from synth_engine import read_wav, wav_frames
+from tempo_map import TempoMap
+
+
+class StemSet:
+    """
+    Full-length renders ("stems") of a song's instruments, each synthesised
+    once, from which any tick range of any instrument subset is cut and
+    mixed sample-accurately: tick positions go through the song's tempo map
+    to the same frames the synth played them at.
+
+    A cut is the window [start, end) of the whole-song mix of those
+    instruments, so notes sounding at ``start`` come in mid-note rather than
+    being re-struck as a sliced render would play them.
+
+    Stems stay on disk as WAV files and a cut reads only its own window of
+    each, so memory holds one window per instrument, not whole songs.
+    """
+
+    __slots__ = ('tempo_map', 'sample_rate', 'stems', 'lengths')
+
+    def __init__(self, tempo_map: TempoMap, sample_rate: int):
+        self.tempo_map = tempo_map
+        self.sample_rate = int(sample_rate)
+        self.stems: dict[int, Path] = {}        # track position -> stereo 16-bit WAV
+        self.lengths: dict[int, int] = {}       # track position -> frames in its WAV
+
+    def add(self, position: int, wav_path: Path) -> None:
+        self.stems[position] = Path(wav_path)
+        self.lengths[position] = wav_frames(wav_path)
+
+    def frame_at(self, tick: int) -> int:
+        return int(round(self.tempo_map.tick_to_seconds(tick) * self.sample_rate))
+
+    def length(self) -> int:
+        return max(self.lengths.values(), default=0)
+
+    def mix(self, positions, start_tick: int, end_tick: int) -> np.ndarray:
+        """
+        (frames, 2) int16 mix of the stems at ``positions`` over [start_tick,
+        end_tick); ``end_tick`` 0 runs to the end of the longest stem,
+        release tails included. Ranges are clipped to that length, past which
+        there is nothing but silence. Positions without a stem are silent.
+        """
+        length = self.length()
+        start = min(self.frame_at(start_tick), length)
+        end = length if end_tick == 0 else min(max(self.frame_at(end_tick), start), length)
+        mixed = np.zeros((end - start, 2), dtype=np.int32)
+        for position in positions:
+            wav_path = self.stems.get(position)
+            if wav_path is None or start >= self.lengths[position]:
+                continue
+            window = read_wav(wav_path, start, end - start)
+            mixed[:len(window)] += window
+        return np.clip(mixed, -32768, 32767).astype(np.int16)
@@ -0,0 +1,154 @@
+import io
+import struct
+import wave
+from pathlib import Path
+from typing import Iterator
+
+import mido
+import numpy as np
+
+try:
+    import fluidsynth
+except ImportError:                     # pyfluidsynth missing or libfluidsynth not found
+    fluidsynth = None
+
+
+SAMPLE_RATE = 44100
+GAIN = 0.2                  # fluidsynth's own default, so output matches the CLI
+RELEASE_SECONDS = 1.0       # rendered after the last event so release tails ring out
+STREAM_BLOCK_FRAMES = 2048  # ~46 ms at 44.1 kHz: the most a stream waits for before sending audio
+
+
+def synth_available() -> bool:
+    return fluidsynth is not None
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """(frames, channels) int16 samples as an in-memory PCM WAV file."""
+    samples = np.ascontiguousarray(samples, dtype='<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(samples.shape[1] if samples.ndim == 2 else 1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def stream_wav_header(sample_rate: int = SAMPLE_RATE, channels: int = 2) -> bytes:
+    """
+    44-byte PCM WAV header for a stream of unknown length: the RIFF and data
+    sizes are 0xFFFFFFFF, which browsers and ffmpeg read as "until EOF".
+    """
+    block_align = channels * 2
+    return (b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate,
+                                    sample_rate * block_align, block_align, 16)
+            + b'data' + struct.pack('<I', 0xFFFFFFFF))
+
+
+def read_wav(path: Path, start: int = 0, frames: int | None = None) -> np.ndarray:
+    """
+    16-bit PCM WAV file as (frames, channels) int16 samples; ``start`` and
+    ``frames`` read just that window (clipped to the file).
+    """
+    with wave.open(str(path), 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f'{path}: expected 16-bit PCM, got {8 * wav.getsampwidth()}-bit')
+        channels = wav.getnchannels()
+        start = min(max(start, 0), wav.getnframes())
+        available = wav.getnframes() - start
+        wav.setpos(start)
+        data = wav.readframes(available if frames is None else min(max(frames, 0), available))
+    return np.frombuffer(data, dtype='<i2').reshape(-1, channels)
+
+
+def wav_frames(path: Path) -> int:
+    """Length of a WAV file in frames, from its header."""
+    with wave.open(str(path), 'rb') as wav:
+        return wav.getnframes()
+
+
+def write_wav(path: Path, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> None:
+    """Write (frames, channels) int16 samples as a PCM WAV file."""
+    Path(path).write_bytes(wav_bytes(samples, sample_rate))
+
+
+class SynthEngine:
+    """
+    Long-lived in-process FluidSynth instance. The SoundFont is loaded once
+    when the engine is created; every render resets the synth and plays the
+    MIDI events straight into a NumPy buffer, with no audio driver and no
+    subprocess.
+    """
+
+    def __init__(self, soundfont: Path, sample_rate: int = SAMPLE_RATE, gain: float = GAIN):
+        if fluidsynth is None:
+            raise RuntimeError('pyfluidsynth / libfluidsynth is not available')
+        self.soundfont = Path(soundfont)
+        self.sample_rate = int(sample_rate)
+        self._synth = fluidsynth.Synth(gain=gain, samplerate=self.sample_rate)
+        self._sfid = self._synth.sfload(str(self.soundfont), update_midi_preset=1)
+        if self._sfid == -1:
+            self._synth.delete()
+            raise RuntimeError(f'could not load SoundFont {self.soundfont}')
+
+    def render(self, midi: mido.MidiFile) -> np.ndarray:
+        """Render a whole MIDI file to (frames, 2) int16 stereo samples."""
+        return np.concatenate(list(self.stream(midi, block_frames=1 << 30)))
+
+    def stream(self, midi: mido.MidiFile, block_frames: int = STREAM_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+        """
+        Render a MIDI file as it plays: (frames, 2) int16 blocks of at most
+        ``block_frames``, each yielded as soon as it is synthesised.
+        """
+        synth = self._synth
+        synth.system_reset()
+
+        def samples(frames: int) -> Iterator[np.ndarray]:
+            while frames > 0:
+                count = min(frames, block_frames)
+                yield np.asarray(synth.get_samples(count)).reshape(-1, 2)
+                frames -= count
+
+        rendered = 0
+        now = 0.0
+        for msg in midi:                # merged tracks, ``time`` in seconds
+            now += msg.time
+            if msg.is_meta:
+                continue
+            target = int(round(now * self.sample_rate))
+            if target > rendered:
+                yield from samples(target - rendered)
+                rendered = target
+            self._send(msg)
+        yield from samples(int(RELEASE_SECONDS * self.sample_rate))
+
+    def render_file(self, midi_path: Path) -> np.ndarray:
+        return self.render(mido.MidiFile(str(midi_path)))
+
+    def render_bytes(self, data: bytes) -> np.ndarray:
+        """Render an in-memory Standard MIDI File."""
+        return self.render(mido.MidiFile(file=io.BytesIO(data)))
+
+    def render_to_wav(self, midi_path: Path, wav_path: Path) -> None:
+        write_wav(wav_path, self.render_file(midi_path), self.sample_rate)
+
+    def _send(self, msg: mido.Message) -> None:
+        synth = self._synth
+        if msg.type == 'note_on':
+            if msg.velocity:
+                synth.noteon(msg.channel, msg.note, msg.velocity)
+            else:
+                synth.noteoff(msg.channel, msg.note)
+        elif msg.type == 'note_off':
+            synth.noteoff(msg.channel, msg.note)
+        elif msg.type == 'program_change':
+            synth.program_change(msg.channel, msg.program)
+        elif msg.type == 'control_change':
+            synth.cc(msg.channel, msg.control, msg.value)
+        elif msg.type == 'pitchwheel':
+            synth.pitch_bend(msg.channel, msg.pitch)
+
+    def close(self) -> None:
+        self._synth.delete()
@@ -0,0 +1,104 @@
+from bisect import bisect_right
+
+import numpy as np
+
+
+DEFAULT_TEMPO = 500_000                 # µs per beat (120 BPM), the SMF default
+DEFAULT_TIME_SIGNATURE = (4, 4)
+
+
+class TempoMap:
+    """
+    Every tempo and time-signature change of a song, with cumulative seconds
+    precomputed per tempo segment so tick <-> seconds conversion is a binary
+    search plus one multiply.
+
+    ``tempos`` holds (tick, µs per beat) and ``time_signatures`` holds
+    (tick, numerator, denominator). Both always start at tick 0 (the SMF
+    defaults of 120 BPM and 4/4 apply before the first change), keep only
+    the last change on any given tick and drop changes that repeat the value
+    already in force.
+    """
+
+    def __init__(self, ticks_per_beat: int, tempos=(), time_signatures=()):
+        self.ticks_per_beat = int(ticks_per_beat) or 480
+        self.tempos = _normalise(tempos, (DEFAULT_TEMPO,))
+        self.time_signatures = _normalise(time_signatures, DEFAULT_TIME_SIGNATURE)
+
+        self._tempo_ticks = [tick for tick, _ in self.tempos]
+        self._ts_ticks = [event[0] for event in self.time_signatures]
+        self._tempo_ticks_arr = np.asarray(self._tempo_ticks, dtype=np.int64)
+        self._seconds_per_tick = np.asarray(
+            [tempo / (self.ticks_per_beat * 1_000_000) for _, tempo in self.tempos], dtype=np.float64,
+        )
+        segment_seconds = np.diff(self._tempo_ticks_arr) * self._seconds_per_tick[:-1]
+        self._segment_start_seconds = np.concatenate(([0.0], np.cumsum(segment_seconds)))
+
+    def tempo_at(self, tick: int) -> int:
+        return self.tempos[max(bisect_right(self._tempo_ticks, tick) - 1, 0)][1]
+
+    def bpm_at(self, tick: int) -> float:
+        return 60_000_000 / self.tempo_at(tick)
+
+    def time_signature_at(self, tick: int) -> tuple[int, int]:
+        return self.time_signatures[max(bisect_right(self._ts_ticks, tick) - 1, 0)][1:]
+
+    def tick_to_seconds(self, tick: int) -> float:
+        segment = max(bisect_right(self._tempo_ticks, tick) - 1, 0)
+        return float(self._segment_start_seconds[segment]
+                     + (tick - self._tempo_ticks[segment]) * self._seconds_per_tick[segment])
+
+    def ticks_to_seconds(self, ticks) -> np.ndarray:
+        ticks = np.asarray(ticks, dtype=np.int64)
+        segments = np.maximum(np.searchsorted(self._tempo_ticks_arr, ticks, side='right') - 1, 0)
+        return (self._segment_start_seconds[segments]
+                + (ticks - self._tempo_ticks_arr[segments]) * self._seconds_per_tick[segments])
+
+    def seconds_to_tick(self, seconds: float) -> int:
+        segment = max(int(np.searchsorted(self._segment_start_seconds, seconds, side='right')) - 1, 0)
+        elapsed = seconds - self._segment_start_seconds[segment]
+        return int(round(self._tempo_ticks[segment] + elapsed / self._seconds_per_tick[segment]))
+
+    def rebased(self, start_tick: int) -> 'TempoMap':
+        """
+        Map for a slice starting at ``start_tick``: the tempo and time signature
+        in force there move to tick 0 and later changes shift left.
+        """
+        tempos = [(0, self.tempo_at(start_tick))]
+        tempos += [(tick - start_tick, tempo) for tick, tempo in self.tempos if tick > start_tick]
+        time_signatures = [(0, *self.time_signature_at(start_tick))]
+        time_signatures += [(event[0] - start_tick, *event[1:]) for event in self.time_signatures if event[0] > start_tick]
+        return TempoMap(self.ticks_per_beat, tempos, time_signatures)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            'ticks_per_beat': self.ticks_per_beat,
+            'tempos': [list(event) for event in self.tempos],
+            'time_signatures': [list(event) for event in self.time_signatures],
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, object]) -> 'TempoMap':
+        return cls(payload.get('ticks_per_beat', 480), payload.get('tempos', []), payload.get('time_signatures', []))
+
+    @classmethod
+    def from_miditoolkit(cls, mt) -> 'TempoMap':
+        return cls(
+            mt.ticks_per_beat,
+            [(change.time, int(round(60_000_000 / change.tempo))) for change in mt.tempo_changes],
+            [(change.time, change.numerator, change.denominator) for change in mt.time_signature_changes],
+        )
+
+
+def _normalise(events, default: tuple) -> list[tuple]:
+    by_tick: dict[int, tuple] = {}
+    for event in sorted(events, key=lambda item: item[0]):
+        by_tick[int(event[0])] = tuple(int(value) for value in event[1:])
+    by_tick.setdefault(0, default)
+
+    normalised = []
+    for tick in sorted(by_tick):
+        if normalised and normalised[-1][1:] == by_tick[tick]:
+            continue                    # repeats of the value already in force
+        normalised.append((tick, *by_tick[tick]))
+    return normalised
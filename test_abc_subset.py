@@ -0,0 +1,91 @@
+import io
+
+import mido
+import pytest
+
+from abc_subset import UnsupportedAbc, abc_to_midi_bytes, parse_abc, transpose_abc
+
+
+# D major: D4 F#4 A4 D5 | F#5 E5 (F is sharp from the key)
+D_MAJOR = "X:1\nL:1/8\nK:D\nDFAd|f2e2|]\n"
+
+
+def _voice_notes(text: str) -> list[list[int]]:
+    (voice,) = parse_abc(text).voices.values()
+    return voice.notes
+
+
+def test_parse_abc_accidentals_last_to_the_bar_line():
+    # K:G sharpens F; =F holds until ^F, and the bar line restores the key's F#
+    notes = _voice_notes("X:1\nL:1/4\nK:G\n=F F ^F F|F|]\n")
+    assert [note[2] for note in notes] == [65, 65, 66, 66, 66]
+    assert [note[0] for note in notes] == [0, 480, 960, 1440, 1920]
+    assert all(note[1] == 480 for note in notes)
+
+
+def test_parse_abc_lengths_ties_chords_and_octaves():
+    # L:1/8 is 240 ticks; C3/2 360, D/ 120, E2-E2 one 960 tick note, a 3/4 bar is 1440
+    tune = parse_abc("X:1\nT:Tie\nM:3/4\nL:1/8\nQ:1/4=90\nK:C\nC3/2D/ E2-E2 [CEG]2|z2 c'2 C,2|]\n")
+    assert (tune.title, tune.meter, tune.bpm) == ('Tie', (3, 4), 90.0)
+    (voice,) = tune.voices.values()
+    assert [note[:3] for note in voice.notes] == [
+        [0, 360, 60], [360, 120, 62], [480, 960, 64],
+        [1440, 480, 60], [1440, 480, 64], [1440, 480, 67],
+        [2400, 480, 84], [2880, 480, 48],
+    ]
+
+
+def test_parse_abc_voices_each_keep_their_own_time():
+    tune = parse_abc("X:1\nL:1/4\nK:C\nV:1\nC D|\nV:2\nE F|\n")
+    assert {voice.id: [note[:3] for note in voice.notes] for voice in tune.voices.values()} == {
+        '1': [[0, 480, 60], [480, 480, 62]],
+        '2': [[0, 480, 64], [480, 480, 65]],
+    }
+
+
+def test_abc_to_midi_bytes_writes_the_tempo():
+    midi = mido.MidiFile(file=io.BytesIO(abc_to_midi_bytes("X:1\nL:1/4\nQ:1/4=90\nK:C\nC D|]\n")))
+    assert midi.ticks_per_beat == 480
+    assert [message.tempo for message in midi.tracks[0] if message.type == 'set_tempo'] == [666667]
+
+
+@pytest.mark.parametrize('text', ["X:1\nK:C\nH", "X:1\nK:C\n(3CDE"])
+def test_parse_abc_refuses_what_it_cannot_play(text):
+    with pytest.raises(UnsupportedAbc):
+        parse_abc(text)
+
+
+def test_transpose_up_one_respells_in_e_flat():
+    # 63 67 70 75 | 79 77: every note is in Eb, so no accidentals are written
+    assert transpose_abc(D_MAJOR, [1]) == ["X:1\nL:1/8\nK:Eb\nEGBe|g2f2|]\n"]
+
+
+def test_transpose_down_one_respells_in_d_flat():
+    # 61 65 68 73 | 77 75: same letters as D major, flats from the key
+    assert transpose_abc(D_MAJOR, [-1]) == ["X:1\nL:1/8\nK:Db\nDFAd|f2e2|]\n"]
+
+
+def test_transpose_by_a_tritone_picks_a_flat_both_ways():
+    # +6: 68 72 75 80 | 84 82; -6: 56 60 63 68 | 72 70, both spelled in Ab (4 flats, not G# with 8 sharps)
+    up, down = transpose_abc(D_MAJOR, [6, -6])
+    assert up == "X:1\nL:1/8\nK:Ab\nAcea|c'2b2|]\n"
+    assert down == "X:1\nL:1/8\nK:Ab\nA,CEA|c2B2|]\n"
+
+
+def test_transpositions_sound_shifted():
+    original = [note[2] for note in _voice_notes(D_MAJOR)]
+    assert original == [62, 66, 69, 74, 78, 76]
+    for shift, text in zip((1, -1, 6, -6), transpose_abc(D_MAJOR, [1, -1, 6, -6])):
+        assert [note[2] for note in _voice_notes(text)] == [pitch + shift for pitch in original]
+
+
+def test_transpose_leaves_percussion_alone():
+    perc = "X:1\nL:1/8\nK:perc\nCDEF|]\n"
+    assert transpose_abc(perc, [2, -5]) == [perc, perc]
+    # the tune's key moves, the percussion voice's notes do not
+    mixed = "X:1\nL:1/8\nK:C\nV:1\nK:perc\nCDEF|]\n"
+    assert transpose_abc(mixed, [2]) == ["X:1\nL:1/8\nK:D\nV:1\nK:perc\nCDEF|]\n"]
+
+
+def test_transpose_unsupported_abc_gives_none():
+    assert transpose_abc("X:1\nK:C\nH", [1, 2]) == [None, None]
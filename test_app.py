@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import pytest
+
+import app as appmod
+from example_store import ExampleStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ExampleStore(tmp_path / 'examples.sqlite3', tree=tmp_path)
+    monkeypatch.setattr(appmod, 'EXAMPLE_STORE', store)
+    monkeypatch.setattr(appmod, 'DATA_ROOT', tmp_path)
+    return store
+
+
+@pytest.fixture
+def client():
+    return appmod.app.test_client()
+
+
+@pytest.mark.parametrize('payload', [
+    {'song_name': 'Song', 'category': '', 'examples': [{'id': 'a'}]},
+    {'song_name': 'Song', 'category': '../up', 'examples': [{'id': 'a'}]},
+    {'song_name': 'Song', 'category': 'epicify', 'examples': []},
+    {'song_name': 'Song', 'category': 'epicify', 'examples': {'id': 'a'}},
+    {'song_name': 'Song', 'category': 'epicify', 'examples': [{'id': 'a'}, 'b']},
+    {'song_name': 'Song', 'category': 'epicify', 'examples': [{'id': '../a'}]},
+    {'song_name': 'Song', 'category': 'epicify', 'examples': [{'id': 'a'}, {}, {'id': 'a'}]},
+    ['not', 'an', 'object'],
+])
+def test_bulk_refuses_the_whole_batch(store, client, payload):
+    response = client.post('/dataset/bulk', json=payload)
+    assert response.status_code == 400
+    assert len(store) == 0 and store.revision() == 0
+
+
+def test_bulk_refuses_unknown_encodings(store, client):
+    response = client.post('/dataset/bulk', data=b'{}', content_type='application/json',
+                           headers={'Content-Encoding': 'br'})
+    assert response.status_code == 415
+    response = client.post('/dataset/bulk', data=b'not gzip', content_type='application/json',
+                           headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 400
+
+
+def test_bulk_saves_gzipped_json(store, client, tmp_path):
+    payload = {'song_name': 'My Song', 'category': 'epicify',
+               'examples': [{'id': 'a', 'function': 'Fill'}, {'function': 'Loop'}]}
+    response = client.post('/dataset/bulk', data=gzip.compress(json.dumps(payload).encode()),
+                           content_type='application/json', headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 200
+    answer = response.get_json()
+    assert (answer['saved'], answer['category'], answer['ids'][0]) == (2, 'epicify', 'a')
+    song = answer['song']
+    assert store.get(song, 'epicify', 'a') == {'id': 'a', 'function': 'Fill'}
+    assert (tmp_path / song / 'epicify' / f"{answer['ids'][1]}.json").is_file()
+    assert store.revision() == 1
+
+
+def test_bulk_saves_ndjson(store, client):
+    body = b'{"id": "a"}\n\n{"id": "b", "function": "Fill"}\n'
+    response = client.post('/dataset/bulk?song_name=Song&category=generation', data=body,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.get_json()['ids'] == ['a', 'b']
+    assert store.count(category='generation') == 2
+
+    response = client.post('/dataset/bulk?song_name=Song&category=generation', data=b'{"id": "c"}\n{',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert store.count(category='generation') == 2
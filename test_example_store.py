@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from example_store import ExampleStore, export_tree, import_tree, split_example_path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ExampleStore(tmp_path / 'examples.sqlite3', tree=tmp_path / 'tree')
+
+
+def _files(root) -> list[str]:
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob('*.json'))
+
+
+def _replace(path, example: dict) -> None:
+    """Rewrite an example file the way an editor does: a new file moved over the old one."""
+    tmp_path = path.with_name('edit.tmp')
+    tmp_path.write_text(json.dumps(example))
+    os.replace(tmp_path, path)
+    os.utime(path, (path.stat().st_mtime + 10, path.stat().st_mtime + 10))
+
+
+def test_put_many_saves_a_batch_and_writes_it_through(store, tmp_path):
+    ids = store.put_many('Song', 'epicify', [{'id': 'a', 'function': 'Fill'}, {'input': 'x'}])
+    assert ids[0] == 'a' and len(ids[1]) == 32
+    assert store.revision() == 1
+    assert store.get('Song', 'epicify', 'a') == {'id': 'a', 'function': 'Fill'}
+    assert _files(tmp_path / 'tree') == sorted(['Song/epicify/a.json', f'Song/epicify/{ids[1]}.json'])
+    assert json.loads((tmp_path / 'tree/Song/epicify/a.json').read_text()) == {'id': 'a', 'function': 'Fill'}
+
+    store.put_many('Song', 'epicify', [{'id': 'a', 'function': 'Loop'}])
+    assert store.revision() == 2
+    assert len(store) == 2
+    assert store.get('Song', 'epicify', 'a')['function'] == 'Loop'
+
+
+def test_put_many_refuses_names_outside_the_tree(store):
+    with pytest.raises(ValueError):
+        store.put_many('Song', 'epicify', [{'id': '../escape'}])
+    assert len(store) == 0 and store.revision() == 0
+
+
+def test_delete_many(store):
+    store.put_many('Song', 'epicify', [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}])
+    store.put_many('Song', 'generation', [{'id': 'a'}])
+    revision = store.revision()
+    assert store.delete_many('Song', 'epicify', ['a', 'missing']) == 1
+    assert store.revision() == revision + 1
+    assert store.delete_many('Song', 'epicify', ['missing']) == 0
+    assert store.revision() == revision + 1
+    assert store.delete_many('Song', 'epicify') == 2
+    assert store.category_counts() == [('Song', 'generation', 1)]
+
+
+def test_sync_tree_leaves_saved_examples_alone(store, tmp_path):
+    store.put_many('Song', 'epicify', [{'id': 'a'}, {'id': 'b'}])
+    revision = store.revision()
+    assert store.sync_tree(tmp_path / 'tree') == 0
+    assert store.revision() == revision
+
+
+def test_sync_tree_follows_hand_edits(store, tmp_path):
+    tree = tmp_path / 'tree'
+    store.put_many('Song', 'epicify', [{'id': 'a', 'v': 1}, {'id': 'b'}])
+    store.put_many('Song', 'generation', [{'id': 'g'}])
+    store.put_many('Other', 'epicify', [{'id': 'o'}])
+    store.sync_tree(tree)
+
+    (tree / 'Song/epicify/new.json').write_text('{"v": 3}')
+    _replace(tree / 'Song/epicify/a.json', {'v': 2})
+    os.remove(tree / 'Song/epicify/b.json')
+    shutil.rmtree(tree / 'Song/generation')
+    shutil.rmtree(tree / 'Other')
+    revision = store.revision()
+
+    assert store.sync_tree(tree) == 2
+    assert store.revision() > revision
+    assert store.get('Song', 'epicify', 'a') == {'v': 2, 'id': 'a'}
+    assert store.get('Song', 'epicify', 'new') == {'v': 3, 'id': 'new'}
+    assert store.category_counts() == [('Song', 'epicify', 2)]
+
+
+def test_fresh_store_indexes_an_existing_tree(tmp_path):
+    tree = tmp_path / 'tree'
+    (tree / 'Song/epicify').mkdir(parents=True)
+    (tree / 'Song/epicify/a.json').write_text('{"function": "Fill"}')
+    (tree / 'Song/epicify/broken.json').write_text('{')
+    store = ExampleStore(tmp_path / 'examples.sqlite3', tree=tree)
+    assert store.sync_tree(tree) == 1
+    assert store.get('Song', 'epicify', 'a') == {'function': 'Fill', 'id': 'a'}
+    # importing does not rewrite the files it read
+    assert (tree / 'Song/epicify/a.json').read_text() == '{"function": "Fill"}'
+
+
+def test_import_and_export_round_trip(tmp_path):
+    tree = tmp_path / 'tree'
+    (tree / 'Song/epicify').mkdir(parents=True)
+    (tree / 'Song/epicify/a.json').write_text('{"id": "ignored", "x": 1}')
+    (tree / 'stray.json').write_text('{}')
+    store = ExampleStore(tmp_path / 'examples.sqlite3')
+    assert import_tree(tree, store) == (1, 1)
+    assert store.get('Song', 'epicify', 'a') == {'id': 'a', 'x': 1}
+
+    out = tmp_path / 'out'
+    assert export_tree(store, out) == 1
+    assert json.loads((out / 'Song/epicify/a.json').read_text()) == {'id': 'a', 'x': 1}
+    # exported files carry their save time, so syncing them changes nothing
+    revision = store.revision()
+    assert store.sync_tree(out) == 0
+    assert store.revision() == revision
+
+
+def test_split_example_path():
+    assert split_example_path('Song/epicify/a.json') == ('Song', 'epicify', 'a')
+    assert split_example_path('Song/a.json') is None
+    assert split_example_path('Song/../a.json') is None
+    assert split_example_path('Song/epicify/a.txt') is None
+
+
+def _listing_store(tmp_path) -> ExampleStore:
+    store = ExampleStore(tmp_path / 'examples.sqlite3')
+    store.put_many('beta', 'epicify', [{'id': 'b2', 'function': 'Fill'}, {'id': 'B1'}])
+    store.put_many('Alpha', 'generation', [{'id': 'x_1', 'function': 'loop'}, {'id': 'x%2', 'function': 'Fill'}])
+    store.put_many('Alpha', 'epicify', [{'id': 'a1', 'function': 'Fill'}])
+    return store
+
+
+def _paths(rows) -> list[str]:
+    return [row['path'] for row in rows]
+
+
+@pytest.mark.parametrize('sort, expected', [
+    # titles: "Alpha • Fill", "Alpha • Fill", "Alpha • loop", then beta, its untitled example last
+    ('title', ['Alpha/epicify/a1.json', 'Alpha/generation/x%2.json', 'Alpha/generation/x_1.json',
+               'beta/epicify/b2.json', 'beta/epicify/B1.json']),
+    ('category', ['Alpha/epicify/a1.json', 'beta/epicify/B1.json', 'beta/epicify/b2.json',
+                  'Alpha/generation/x%2.json', 'Alpha/generation/x_1.json']),
+    ('function', ['beta/epicify/B1.json', 'Alpha/epicify/a1.json', 'Alpha/generation/x%2.json',
+                  'beta/epicify/b2.json', 'Alpha/generation/x_1.json']),
+    ('id', ['Alpha/epicify/a1.json', 'beta/epicify/B1.json', 'beta/epicify/b2.json',
+            'Alpha/generation/x%2.json', 'Alpha/generation/x_1.json']),
+])
+def test_find_sorts(tmp_path, sort, expected):
+    store = _listing_store(tmp_path)
+    assert _paths(store.find(sort=sort)) == expected
+    assert _paths(store.find(sort=sort, descending=True)) == expected[::-1]
+
+
+def test_find_filters_and_pages(tmp_path):
+    store = _listing_store(tmp_path)
+    assert _paths(store.find(song='beta', sort='id')) == ['beta/epicify/B1.json', 'beta/epicify/b2.json']
+    assert _paths(store.find(category='generation', function='Fill')) == ['Alpha/generation/x%2.json']
+    assert store.find(song='Alpha', category='epicify') == [
+        {'id': 'a1', 'song': 'Alpha', 'category': 'epicify', 'function': 'Fill', 'path': 'Alpha/epicify/a1.json'}]
+    # the query is a case-insensitive substring, with % and _ taken literally
+    assert _paths(store.find(query='x_')) == ['Alpha/generation/x_1.json']
+    assert _paths(store.find(query='%')) == ['Alpha/generation/x%2.json']
+    assert store.count(query='FILL') == 3
+    assert store.count(song='Alpha') == 3
+
+    everything = _paths(store.find(sort='id'))
+    assert _paths(store.find(sort='id', limit=2)) == everything[:2]
+    assert _paths(store.find(sort='id', limit=2, offset=2)) == everything[2:4]
+    assert _paths(store.find(sort='id', offset=3)) == everything[3:]
+    assert store.category_counts() == [('Alpha', 'epicify', 1), ('Alpha', 'generation', 2), ('beta', 'epicify', 2)]
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from loudness import _k_weighting_biquads, integrated_loudness, k_weight, normalise_loudness
+
+
+def _sine(dbfs: float, seconds: float, sample_rate: int = 48000, frequency: float = 1000.0,
+          channels: int = 2) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    wave = 10 ** (dbfs / 20) * np.sin(2 * np.pi * frequency * t)
+    return np.repeat(wave[:, None], channels, axis=1)
+
+
+def _k_weight_by_recursion(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Oracle: the two BS.1770 biquads run as direct-form I recursions, one sample at a time."""
+    out = np.array(samples, dtype=np.float64)
+    for b, a in _k_weighting_biquads(sample_rate):
+        filtered = np.zeros_like(out)
+        x1 = x2 = y1 = y2 = np.zeros(out.shape[1])
+        for i, x0 in enumerate(out):
+            y0 = b[0] * x0 + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+            x2, x1, y2, y1 = x1, x0, y1, y0
+            filtered[i] = y0
+        out = filtered
+    return out
+
+
+def test_bs1770_calibration_tone():
+    # BS.1770: a 0 dBFS 997 Hz sine in one front channel reads -3.01 LKFS
+    assert integrated_loudness(_sine(0, 5, frequency=997, channels=1), 48000) == pytest.approx(-3.01, abs=0.01)
+
+
+@pytest.mark.parametrize('segments, expected', [
+    # EBU Tech 3341 cases 1, 2, 3, 4 and 5 (stereo 1 kHz, dBFS per channel, seconds)
+    ([(-23, 20)], -23.0),
+    ([(-33, 20)], -33.0),
+    ([(-36, 10), (-23, 60), (-36, 10)], -23.0),
+    ([(-72, 10), (-36, 10), (-23, 60), (-36, 10), (-72, 10)], -23.0),
+    ([(-26, 20), (-20, 20.1), (-26, 20)], -23.0),
+])
+def test_ebu_tech_3341_cases(segments, expected):
+    signal = np.concatenate([_sine(dbfs, seconds) for dbfs, seconds in segments])
+    assert integrated_loudness(signal, 48000) == pytest.approx(expected, abs=0.1)
+
+
+def test_silence_has_no_loudness():
+    assert integrated_loudness(np.zeros((48000, 2)), 48000) == -math.inf
+    silence = np.zeros((4410, 2), dtype=np.int16)
+    assert normalise_loudness(silence, 44100) is silence
+
+
+def test_k_weight_matches_the_recursive_filter():
+    rng = np.random.default_rng(13)
+    samples = rng.standard_normal((70_000, 2)) * 0.1      # more than one overlap-add block
+    assert np.abs(k_weight(samples, 44100) - _k_weight_by_recursion(samples, 44100)).max() < 1e-9
+
+
+def test_normalise_reaches_the_target():
+    quiet = np.rint(_sine(-30, 10, 44100) * 32767).astype(np.int16)
+    louder = normalise_loudness(quiet, 44100, target_lufs=-24.0, peak_dbfs=-2.0)
+    assert louder.dtype == np.int16
+    assert integrated_loudness(louder / 32768.0, 44100) == pytest.approx(-24.0, abs=0.05)
+
+
+def test_normalise_stops_at_the_peak_ceiling():
+    quiet = np.rint(_sine(-30, 10, 44100) * 32767).astype(np.int16)
+    capped = normalise_loudness(quiet, 44100, target_lufs=0.0, peak_dbfs=-6.0)
+    assert 20 * math.log10(np.abs(capped).max() / 32768.0) == pytest.approx(-6.0, abs=0.01)
+    # one gain for everything: the sine is still a sine, -6 dBFS peak reads -6 LUFS
+    assert integrated_loudness(capped / 32768.0, 44100) == pytest.approx(-6.0, abs=0.05)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from note_index import BUCKET_FANOUT, NoteIndex, TrackIndex
+from note_table import NoteTable, TrackNotes
+
+
+def _track(starts, durations, pitches, velocities=None, index: int = 0) -> TrackNotes:
+    velocities = [100] * len(starts) if velocities is None else velocities
+    return TrackNotes(index, f'track {index}', 'Piano', False, starts, durations, pitches, velocities)
+
+
+def _overlapping(track: TrackNotes, start: int, end: int, low=None, high=None) -> list[int]:
+    """Brute force: every note overlapping [start, end), by position in the track."""
+    mask = (track.start_tick < end) & (track.end_tick > start)
+    if low is not None:
+        mask &= track.pitch >= low
+    if high is not None:
+        mask &= track.pitch <= high
+    return np.flatnonzero(mask).tolist()
+
+
+@pytest.mark.parametrize('count', [0, 1, BUCKET_FANOUT, BUCKET_FANOUT + 1, BUCKET_FANOUT ** 2 + 3, 20_000])
+def test_track_index_matches_brute_force(count):
+    rng = np.random.default_rng(count)
+    durations = rng.integers(1, 500, count)
+    if count:
+        durations[0] = 250_000      # one note across the whole song
+    track = _track(rng.integers(0, 200_000, count), durations, rng.integers(20, 100, count))
+    index = TrackIndex(track)
+    for _ in range(200):
+        start = int(rng.integers(-100, 210_000))
+        end = start + int(rng.integers(0, 5_000))
+        low = int(rng.integers(20, 60)) if rng.random() < 0.3 else None
+        high = int(rng.integers(60, 100)) if rng.random() < 0.3 else None
+        found = index.query(start, end, low, high)
+        # start order, which for equal starts is the track's order
+        assert found.tolist() == sorted(found.tolist(), key=lambda i: (int(track.start_tick[i]), i))
+        assert sorted(found.tolist()) == _overlapping(track, start, end, low, high)
+
+
+def test_track_index_window_edges():
+    # [0, 960) and [100, 150): an end tick is exclusive, so 150 and 960 miss them
+    index = TrackIndex(_track([0, 100, 480], [960, 50, 10], [60, 62, 64]))
+    assert index.query(150, 480).tolist() == [0]
+    assert index.query(149, 481).tolist() == [0, 1, 2]
+    assert index.query(960, 2000).tolist() == []
+    assert index.query(0, 0).tolist() == []
+
+
+def _table() -> NoteTable:
+    return NoteTable([
+        _track([0, 100, 480, 500], [960, 50, 10, 20], [60, 62, 64, 65], [100, 80, 60, 40]),
+        _track([50], [10], [70], [90], index=1),
+    ])
+
+
+def test_note_index_window_notes():
+    window = NoteIndex(_table()).window(90, 490, lod='notes')
+    assert (window['lod'], window['note_count'], window['block_ticks']) == ('notes', 3, None)
+    assert window['tracks'][0] == {
+        'track': 0, 'note_index': [0, 1, 2], 'start_tick': [0, 100, 480],
+        'duration_ticks': [960, 50, 10], 'pitch': [60, 62, 64], 'velocity': [100, 80, 60],
+    }
+    assert window['tracks'][1]['note_index'] == []
+
+
+def test_note_index_window_blocks():
+    # two 480-tick buckets on track 0: notes 0-1 (ends 960, 150) and notes 2-3 (ends 490, 520)
+    window = NoteIndex(_table()).window(0, 960, lod='blocks', block_ticks=480)
+    assert window['lod'] == 'blocks'
+    assert window['tracks'][0]['blocks'] == {
+        'start_tick': [0, 480], 'end_tick': [960, 520], 'low': [60, 64], 'high': [62, 65],
+        'count': [2, 2], 'velocity': [90, 50],
+    }
+    assert window['tracks'][1]['blocks']['count'] == [1]
+
+
+def test_note_index_auto_lod_switches_on_note_count():
+    index = NoteIndex(_table())
+    assert index.window(0, 960, max_notes=5)['lod'] == 'notes'
+    assert index.window(0, 960, max_notes=4)['lod'] == 'blocks'
+    assert [position for position, _ in index.query(0, 960, positions=[1, 7])] == [1]
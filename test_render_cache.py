@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from render_cache import RenderCache
+
+
+@pytest.fixture
+def soundfont(tmp_path):
+    path = tmp_path / 'font.sf2'
+    path.write_bytes(b'sf2')
+    return path
+
+
+def _wav(folder, name: str, size: int):
+    path = folder / name
+    path.write_bytes(name.encode()[:1] * size)
+    return path
+
+
+def test_key_follows_everything_that_changes_the_audio(tmp_path, soundfont):
+    cache = RenderCache(tmp_path / 'cache', soundfont, 44100)
+    key = cache.key(b'midi', 'slice')
+    assert cache.key(b'midi', 'slice') == key
+    assert cache.key(b'midj', 'slice') != key
+    assert cache.key(b'midi', 'abc') != key
+    assert cache.key(b'midi', 'slice', {'target_lufs': -24.0}) != key
+    assert RenderCache(tmp_path / 'cache', soundfont, 48000).key(b'midi', 'slice') != key
+    os.utime(soundfont, ns=(1, 1))
+    assert cache.key(b'midi', 'slice') != key
+
+
+def test_fetch_misses_then_hits_after_store(tmp_path, soundfont):
+    cache = RenderCache(tmp_path / 'cache', soundfont, 44100)
+    key = cache.key(b'midi', 'slice')
+    out = tmp_path / 'out.wav'
+    assert not cache.fetch(key, out)
+    assert not out.exists()
+
+    cache.store(key, _wav(tmp_path, 'rendered.wav', 100))
+    assert cache.fetch(key, out)
+    assert out.read_bytes() == b'r' * 100
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries'], stats['bytes']) == (1, 1, 1, 1, 100)
+
+
+def test_eviction_is_least_recently_used(tmp_path, soundfont):
+    cache = RenderCache(tmp_path / 'cache', soundfont, 44100, max_bytes=250)
+    out = tmp_path / 'out.wav'
+    for name in 'abc':
+        if name == 'c':
+            assert cache.fetch('a', out)         # a is now used more recently than b
+        cache.store(name, _wav(tmp_path, f'{name}.wav', 100))
+    # 300 bytes > 250: b, the least recently used, goes
+    assert sorted(path.name for path in (tmp_path / 'cache').glob('*.wav')) == ['a.wav', 'c.wav']
+    assert not cache.fetch('b', out)
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 200
+
+
+def test_entry_bigger_than_the_cache_is_kept_until_the_next_store(tmp_path, soundfont):
+    cache = RenderCache(tmp_path / 'cache', soundfont, 44100, max_bytes=50)
+    cache.store('big', _wav(tmp_path, 'big.wav', 100))
+    assert cache.stats()['entries'] == 1
+    cache.store('next', _wav(tmp_path, 'next.wav', 10))
+    assert [path.name for path in (tmp_path / 'cache').glob('*.wav')] == ['next.wav']
+
+
+def test_use_order_is_read_back_from_mtimes(tmp_path, soundfont):
+    cache = RenderCache(tmp_path / 'cache', soundfont, 44100)
+    for name, mtime in (('old', 1_000), ('new', 3_000), ('mid', 2_000)):
+        cache.store(name, _wav(tmp_path, f'{name}.wav', 100))
+        os.utime(tmp_path / 'cache' / f'{name}.wav', (mtime, mtime))
+
+    reopened = RenderCache(tmp_path / 'cache', soundfont, 44100, max_bytes=250)
+    assert reopened.stats()['bytes'] == 300
+    reopened.store('extra', _wav(tmp_path, 'extra.wav', 10))
+    # 310 bytes > 250: the entry with the oldest mtime goes, and the other 210 fit
+    assert sorted(path.name for path in (tmp_path / 'cache').glob('*.wav')) == ['extra.wav', 'mid.wav', 'new.wav']
@@ -0,0 +1,62 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from smf_decoder import decode_smf, decode_smf_file, decode_with_mido
+
+
+UPLOADS = sorted(Path(__file__).parent.joinpath('uploads').glob('*.mid'))
+
+
+def _smf(track: bytes, ticks_per_beat: int = 96) -> bytes:
+    """Format 0 file around one MTrk body."""
+    return (b'MThd' + struct.pack('>IHHH', 6, 0, 1, ticks_per_beat)
+            + b'MTrk' + struct.pack('>I', len(track)) + track)
+
+
+def _notes(track) -> list[tuple[int, ...]]:
+    return sorted(zip(track.start_tick.tolist(), track.pitch.tolist(), track.duration_ticks.tolist(),
+                      track.velocity.tolist(), track.channel.tolist()))
+
+
+def test_decode_running_status_and_note_off_velocity():
+    track = bytes([
+        0x00, 0xFF, 0x51, 0x03, 0x07, 0xA1, 0x20,   # tempo 500000 us per beat
+        0x00, 0x90, 60, 100,                        # C4 on
+        0x00, 64, 80,                               # running status: E4 on
+        0x60, 0x80, 60, 64,                         # C4 off, release velocity 64
+        0x00, 64, 0,                                # running status (note off): E4 off
+        0x30, 0x90, 67, 112,                        # G4 on
+        0x30, 67, 0,                                # running status note on, velocity 0: G4 off
+        0x00, 0xFF, 0x2F, 0x00,
+    ])
+    song = decode_smf(_smf(track))
+    assert song.ticks_per_beat == 96
+    assert song.tempos == [(0, 500000)]
+
+    (decoded,) = song.tracks
+    order = np.lexsort((decoded.pitch, decoded.start_tick))
+    assert decoded.start_tick[order].tolist() == [0, 0, 144]
+    assert decoded.duration_ticks[order].tolist() == [96, 96, 48]
+    assert decoded.pitch[order].tolist() == [60, 64, 67]
+    # note-off velocities never overwrite the note-on's
+    assert decoded.velocity[order].tolist() == [100, 80, 112]
+
+
+def test_decode_rejects_non_midi():
+    with pytest.raises(ValueError):
+        decode_smf(b'hello world')
+
+
+@pytest.mark.parametrize('path', UPLOADS, ids=lambda path: path.name)
+def test_decode_matches_mido(path):
+    fast, reference = decode_smf_file(path), decode_with_mido(path)
+    assert fast.ticks_per_beat == reference.ticks_per_beat
+    assert fast.tempos == reference.tempos
+    assert fast.time_signatures == reference.time_signatures
+    assert len(fast.tracks) == len(reference.tracks)
+    for ours, theirs in zip(fast.tracks, reference.tracks):
+        assert (ours.name, ours.program, ours.is_drum) == (theirs.name, theirs.program, theirs.is_drum)
+        assert _notes(ours) == _notes(theirs)
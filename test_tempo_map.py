@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from tempo_map import TempoMap
+
+
+# 120 BPM, then 60 BPM from beat 2, then 240 BPM from beat 4 (480 ticks per beat)
+TEMPOS = [(0, 500_000), (960, 1_000_000), (1920, 250_000)]
+METERS = [(0, 4, 4), (1920, 3, 4)]
+
+
+def _seconds_by_walking(tempos, ticks_per_beat: int, tick: int) -> float:
+    """Oracle: add up every tick's length one tick at a time."""
+    changes = dict(tempos)
+    tempo, seconds = 500_000, 0.0
+    for current in range(tick):
+        tempo = changes.get(current, tempo)
+        seconds += tempo / (ticks_per_beat * 1_000_000)
+    return seconds
+
+
+@pytest.mark.parametrize('tick, seconds', [(0, 0.0), (480, 0.5), (960, 1.0), (1440, 2.0),
+                                           (1920, 3.0), (2400, 3.25)])
+def test_tick_to_seconds_hand_checked(tick, seconds):
+    tempo_map = TempoMap(480, TEMPOS, METERS)
+    assert tempo_map.tick_to_seconds(tick) == pytest.approx(seconds)
+    assert tempo_map.seconds_to_tick(seconds) == tick
+
+
+def test_ticks_to_seconds_matches_walking_the_ticks():
+    rng = np.random.default_rng(6)
+    ticks = np.sort(rng.choice(20_000, 12, replace=False))
+    tempos = list(zip(ticks.tolist(), rng.integers(200_000, 1_500_000, 12).tolist()))
+    tempo_map = TempoMap(96, tempos)
+    probes = rng.integers(0, 25_000, 40)
+    expected = [_seconds_by_walking(tempos, 96, int(tick)) for tick in probes]
+    assert tempo_map.ticks_to_seconds(probes) == pytest.approx(expected)
+    assert [tempo_map.tick_to_seconds(int(tick)) for tick in probes] == pytest.approx(expected)
+
+
+def test_changes_are_normalised():
+    # no change at tick 0: the SMF default applies; the last change on a tick wins; repeats are dropped
+    tempo_map = TempoMap(480, [(480, 600_000), (480, 400_000), (960, 400_000)], [(0, 6, 8)])
+    assert tempo_map.tempos == [(0, 500_000), (480, 400_000)]
+    assert tempo_map.time_signatures == [(0, 6, 8)]
+    assert TempoMap(480).time_signature_at(10_000) == (4, 4)
+
+
+def test_rebased_keeps_what_is_in_force_at_the_cut():
+    rebased = TempoMap(480, TEMPOS, METERS).rebased(1440)
+    assert rebased.tempos == [(0, 1_000_000), (480, 250_000)]
+    assert rebased.time_signatures == [(0, 4, 4), (480, 3, 4)]
+    assert rebased.bpm_at(0) == 60
+
+
+def test_rebased_times_are_the_original_times_shifted():
+    tempo_map = TempoMap(480, TEMPOS, METERS)
+    for start in (0, 500, 960, 1441, 3000):
+        rebased = tempo_map.rebased(start)
+        for tick in range(start, start + 3000, 137):
+            assert rebased.tick_to_seconds(tick - start) == pytest.approx(
+                tempo_map.tick_to_seconds(tick) - tempo_map.tick_to_seconds(start))
+
+
+def test_dict_round_trip():
+    tempo_map = TempoMap(480, TEMPOS, METERS)
+    restored = TempoMap.from_dict(tempo_map.to_dict())
+    assert (restored.ticks_per_beat, restored.tempos, restored.time_signatures) == \
+        (480, tempo_map.tempos, tempo_map.time_signatures)